@@ -2,10 +2,14 @@
 DATA_DIR = '../data/'
 RESULTS_DIR = '../results/'
 SUBMISSION_FILE = RESULTS_DIR + 'submission.csv'
+CHECKPOINT_DIR = RESULTS_DIR + 'checkpoints/'
 RAW_DATA_DIR = DATA_DIR + 'raw/'
 X_TRAIN_FILE = RAW_DATA_DIR + 'X_train_v2.csv'
 Y_TRAIN_FILE = RAW_DATA_DIR + 'Y_train_sl9m6Jh.csv'
 X_TEST_FILE = RAW_DATA_DIR + 'X_test_v2.csv'
+CACHE_DIR = DATA_DIR + 'cache/'
+RAW_CACHE_DIR = CACHE_DIR + 'raw/'
+FEATURES_CACHE_DIR = CACHE_DIR + 'features/'
 
 # Input data labels
 TIME_LABEL = 'Time'
@@ -18,3 +22,4 @@ NWP_PREFIX = 'NWP'
 WIND_SPEED_LABEL = 'wind_speed'
 WIND_VECTOR_AZIMUTH_LABEL = 'wind_vector_azimuth'
 METEOROLOGICAL_WIND_DIRECTION_LABEL = 'meteorological_wind_direction'
+WF_CODE_LABEL = 'wind_farm_code'
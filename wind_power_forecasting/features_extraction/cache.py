@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Callable
+
+import pandas as pd
+
+from wind_power_forecasting import FEATURES_CACHE_DIR
+from wind_power_forecasting.utils.storage import write_frame_blocks, read_frame_blocks, read_frame_blocks_meta, \
+    get_dir_size
+
+# Bump it each time the feature extraction changes, so that entries computed by previous versions are not used.
+FEATURES_VERSION = 2
+
+
+class FeatureCache:
+    """
+    Disk-backed cache of feature dataframes.
+
+    Entries are keyed by a fingerprint of the input dataframe (values, index, columns and dtypes) and of the
+    feature configuration, so the same farm data processed again with the same configuration is read back instead
+    of being recomputed. Entries are stored as columnar blocks (see `write_frame_blocks`) and the least recently
+    used ones are evicted once the cache exceeds `max_size` bytes.
+
+    Parameters
+    ----------
+    cache_dir: str, optional
+        Directory where entries are stored.
+    max_size: int, optional
+        Size budget of the cache, in bytes.
+
+    Attributes
+    ----------
+    hits: int
+        Number of entries read from the cache.
+    misses: int
+        Number of entries computed then stored.
+    saved_time: float
+        Time (seconds) spent building the entries when they were stored, summed over all the hits.
+    """
+
+    def __init__(self, cache_dir: str = FEATURES_CACHE_DIR, max_size: int = 2 ** 30):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.saved_time = 0.
+
+    def get_or_compute(self, df: pd.DataFrame, config: dict, compute: Callable[[pd.DataFrame], pd.DataFrame]):
+        """
+        Return the cached features of `df`, computing and storing them if needed.
+
+        Parameters
+        ----------
+        {df} Input of `compute`.
+        config: dict
+            JSON serializable feature configuration, part of the key.
+        compute: callable
+            Builds the features from `df`.
+
+        Returns
+        -------
+        features_df: pandas DataFrame object
+        """
+
+        path = os.path.join(self.cache_dir, get_fingerprint(df, config))
+
+        try:
+            features_df = read_frame_blocks(path)
+            build_time = read_frame_blocks_meta(path)['extra']['build_time']
+        except (FileNotFoundError, ValueError, KeyError):
+            features_df = None
+
+        if features_df is not None:
+            # The modification time is used as last access time by the eviction.
+            os.utime(path)
+            self.hits += 1
+            self.saved_time += build_time
+
+            return features_df
+
+        start = time.perf_counter()
+        features_df = compute(df)
+        build_time = time.perf_counter() - start
+
+        write_frame_blocks(features_df, path, extra_meta={'build_time': build_time})
+        self.misses += 1
+        self.evict()
+
+        return features_df
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits within its size budget."""
+
+        entries = [e for e in os.scandir(self.cache_dir) if e.is_dir() and not e.name.startswith('.')]
+        entries = sorted(entries, key=lambda e: e.stat().st_mtime_ns)
+        sizes = [get_dir_size(e.path) for e in entries]
+        total_size = sum(sizes)
+
+        # The most recent entry is always kept, even if it's bigger than the budget.
+        for entry, size in zip(entries[:-1], sizes[:-1]):
+            if total_size <= self.max_size:
+                break
+
+            shutil.rmtree(entry.path, ignore_errors=True)
+            total_size -= size
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def get_stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'saved_time': self.saved_time}
+
+
+def get_fingerprint(df: pd.DataFrame, config: dict = None) -> str:
+    """
+    Content fingerprint of a dataframe and of a configuration.
+
+    Two dataframes with the same values, index, columns and dtypes share the same fingerprint, whatever their
+    memory layout.
+    """
+
+    sha1 = hashlib.sha1()
+    sha1.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    sha1.update(json.dumps([list(map(str, df.columns)), list(map(str, df.dtypes)), getattr(df.index, 'freqstr', None),
+                            FEATURES_VERSION, config], sort_keys=True, default=str).encode())
+
+    return sha1.hexdigest()
@@ -0,0 +1,83 @@
+from collections import OrderedDict, namedtuple
+from typing import List, Set
+
+# A produced column: the labels of the columns it's computed from and the step producing it.
+FeatureNode = namedtuple('FeatureNode', ['inputs', 'producer'])
+
+
+class FeatureGraph:
+    """
+    Dependency graph of the extracted features.
+
+    Each column produced by the feature extraction is a node recording its inputs and its producer. Inputs which are
+    not nodes are raw inputs. Nodes are kept in order of addition, i.e. the order of the columns in the output.
+    """
+
+    def __init__(self):
+        self.nodes = OrderedDict()
+
+    def __contains__(self, label):
+        return label in self.nodes
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def add_feature(self, label, inputs=(), producer=None):
+        self.nodes[label] = FeatureNode(tuple(inputs), producer)
+
+    def get_features(self, producer, labels=None) -> List:
+        """
+        Labels of the features produced by `producer`, in order of addition.
+
+        Parameters
+        ----------
+        producer: hashable
+        labels: container, optional
+            If given, only the features within `labels` are returned.
+        """
+
+        return [label for label, node in self.nodes.items()
+                if node.producer == producer and (labels is None or label in labels)]
+
+    def get_producers(self, labels=None) -> List:
+        """
+        Producers of the features, in order of addition.
+
+        Parameters
+        ----------
+        labels: container, optional
+            If given, only the producers of the features within `labels` are returned.
+        """
+
+        producers = []
+
+        for label, node in self.nodes.items():
+            if node.producer not in producers and (labels is None or label in labels):
+                producers.append(node.producer)
+
+        return producers
+
+    def get_inputs(self, label) -> tuple:
+        return self.nodes[label].inputs
+
+    def get_ancestors(self, labels) -> Set:
+        """
+        Features needed to compute `labels`: the features of `labels` and all the features they are computed from.
+
+        Labels which are not features (e.g. raw inputs) are ignored.
+        """
+
+        ancestors = set()
+        to_visit = [label for label in labels if label in self.nodes]
+
+        while to_visit:
+            label = to_visit.pop()
+
+            if label not in ancestors:
+                ancestors.add(label)
+                to_visit.extend(i for i in self.nodes[label].inputs if i in self.nodes)
+
+        return ancestors
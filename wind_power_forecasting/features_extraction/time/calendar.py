@@ -0,0 +1,219 @@
+from functools import lru_cache
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from wind_power_forecasting.features_extraction.time.cyclical_time import CYCLICAL_TIME_FEATURES, \
+    check_trigonometric_function
+from wind_power_forecasting.utils.dataframe import copy_or_not_copy
+
+NS_PER_MICROSECOND = 10 ** 3
+NS_PER_SECOND = 10 ** 9
+NS_PER_MINUTE = 60 * NS_PER_SECOND
+NS_PER_HOUR = 60 * NS_PER_MINUTE
+NS_PER_DAY = 24 * NS_PER_HOUR
+
+# Number of distinct values of the integer calendar fields (some values may be unused, e.g. month 0).
+CALENDAR_FIELD_SIZES = {'hour': 24, 'minute': 60, 'minute_of_day': 1440, 'dayofweek': 7, 'day': 32,
+                        'days_in_month': 32, 'week': 54, 'month': 13}
+
+# Cyclical time features (keyword arguments of `add_cyclical_time_feature`) read from a lookup table: the calendar
+# field indexing the table and the period of the cycle.
+TABLE_CYCLICAL_FEATURES = {'hour_of_day': ('hour', 24),
+                           'half_hour_of_day': ('hour', 12),
+                           'week_of_year': ('week', 52),
+                           'month_of_year': ('month', 12),
+                           'day_of_week': ('dayofweek', 7),
+                           'min_of_hour': ('minute', 60),
+                           'min_of_day': ('minute_of_day', 1440)}
+
+# Linear time features and the calendar field they hold.
+LINEAR_CALENDAR_FEATURES = {'hour_of_day': 'hour',
+                            'day_of_week': 'dayofweek',
+                            'day_of_month': 'day',
+                            'week_of_year': 'week',
+                            'month_of_year': 'month'}
+
+
+def add_calendar_features(df: pd.DataFrame, cyclical_features=(), linear_features=(), label_prefix='cyclical_',
+                          copy=False, dtype=None):
+    """
+    Add cyclical and linear time features in a single pass over the index.
+
+    Fused version of `add_linear_time_descriptor` and `add_cyclical_time_feature`, with the same output: the index
+    is decomposed once into integer calendar fields (see `decompose_datetime_index`), then the sine and cosine of
+    each cyclical feature are gathered from cached lookup tables (see `get_cycle_table`) into a single block.
+
+    Parameters
+    ----------
+    {df} Its index has to be a DatetimeIndex.
+    cyclical_features: iterable, optional
+        Keyword arguments of `add_cyclical_time_feature` (e.g. ``'hour_of_day'``), added in the same order.
+    linear_features: iterable, optional
+        Among ``'hour_of_day'``, ``'day_of_week'``, ``'day_of_month'``, ``'week_of_year'``, ``'month_of_year'``.
+        Added before the cyclical features.
+    label_prefix: str, optional
+        Prefix of the cyclical features labels.
+    copy: bool, optional
+    dtype: numpy dtype, optional
+        Dtype of the added columns. By default, float64 for the cyclical features and int64 for the linear ones.
+
+    Returns
+    -------
+    {df}
+
+    Raises
+    ------
+    ValueError
+        If a feature is unknown.
+    """
+
+    unknown_features = [f for f in cyclical_features if f not in CYCLICAL_TIME_FEATURES] + \
+                       [f for f in linear_features if f not in LINEAR_CALENDAR_FEATURES]
+    if unknown_features:
+        raise ValueError('Unexpected calendar features: {}'.format(unknown_features))
+
+    df = copy_or_not_copy(df, copy)
+
+    cyclical_features = [f for f in CYCLICAL_TIME_FEATURES if f in cyclical_features]
+    fields = {LINEAR_CALENDAR_FEATURES[f] for f in linear_features}
+    fields.update(field for f in cyclical_features for field in _get_cyclical_feature_fields(f))
+    fields = decompose_datetime_index(df.index, fields)
+
+    linear_df = pd.DataFrame({feature: fields[LINEAR_CALENDAR_FEATURES[feature]].astype(
+        np.int64 if dtype is None else dtype, copy=False) for feature in linear_features}, index=df.index)
+
+    dtype = np.dtype(np.float64 if dtype is None else dtype)
+    trig_func_list = [np.sin, np.cos]
+
+    # Column-major, so that each column is a contiguous slice of the block.
+    block = np.empty((len(df), len(cyclical_features) * len(trig_func_list)), dtype=dtype, order='F')
+    labels = []
+
+    for feature in cyclical_features:
+        for trig_func in trig_func_list:
+            column = block[:, len(labels)]
+            labels.append(label_prefix + CYCLICAL_TIME_FEATURES[feature] + '_' + trig_func.__name__)
+
+            if feature in TABLE_CYCLICAL_FEATURES:
+                field, period = TABLE_CYCLICAL_FEATURES[feature]
+                table = get_cycle_table(period, CALENDAR_FIELD_SIZES[field], trig_func.__name__, dtype.str)
+                # Fields are always within the table, 'clip' avoids the buffering of 'raise'.
+                np.take(table, fields[field], out=column, mode='clip')
+
+            elif feature == 'day_of_month':
+                # Same as `add_cyclical_day_of_month`: day of week over the number of days of the month.
+                table = get_cycle_table(None, CALENDAR_FIELD_SIZES['days_in_month'], trig_func.__name__, dtype.str)
+                column[:] = table[fields['days_in_month'], fields['dayofweek']]
+
+            else:
+                second_of_minute = fields['second'] + fields['microsecond'] / 1000000
+                column[:] = trig_func(2 * np.pi * second_of_minute / 60)
+
+    # A single concatenation, instead of an insertion per column.
+    return pd.concat([df, linear_df, pd.DataFrame(block, index=df.index, columns=labels)], axis=1)
+
+
+def decompose_datetime_index(index: pd.DatetimeIndex, fields) -> Dict[str, np.ndarray]:
+    """
+    Integer calendar fields of a DatetimeIndex, computed from its int64 representation.
+
+    Parameters
+    ----------
+    index: pandas DatetimeIndex object
+        Timezone aware indexes are decomposed in local time.
+    fields: iterable
+        Among ``'hour'``, ``'minute'``, ``'minute_of_day'``, ``'second'``, ``'microsecond'``, ``'dayofweek'``
+        (Monday=0), ``'day'``, ``'days_in_month'``, ``'week'`` (ISO week), ``'month'``.
+
+    Returns
+    -------
+    fields: dict
+        Maps each field to an int64 array, as the pandas index attribute of the same name.
+    """
+
+    if index.tz is not None:
+        index = index.tz_localize(None)
+
+    ns = index.asi8
+    out = {}
+
+    def get(field):
+        if field in out:
+            return out[field]
+
+        if field == 'hour':
+            values = ns // NS_PER_HOUR % 24
+        elif field == 'minute':
+            values = ns // NS_PER_MINUTE % 60
+        elif field == 'minute_of_day':
+            values = ns // NS_PER_MINUTE % 1440
+        elif field == 'second':
+            values = ns // NS_PER_SECOND % 60
+        elif field == 'microsecond':
+            values = ns // NS_PER_MICROSECOND % 1000000
+        elif field == 'days':
+            values = ns // NS_PER_DAY
+        elif field == 'dayofweek':
+            # 1970-01-01 was a Thursday.
+            values = (get('days') + 3) % 7
+        elif field == 'months':
+            values = get('days').astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        elif field == 'month':
+            values = get('months') % 12 + 1
+        elif field == 'month_start':
+            values = get('months').astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+        elif field == 'day':
+            values = get('days') - get('month_start') + 1
+        elif field == 'days_in_month':
+            next_month_start = (get('months') + 1).astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+            values = next_month_start - get('month_start')
+        elif field == 'week':
+            # The ISO week of a day is the one of the Thursday of its week, counted from its year start.
+            thursday = get('days') - get('dayofweek') + 3
+            year_start = thursday.astype('datetime64[D]').astype('datetime64[Y]').astype('datetime64[D]')
+            values = (thursday - year_start.astype(np.int64)) // 7 + 1
+        else:
+            raise ValueError('Unexpected calendar field: {}'.format(field))
+
+        out[field] = values
+
+        return values
+
+    return {field: get(field) for field in fields}
+
+
+@lru_cache(maxsize=None)
+def get_cycle_table(period, size, trig_func_name, dtype_str) -> np.ndarray:
+    """
+    Read-only lookup table of ``trig_func(2 * pi * value / period)`` for the integer values within [0, `size`).
+
+    If `period` is `None`, the table is 2D and indexed by (period, value).
+    """
+
+    trig_func = getattr(np, trig_func_name)
+    check_trigonometric_function(trig_func)
+    values = np.arange(size)
+
+    if period is None:
+        # Periods 0 are never gathered.
+        with np.errstate(divide='ignore', invalid='ignore'):
+            table = trig_func(2 * np.pi * values[None, :] / values[:, None])
+    else:
+        table = trig_func(2 * np.pi * values / period)
+
+    table = table.astype(dtype_str)
+    table.flags.writeable = False
+
+    return table
+
+
+def _get_cyclical_feature_fields(feature) -> List:
+    if feature in TABLE_CYCLICAL_FEATURES:
+        return [TABLE_CYCLICAL_FEATURES[feature][0]]
+
+    if feature == 'day_of_month':
+        return ['days_in_month', 'dayofweek']
+
+    return ['second', 'microsecond']
@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from typing import List
 
 import numpy as np
@@ -8,6 +9,18 @@ from wind_power_forecasting.features_extraction.time.linear_time import compute_
 from wind_power_forecasting.utils.dataframe import copy_or_not_copy
 
 
+# Cyclical time features, as keyword arguments of `add_cyclical_time_feature`, in order of addition, and their labels.
+CYCLICAL_TIME_FEATURES = OrderedDict([('hour_of_day', 'hour_of_day'),
+                                      ('half_hour_of_day', 'half_hour_of_day'),
+                                      ('week_of_year', 'week_of_year'),
+                                      ('month_of_year', 'month_of_year'),
+                                      ('day_of_week', 'day_of_week'),
+                                      ('day_of_month', 'day_of_month'),
+                                      ('min_of_hour', 'minute_of_hour'),
+                                      ('min_of_day', 'minute_of_day'),
+                                      ('sec_of_min', 'second_of_minute')])
+
+
 class UnexpectedTrigFunc(ValueError):
     """
     This error is raised when a column is found twice in a dataframe
@@ -32,37 +45,53 @@ def add_cyclical_time_feature(df,
                               min_of_hour=False,
                               min_of_day=False,
                               sec_of_min=False,
-                              copy=False):
+                              copy=False,
+                              dtype=None):
     if hour_of_day:
-        df = add_cyclical_hour_of_day(df, copy=copy)
+        df = add_cyclical_hour_of_day(df, copy=copy, dtype=dtype)
 
     if half_hour_of_day:
-        df = add_cyclical_half_hour_of_day(df, copy=copy)
+        df = add_cyclical_half_hour_of_day(df, copy=copy, dtype=dtype)
 
     if week_of_year:
-        df = add_cyclical_week_of_year(df, copy=copy)
+        df = add_cyclical_week_of_year(df, copy=copy, dtype=dtype)
 
     if month_of_year:
-        df = add_cyclical_month_of_year(df, copy=copy)
+        df = add_cyclical_month_of_year(df, copy=copy, dtype=dtype)
 
     if day_of_week:
-        df = add_cyclical_day_of_week(df, copy=copy)
+        df = add_cyclical_day_of_week(df, copy=copy, dtype=dtype)
 
     if day_of_month:
-        df = add_cyclical_day_of_month(df, copy=copy)
+        df = add_cyclical_day_of_month(df, copy=copy, dtype=dtype)
 
     if min_of_hour:
-        df = add_cyclical_minute_of_hour(df, copy=copy)
+        df = add_cyclical_minute_of_hour(df, copy=copy, dtype=dtype)
 
     if min_of_day:
-        df = add_cyclical_minute_of_day(df, copy=copy)
+        df = add_cyclical_minute_of_day(df, copy=copy, dtype=dtype)
 
     if sec_of_min:
-        df = add_cyclical_second_of_minute(df, copy=copy)
+        df = add_cyclical_second_of_minute(df, copy=copy, dtype=dtype)
 
     return df
 
 
+def get_cyclical_time_feature_labels(features, trig_func_list: List[np.ufunc] = None,
+                                     label_prefix: str = 'cyclical_') -> List[str]:
+    """
+    Labels of the columns added by `add_cyclical_time_feature` for `features` (keyword arguments set to `True`), in
+    order of addition.
+    """
+
+    if trig_func_list is None:
+        trig_func_list = [np.sin, np.cos]
+
+    return [label_prefix + label + '_' + trig_func.__name__
+            for feature, label in CYCLICAL_TIME_FEATURES.items() if feature in features
+            for trig_func in trig_func_list]
+
+
 def add_cycle_time_descriptor(df: pd.DataFrame,
                               max_value: int,
                               time_descriptor=None,
@@ -70,7 +99,8 @@ def add_cycle_time_descriptor(df: pd.DataFrame,
                               trig_func_list: List[np.ufunc] = None,
                               cyclical_time_descriptor_label: str = None,
                               label_prefix: str = 'cyclical_',
-                              copy=True):
+                              copy=True,
+                              dtype=None):
     df = copy_or_not_copy(df, copy)
 
     time_descriptor = compute_time_descriptor(df, time_descriptor, index_attribute)
@@ -87,26 +117,26 @@ def add_cycle_time_descriptor(df: pd.DataFrame,
     for trig_func in trig_func_list:
         trig_func_str = trig_func.__name__
         final_label = label_prefix + cyclical_time_descriptor_label + '_' + trig_func_str
-        df[final_label] = cycle_transformation(time_descriptor, max_value, trig_func)
+        df[final_label] = np.asarray(cycle_transformation(time_descriptor, max_value, trig_func), dtype=dtype)
 
     return df
 
 
-def add_cyclical_hour_of_day(df, added_label='hour_of_day', copy=False):
+def add_cyclical_hour_of_day(df, added_label='hour_of_day', copy=False, dtype=None):
     df = add_cycle_time_descriptor(df, max_value=24, index_attribute='hour', cyclical_time_descriptor_label=added_label,
-                                   copy=copy)
+                                   copy=copy, dtype=dtype)
 
     return df
 
 
-def add_cyclical_half_hour_of_day(df, added_label='half_hour_of_day', copy=False):
+def add_cyclical_half_hour_of_day(df, added_label='half_hour_of_day', copy=False, dtype=None):
     df = add_cycle_time_descriptor(df, max_value=12, time_descriptor=df.index.hour,
-                                   cyclical_time_descriptor_label=added_label, copy=copy)
+                                   cyclical_time_descriptor_label=added_label, copy=copy, dtype=dtype)
 
     return df
 
 
-def add_cyclical_week_of_year(df, added_label='week_of_year', copy=False):
+def add_cyclical_week_of_year(df, added_label='week_of_year', copy=False, dtype=None):
     # TODO manage case when nb weeks == 53
     # from: https://www.timeanddate.com/date/week-numbers.html
     # The weeks of the year are numbered from week 1 to 52 or 53 depending on several factors.
@@ -115,52 +145,52 @@ def add_cyclical_week_of_year(df, added_label='week_of_year', copy=False):
     # These week numbers are commonly used in some European and Asian countries; but not so much in the United States.
     nb_week = 52
     df = add_cycle_time_descriptor(df, max_value=nb_week, index_attribute='week',
-                                   cyclical_time_descriptor_label=added_label, copy=copy)
+                                   cyclical_time_descriptor_label=added_label, copy=copy, dtype=dtype)
 
     return df
 
 
-def add_cyclical_month_of_year(df, added_label='month_of_year', copy=False):
+def add_cyclical_month_of_year(df, added_label='month_of_year', copy=False, dtype=None):
     df = add_cycle_time_descriptor(df, max_value=12, index_attribute='month',
-                                   cyclical_time_descriptor_label=added_label, copy=copy)
+                                   cyclical_time_descriptor_label=added_label, copy=copy, dtype=dtype)
 
     return df
 
 
-def add_cyclical_day_of_week(df, added_label='day_of_week', copy=False):
+def add_cyclical_day_of_week(df, added_label='day_of_week', copy=False, dtype=None):
     df = add_cycle_time_descriptor(df, max_value=7, index_attribute='dayofweek',
-                                   cyclical_time_descriptor_label=added_label, copy=copy)
+                                   cyclical_time_descriptor_label=added_label, copy=copy, dtype=dtype)
 
     return df
 
 
-def add_cyclical_day_of_month(df, added_label='day_of_month', copy=False):
+def add_cyclical_day_of_month(df, added_label='day_of_month', copy=False, dtype=None):
     df = add_cycle_time_descriptor(df, max_value=df.index.daysinmonth, index_attribute='dayofweek',
                                    cyclical_time_descriptor_label=added_label,
-                                   copy=copy)
+                                   copy=copy, dtype=dtype)
 
     return df
 
 
-def add_cyclical_minute_of_hour(df, added_label='minute_of_hour', copy=False):
+def add_cyclical_minute_of_hour(df, added_label='minute_of_hour', copy=False, dtype=None):
     df = add_cycle_time_descriptor(df, max_value=60, index_attribute='minute',
-                                   cyclical_time_descriptor_label=added_label, copy=copy)
+                                   cyclical_time_descriptor_label=added_label, copy=copy, dtype=dtype)
 
     return df
 
 
-def add_cyclical_minute_of_day(df, added_label='minute_of_day', copy=False):
+def add_cyclical_minute_of_day(df, added_label='minute_of_day', copy=False, dtype=None):
     min_of_day = compute_minute_of_day(df.index)
     df = add_cycle_time_descriptor(df, max_value=1440, time_descriptor=min_of_day,
-                                   cyclical_time_descriptor_label=added_label, copy=copy)
+                                   cyclical_time_descriptor_label=added_label, copy=copy, dtype=dtype)
 
     return df
 
 
-def add_cyclical_second_of_minute(df, added_label='second_of_minute', copy=False):
+def add_cyclical_second_of_minute(df, added_label='second_of_minute', copy=False, dtype=None):
     sec_min = compute_second_of_minute(df.index)
     df = add_cycle_time_descriptor(df, max_value=60, time_descriptor=sec_min,
-                                   cyclical_time_descriptor_label=added_label, copy=copy)
+                                   cyclical_time_descriptor_label=added_label, copy=copy, dtype=dtype)
 
     return df
 
@@ -8,7 +8,8 @@ def add_linear_time_descriptor(df: pd.DataFrame,
                                time_descriptor=None,
                                index_attribute: str = None,
                                time_descriptor_label: str = None,
-                               copy=True):
+                               copy=True,
+                               dtype=None):
     df = copy_or_not_copy(df, copy)
 
     time_descriptor = compute_time_descriptor(df, time_descriptor, index_attribute)
@@ -19,7 +20,7 @@ def add_linear_time_descriptor(df: pd.DataFrame,
         else:
             raise ValueError('label has to be provided when index_attribute is None.')
 
-    df[time_descriptor_label] = time_descriptor
+    df[time_descriptor_label] = np.asarray(time_descriptor, dtype=dtype)
 
     return df
 
@@ -37,8 +38,9 @@ def compute_time_descriptor(df: pd.DataFrame, time_descriptor=None, index_attrib
     return time_descriptor
 
 
-def add_day_of_week(df, added_label='day_of_week', copy=False):
-    df = add_linear_time_descriptor(df, index_attribute='dayofweek', time_descriptor_label=added_label, copy=copy)
+def add_day_of_week(df, added_label='day_of_week', copy=False, dtype=None):
+    df = add_linear_time_descriptor(df, index_attribute='dayofweek', time_descriptor_label=added_label, copy=copy,
+                                    dtype=dtype)
 
     return df
 
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wind_power_forecasting.features_extraction.time.calendar import add_calendar_features, decompose_datetime_index
+from wind_power_forecasting.features_extraction.time.cyclical_time import add_cyclical_time_feature, \
+    CYCLICAL_TIME_FEATURES
+from wind_power_forecasting.features_extraction.time.linear_time import add_day_of_week
+
+
+class TestAddCalendarFeatures:
+
+    @pytest.mark.filterwarnings('ignore::FutureWarning')
+    @pytest.mark.parametrize('dtype', [None, np.float32])
+    def test_same_as_time_descriptors(self, dtype):
+        index = pd.date_range('2015-12-25', '2021-01-10', freq='37min')
+        df = pd.DataFrame({'a': np.arange(len(index))}, index=index)
+
+        expected_df = add_day_of_week(df, copy=True, dtype=dtype)
+        add_cyclical_time_feature(expected_df, copy=False, dtype=dtype, **{f: True for f in CYCLICAL_TIME_FEATURES})
+        output_df = add_calendar_features(df, cyclical_features=CYCLICAL_TIME_FEATURES,
+                                          linear_features=['day_of_week'], copy=True, dtype=dtype)
+
+        pd.testing.assert_frame_equal(output_df, expected_df, check_exact=True)
+
+    def test_unexpected_feature(self):
+        df = pd.DataFrame(index=pd.date_range('2018-01-01', periods=3, freq='H'))
+
+        with pytest.raises(ValueError):
+            add_calendar_features(df, cyclical_features=['hour_of_week'])
+
+
+class TestDecomposeDatetimeIndex:
+
+    def test_same_as_pandas(self):
+        index = pd.date_range('1968-12-28', '2033-01-03', freq='13H')
+        fields = decompose_datetime_index(index, ['hour', 'dayofweek', 'day', 'days_in_month', 'month', 'week'])
+
+        np.testing.assert_array_equal(fields['hour'], index.hour)
+        np.testing.assert_array_equal(fields['dayofweek'], index.dayofweek)
+        np.testing.assert_array_equal(fields['day'], index.day)
+        np.testing.assert_array_equal(fields['days_in_month'], index.daysinmonth)
+        np.testing.assert_array_equal(fields['month'], index.month)
+        np.testing.assert_array_equal(fields['week'], index.isocalendar().week)
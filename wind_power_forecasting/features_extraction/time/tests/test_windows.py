@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wind_power_forecasting.features_extraction.time.windows import add_time_shifted_features, \
+    compute_rolling_statistics
+
+
+class TestAddTimeShiftedFeatures:
+
+    def test_same_as_pandas(self):
+        rng = np.random.RandomState(0)
+        index = pd.date_range('2018-01-01', periods=500, freq='H')
+        df = pd.DataFrame(rng.randn(500, 3), index=index, columns=['a', 'b', 'c'])
+        df[rng.rand(500, 3) < 0.2] = np.nan
+        statistics = ['mean', 'sum', 'std', 'min', 'max']
+
+        output_df = add_time_shifted_features(df, lag_range=[1, 2, 24], to_lag_labels=['a', 'b'],
+                                              periods=['3H', 6], to_roll_labels=['b', 'c'], statistics=statistics)
+
+        for lag in [1, 2, 24]:
+            for label in ['a', 'b']:
+                pd.testing.assert_series_equal(output_df[label + '_-' + str(lag)], df[label].shift(lag),
+                                               check_names=False)
+
+        for period in ['3H', 6]:
+            for statistic in statistics:
+                for label in ['b', 'c']:
+                    expected = getattr(df[label].rolling(period), statistic)()
+                    pd.testing.assert_series_equal(output_df[label + '_roll' + statistic + '_' + str(period)],
+                                                   expected, check_names=False, rtol=1e-9, atol=1e-12)
+
+    def test_time_offset_needs_frequency(self):
+        df = pd.DataFrame({'a': [1., 2., 3.]}, index=pd.to_datetime(['2018-01-01', '2018-01-02', '2018-01-04']))
+
+        with pytest.raises(ValueError):
+            add_time_shifted_features(df, periods=['3H'])
+
+
+class TestComputeRollingStatistics:
+
+    def test_same_on_last_rows(self):
+        rng = np.random.RandomState(0)
+        block = rng.randn(200, 2)
+        block[rng.rand(200, 2) < 0.2] = np.nan
+        statistics = ['mean', 'sum', 'std', 'min', 'max']
+
+        output = compute_rolling_statistics(block, [3, 12], statistics)
+        last_rows_output = compute_rolling_statistics(block[-12:], [3, 12], statistics)
+
+        np.testing.assert_array_equal(output[-1], last_rows_output[-1])
+
+    def test_groups_same_as_alone(self):
+        rng = np.random.RandomState(0)
+        block = rng.randn(60, 2)
+        block[rng.rand(60, 2) < 0.2] = np.nan
+        group_offsets = [0, 4, 4, 30, 60]
+        statistics = ['mean', 'std', 'min']
+
+        output = compute_rolling_statistics(block, [3, 12], statistics, group_offsets=group_offsets)
+
+        for start, end in zip(group_offsets[:-1], group_offsets[1:]):
+            np.testing.assert_array_equal(output[start:end],
+                                          compute_rolling_statistics(block[start:end], [3, 12], statistics))
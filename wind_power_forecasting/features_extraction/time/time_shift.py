@@ -11,20 +11,38 @@ def add_lags(df: pd.DataFrame, lag_range, to_lag_labels=None, to_not_lag_labels=
     to_lag_labels = _get_labels_to_process(df, to_lag_labels, to_not_lag_labels)
 
     for lag, label in [*product(lag_range, to_lag_labels)]:
-        added_label = label + '_-' + str(lag)
+        added_label = get_lag_label(label, lag)
         df[added_label] = df[label].shift(lag)
 
     return df
 
 
-def add_rollmeans(df: pd.DataFrame, periods, to_roll_labels=None, to_not_roll_labels=None, copy=True):
+def add_rollmeans(df: pd.DataFrame, periods, to_roll_labels=None, to_not_roll_labels=None, copy=True, dtype=None):
     df = copy_or_not_copy(df, copy)
 
     to_roll_labels = _get_labels_to_process(df, to_roll_labels, to_not_roll_labels)
 
     for period, label in [*product(periods, to_roll_labels)]:
-        added_label = label + '_rollmean_' + str(period)
-        df[added_label] = df[label].rolling(period).mean()
+        added_label = get_rollmean_label(label, period)
+        rollmean = df[label].rolling(period).mean()
+
+        # Rolling windows are always computed in float64.
+        if dtype is not None:
+            rollmean = rollmean.astype(dtype)
+
+        df[added_label] = rollmean
+
+
+def get_lag_label(label, lag) -> str:
+    return label + '_-' + str(lag)
+
+
+def get_rollmean_label(label, period) -> str:
+    return get_rolling_label(label, period, 'mean')
+
+
+def get_rolling_label(label, period, statistic='mean') -> str:
+    return label + '_roll' + statistic + '_' + str(period)
 
 
 def _get_labels_to_process(df, to_process_labels=None, to_not_process_labels=None):
@@ -0,0 +1,334 @@
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from wind_power_forecasting.features_extraction.time.time_shift import get_lag_label, get_rolling_label, \
+    _get_labels_to_process
+
+VALID_ROLLING_STATISTICS = ['mean', 'sum', 'std', 'min', 'max']
+
+
+def add_time_shifted_features(df: pd.DataFrame, lag_range=(), to_lag_labels=None, periods=(), to_roll_labels=None,
+                              statistics=('mean',), min_periods=None, dtype=None, group_offsets=None,
+                              freq=None) -> pd.DataFrame:
+    """
+    Add lags and rolling window statistics of several columns at once.
+
+    Block version of `add_lags` and `add_rollmeans`: all the lags (see `compute_lags`) and all the rolling windows
+    (see `compute_rolling_statistics`) are written into a single preallocated block, attached to `df` with a single
+    concatenation. Rolling windows are only supported over a regular index.
+
+    Several time series can be processed at once by stacking them (see `group_offsets`): lags and rolling windows
+    never cross the boundaries of the series, so the output of each of them is the one it would have alone.
+
+    Parameters
+    ----------
+    {df}
+    lag_range: iterable of int, optional
+    to_lag_labels: list, optional
+        By default, all the columns are lagged.
+    periods: iterable, optional
+        Windows, as numbers of rows (int) or as time offsets (e.g. ``'3H'``), with the pandas semantics.
+    to_roll_labels: list, optional
+        By default, all the columns are rolled.
+    statistics: iterable, optional
+        Among ``'mean'``, ``'sum'``, ``'std'``, ``'min'``, ``'max'``.
+    min_periods: int, optional
+        See `pandas.DataFrame.rolling`. By default, 1 for time offsets and the window size for numbers of rows.
+    dtype: numpy dtype, optional
+        Dtype of the added columns. By default, the one of the inputs (float64 for integers).
+    group_offsets: array-like of int, optional
+        If given, the rows are groups of contiguous rows (e.g. one time series per wind farm): group `i` spans rows
+        ``group_offsets[i]:group_offsets[i + 1]``.
+    freq: str or DateOffset, optional
+        Frequency of the rows, for time offset periods. By default, the one of the index (stacked time series have
+        none).
+
+    Returns
+    -------
+    {df} A new dataframe, with the added columns: lags (lag by lag), then rolling statistics (period by period,
+    statistic by statistic).
+    """
+
+    lag_range = list(lag_range)
+    periods = list(periods)
+    statistics = list(statistics)
+    to_lag_labels = _get_labels_to_process(df, to_lag_labels) if lag_range else []
+    to_roll_labels = _get_labels_to_process(df, to_roll_labels) if periods else []
+
+    to_lag = df.loc[:, to_lag_labels].to_numpy()
+    to_roll = df.loc[:, to_roll_labels].to_numpy()
+
+    if dtype is None:
+        dtype = np.result_type(to_lag, to_roll, np.float16)
+
+    n_lags = len(lag_range) * len(to_lag_labels)
+    n_rollings = len(periods) * len(statistics) * len(to_roll_labels)
+    block = np.empty((len(df), n_lags + n_rollings), dtype=dtype, order='F')
+
+    compute_lags(to_lag, lag_range, out=block[:, :n_lags], group_offsets=group_offsets)
+    labels = [get_lag_label(label, lag) for lag in lag_range for label in to_lag_labels]
+
+    if periods:
+        index = df.index if freq is None else pd.DatetimeIndex([], freq=freq)
+        windows = [get_window_size(period, index) for period in periods]
+
+        if min_periods is None:
+            min_periods = [window if isinstance(period, (int, np.integer)) else 1
+                           for period, window in zip(periods, windows)]
+
+        compute_rolling_statistics(to_roll, windows, statistics, min_periods=min_periods, out=block[:, n_lags:],
+                                   group_offsets=group_offsets)
+        labels += [get_rolling_label(label, period, statistic)
+                   for period in periods for statistic in statistics for label in to_roll_labels]
+
+    return pd.concat([df, pd.DataFrame(block, index=df.index, columns=labels)], axis=1)
+
+
+def compute_lags(block: np.ndarray, lag_range, out: np.ndarray = None, group_offsets=None) -> np.ndarray:
+    """
+    Shift all the columns of a block by several lags at once, as ``pandas.DataFrame.shift``.
+
+    Parameters
+    ----------
+    block: np.array of shape = (n_times, n_columns)
+    lag_range: iterable of int
+        Negative lags shift backward.
+    out: np.array of shape = (n_times, n_lags * n_columns), optional
+    group_offsets: array-like of int, optional
+        Groups of contiguous rows which are shifted separately, see `add_time_shifted_features`.
+
+    Returns
+    -------
+    lags: np.array of shape = (n_times, n_lags * n_columns)
+        Lag by lag, NaN where the shifted value is out of the block (or of the group).
+    """
+
+    lag_range = list(lag_range)
+    n_times, n_columns = block.shape
+
+    if out is None:
+        out = np.empty((n_times, len(lag_range) * n_columns), dtype=np.result_type(block, np.float16), order='F')
+
+    if group_offsets is not None:
+        positions, remaining = get_group_positions(group_offsets)
+
+    for i, lag in enumerate(lag_range):
+        lagged = out[:, i * n_columns:(i + 1) * n_columns]
+        lag = int(np.clip(lag, -n_times, n_times))
+
+        if lag >= 0:
+            lagged[:lag] = np.nan
+            lagged[lag:] = block[:n_times - lag]
+        else:
+            lagged[lag:] = np.nan
+            lagged[:lag] = block[-lag:]
+
+        if group_offsets is not None:
+            # Values shifted from another group.
+            lagged[positions < lag if lag >= 0 else remaining < -lag] = np.nan
+
+    return out
+
+
+def compute_rolling_statistics(block: np.ndarray, windows, statistics=('mean',), min_periods=None,
+                               out: np.ndarray = None, group_offsets=None) -> np.ndarray:
+    """
+    Rolling window statistics of all the columns of a block, for several windows at once.
+
+    Windows are accumulated offset by offset (each row of the window is added to all the outputs at once), so all
+    the windows are computed for the cost of the largest one. NaNs are ignored. The statistic of a row only depends
+    on the rows of its window, always accumulated in the same order (most recent first), so computing it over the
+    last rows of a block gives exactly the same value. Likewise, with `group_offsets`, rows of the previous groups
+    are left out of the windows, so the statistics of each group are exactly the ones of the group alone.
+
+    Parameters
+    ----------
+    block: np.array of shape = (n_times, n_columns)
+    windows: iterable of int
+        Numbers of rows, the current one included.
+    statistics: iterable, optional
+        Among ``'mean'``, ``'sum'``, ``'std'`` (``ddof=1``), ``'min'``, ``'max'``.
+    min_periods: int or list of int, optional
+        Minimum number of non NaN values within a window to output a statistic (NaN otherwise), for all the windows
+        or window by window. By default, 1.
+    out: np.array of shape = (n_times, n_windows * n_statistics * n_columns), optional
+    group_offsets: array-like of int, optional
+        Groups of contiguous rows which are rolled separately, see `add_time_shifted_features`.
+
+    Returns
+    -------
+    rolling_statistics: np.array of shape = (n_times, n_windows * n_statistics * n_columns)
+        Window by window, statistic by statistic.
+
+    Raises
+    ------
+    ValueError
+        If a statistic is unknown or a window is not positive.
+    """
+
+    windows = list(windows)
+    statistics = list(statistics)
+    check_rolling_statistics(statistics)
+
+    if any(window < 1 for window in windows):
+        raise ValueError('Windows should be positive, got: {}'.format(windows))
+
+    n_times, n_columns = block.shape
+    n_outputs = len(statistics) * n_columns
+
+    if out is None:
+        out = np.empty((n_times, len(windows) * n_outputs), dtype=np.result_type(block, np.float16), order='F')
+
+    if min_periods is None:
+        min_periods = 1
+
+    if isinstance(min_periods, (int, np.integer)):
+        min_periods = [min_periods] * len(windows)
+
+    # Accumulations are done in float64, as pandas does.
+    values = np.asarray(block, dtype=np.float64)
+    is_valid = ~np.isnan(values)
+    filled = np.where(is_valid, values, 0)
+    positions = None if group_offsets is None else get_group_positions(group_offsets)[0]
+
+    sums = np.zeros_like(values)
+    counts = np.zeros(values.shape, dtype=np.int64)
+    minimums = np.full_like(values, np.nan)
+    maximums = np.full_like(values, np.nan)
+
+    for offset in range(max(windows, default=0)):
+        # Rows of the block seen `offset` rows before.
+        current = slice(offset, None)
+        previous = slice(None, max(n_times - offset, 0))
+        previous_values, previous_filled, previous_is_valid = values[previous], filled[previous], is_valid[previous]
+
+        if positions is not None and offset:
+            # Rows of the previous group count as missing values: adding 0 leaves the sums exactly unchanged.
+            is_in_group = (positions[current] >= offset)[:, None]
+            previous_values = np.where(is_in_group, previous_values, np.nan)
+            previous_filled = np.where(is_in_group, previous_filled, 0)
+            previous_is_valid = previous_is_valid & is_in_group
+
+        sums[current] += previous_filled
+        counts[current] += previous_is_valid
+
+        if 'min' in statistics:
+            np.fmin(minimums[current], previous_values, out=minimums[current])
+
+        if 'max' in statistics:
+            np.fmax(maximums[current], previous_values, out=maximums[current])
+
+        window = offset + 1
+
+        if window not in windows:
+            continue
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+
+        for position in [i for i, w in enumerate(windows) if w == window]:
+            has_enough = counts >= min_periods[position]
+
+            for statistic_idx, statistic in enumerate(statistics):
+                start = position * n_outputs + statistic_idx * n_columns
+                output = out[:, start:start + n_columns]
+
+                if statistic == 'mean':
+                    output[:] = means
+                elif statistic == 'sum':
+                    output[:] = sums
+                elif statistic == 'min':
+                    output[:] = minimums
+                elif statistic == 'max':
+                    output[:] = maximums
+                else:
+                    output[:] = _compute_rolling_std(values, is_valid, means, counts, window, positions)
+
+                output[~has_enough] = np.nan
+
+    return out
+
+
+def get_window_size(period, index: pd.Index) -> int:
+    """
+    Number of rows of a rolling window.
+
+    Parameters
+    ----------
+    period: int or str
+        Number of rows, or time offset (e.g. ``'3H'``) over a regular index (with a `freq`), i.e. the rows within
+        ``(t - period, t]``.
+    index: pandas Index object
+
+    Raises
+    ------
+    ValueError
+        If `period` is a time offset and the index has no frequency, or `period` is not a multiple of it.
+    """
+
+    if isinstance(period, (int, np.integer)):
+        return int(period)
+
+    freq = getattr(index, 'freq', None)
+
+    if freq is None:
+        raise ValueError('Time offset windows need an index with a frequency, got: {}'.format(period))
+
+    window, remainder = divmod(pd.Timedelta(period), pd.Timedelta(freq))
+
+    if remainder or window < 1:
+        raise ValueError('Window {} should be a multiple of the index frequency {}'.format(period, freq.freqstr))
+
+    return int(window)
+
+
+def get_group_positions(group_offsets):
+    """
+    Position of each row within its group, and number of rows of its group after it.
+
+    Parameters
+    ----------
+    group_offsets: array-like of int of shape = (n_groups + 1)
+        Group `i` spans rows ``group_offsets[i]:group_offsets[i + 1]``.
+
+    Returns
+    -------
+    positions: np.array of shape = (n_times)
+    remaining: np.array of shape = (n_times)
+    """
+
+    group_offsets = np.asarray(group_offsets, dtype=np.int64)
+    sizes = np.diff(group_offsets)
+    rows = np.arange(group_offsets[-1] - group_offsets[0])
+    positions = rows - np.repeat(group_offsets[:-1] - group_offsets[0], sizes)
+    remaining = np.repeat(sizes, sizes) - positions - 1
+
+    return positions, remaining
+
+
+def check_rolling_statistics(statistics: List):
+    for statistic in statistics:
+        if statistic not in VALID_ROLLING_STATISTICS:
+            raise ValueError('Unexpected rolling statistic: {}. Should be one of: {}'.format(
+                statistic, VALID_ROLLING_STATISTICS))
+
+
+def _compute_rolling_std(values, is_valid, means, counts, window, positions=None):
+    n_times = values.shape[0]
+    squared_deviations = np.zeros_like(values)
+
+    for offset in range(window):
+        current = slice(offset, None)
+        previous = slice(None, max(n_times - offset, 0))
+        previous_is_valid = is_valid[previous]
+
+        if positions is not None and offset:
+            previous_is_valid = previous_is_valid & (positions[current] >= offset)[:, None]
+
+        deviations = np.where(previous_is_valid, values[previous] - means[current], 0)
+        squared_deviations[current] += deviations ** 2
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.sqrt(squared_deviations / np.where(counts > 1, counts - 1, np.nan))
@@ -0,0 +1,174 @@
+from numbers import Real
+from typing import Dict
+
+import numpy as np
+
+VALID_STATISTICS = ['median', 'mean', 'std', 'min', 'max', 'count']
+# Statistics read from the sorted forecasts.
+ORDER_STATISTICS = {'median', 'min', 'max'}
+
+
+class UnexpectedStatistic(ValueError):
+    """
+    This error is raised when an ensemble statistic is unknown
+    """
+
+    def __init__(self, given_statistic):
+        self.given_statistic = str(given_statistic)
+        super(UnexpectedStatistic, self).__init__()
+
+    def __str__(self):
+        return 'Unexpected statistic: {}. Should be one of: {} or a quantile within [0, 1]'.format(
+            self.given_statistic, VALID_STATISTICS)
+
+
+def compute_ensemble_statistics(block: np.ndarray, statistics=('median',), ddof: int = 0) -> Dict:
+    """
+    Compute NaN-aware statistics over an ensemble of forecasts, row by row.
+
+    All the statistics are computed from a single pass over the block: order statistics (median, min, max and
+    quantiles) share one sort of the forecasts, NaNs being sorted last, and moments share one sum.
+
+    Parameters
+    ----------
+    block: np.array of shape = (n_times, n_forecasts)
+        Forecasts of a single variable, NaN when missing.
+    statistics: iterable, optional
+        Statistics among ``'median'``, ``'mean'``, ``'std'``, ``'min'``, ``'max'``, ``'count'`` (number of non
+        missing forecasts), or floats within [0, 1] for quantiles (linear interpolation, as ``np.nanquantile``).
+    ddof: int, optional
+        Delta degrees of freedom of the standard deviation.
+
+    Returns
+    -------
+    statistics: dict
+        Maps each requested statistic to an array of shape = (n_times). Rows without any forecast get NaN (or 0
+        for ``count``).
+
+    Raises
+    ------
+    UnexpectedStatistic
+        If a statistic is not valid.
+    """
+
+    statistics = list(statistics)
+    check_statistics(statistics)
+
+    block = np.asarray(block)
+    if not np.issubdtype(block.dtype, np.floating):
+        block = block.astype(np.float64)
+
+    is_valid = ~np.isnan(block)
+    count = is_valid.sum(axis=1)
+    has_value = count > 0
+    rows = np.arange(block.shape[0])
+    out = {}
+
+    if any(_is_quantile(s) or s in ORDER_STATISTICS for s in statistics):
+        sorted_block = np.sort(block, axis=1)
+        last = np.maximum(count - 1, 0)
+
+        for statistic in statistics:
+            if statistic == 'min':
+                out[statistic] = sorted_block[:, 0]
+
+            elif statistic == 'max':
+                out[statistic] = sorted_block[rows, last]
+
+            elif statistic == 'median':
+                # Mean of the two middle values when the count is even, as np.median.
+                out[statistic] = (sorted_block[rows, last // 2] + sorted_block[rows, (last + 1) // 2]) / 2
+
+            elif _is_quantile(statistic):
+                position = statistic * last
+                low = np.floor(position).astype(int)
+                high = np.ceil(position).astype(int)
+                low_value = sorted_block[rows, low]
+                out[statistic] = low_value + (sorted_block[rows, high] - low_value) * (position - low).astype(
+                    block.dtype)
+
+    if 'mean' in statistics or 'std' in statistics:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(is_valid, block, 0).sum(axis=1) / count
+
+            if 'mean' in statistics:
+                out['mean'] = mean.astype(block.dtype, copy=False)
+
+            if 'std' in statistics:
+                squared_deviation = np.where(is_valid, block - mean[:, None], 0) ** 2
+                variance = squared_deviation.sum(axis=1) / np.maximum(count - ddof, 0)
+                out['std'] = np.sqrt(variance).astype(block.dtype, copy=False)
+
+    if 'count' in statistics:
+        out['count'] = count
+
+    for statistic, values in out.items():
+        if statistic != 'count':
+            values[~has_value] = np.nan
+
+    return {statistic: out[statistic] for statistic in statistics}
+
+
+def compute_segment_statistics(rows: np.ndarray, values: np.ndarray, n_times: int, statistics=('median',),
+                               ddof: int = 0) -> Dict:
+    """
+    Compute statistics over an ensemble of forecasts given as its non missing cells only, row by row.
+
+    Sparse counterpart of `compute_ensemble_statistics`, with the same output: the cells are stably sorted by row,
+    then scattered into a compact (time x forecast) block as wide as the largest number of forecasts of a row,
+    instead of the number of forecast columns. Cells given column by column (as packed forecasts) are sorted runs,
+    which the stable sort merges in ``O(n_cells * log(n_columns))``.
+
+    Parameters
+    ----------
+    rows: np.array of int of shape = (n_cells)
+        Row of each cell.
+    values: np.array of shape = (n_cells)
+        Non missing forecasts.
+    n_times: int
+        Number of rows.
+    statistics: iterable, optional
+        See `compute_ensemble_statistics`.
+    ddof: int, optional
+        Delta degrees of freedom of the standard deviation.
+
+    Returns
+    -------
+    statistics: dict
+        See `compute_ensemble_statistics`.
+    """
+
+    values = np.asarray(values)
+    if not np.issubdtype(values.dtype, np.floating):
+        values = values.astype(np.float64)
+
+    order = np.argsort(rows, kind='stable')
+    rows = rows[order]
+    count = np.bincount(rows, minlength=n_times)
+    starts = np.cumsum(count) - count
+
+    block = np.full((n_times, max(count.max(initial=0), 1)), np.nan, dtype=values.dtype)
+    block[rows, np.arange(len(rows)) - starts[rows]] = values[order]
+
+    return compute_ensemble_statistics(block, statistics, ddof=ddof)
+
+
+def check_statistics(statistics):
+    for statistic in statistics:
+        if not (statistic in VALID_STATISTICS or _is_quantile(statistic)):
+            raise UnexpectedStatistic(statistic)
+
+
+def get_statistic_suffix(statistic) -> str:
+    """
+    Suffix of the column storing an ensemble statistic, e.g. ``'mean'`` or ``'q10'`` for the 0.1 quantile.
+    """
+
+    if _is_quantile(statistic):
+        return 'q{:g}'.format(100 * statistic)
+
+    return statistic
+
+
+def _is_quantile(statistic):
+    return isinstance(statistic, Real) and not isinstance(statistic, bool) and 0 <= statistic <= 1
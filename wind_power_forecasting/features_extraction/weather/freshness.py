@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+HOUR = pd.Timedelta('1H')
+
+
+def get_issue_hours(run_hours, day_offsets) -> np.ndarray:
+    """
+    Issue times of forecasts, in hours from the start of their target day.
+
+    A run of `run_hour` issued `day_offset` days from the target day (e.g. ``NWP1_18h_D-1``) is issued at
+    ``day_offset * 24 + run_hour`` (e.g. -6: 6 hours before the target day starts).
+
+    Parameters
+    ----------
+    run_hours: array-like of int
+    day_offsets: array-like of int
+
+    Returns
+    -------
+    issue_hours: np.array of float
+    """
+
+    return 24. * np.asarray(day_offsets) + np.asarray(run_hours)
+
+
+def get_max_issue_hours(index: pd.DatetimeIndex, cutoff='0H', min_lead=None) -> np.ndarray:
+    """
+    Latest issue time (in hours from the start of the target day) of the forecasts usable for each target time.
+
+    Parameters
+    ----------
+    index: pandas DatetimeIndex object
+        Target times.
+    cutoff: str or Timedelta, optional
+        Forecasts have to be issued strictly before the start of the target day plus `cutoff`. By default, only the
+        runs of the previous days are used.
+    min_lead: str or Timedelta, optional
+        If given, forecasts also have to be issued at least `min_lead` before the target time.
+
+    Returns
+    -------
+    max_issue_hours: np.array of shape = (n_times)
+        Forecasts issued at most at these times are usable.
+    """
+
+    # The cutoff is strict: the largest float below it.
+    max_issue_hours = np.full(len(index), np.nextafter(pd.Timedelta(cutoff) / HOUR, -np.inf))
+
+    if min_lead is not None:
+        hours_in_day = (index - index.normalize()) / HOUR
+        max_issue_hours = np.minimum(max_issue_hours, np.asarray(hours_in_day) - pd.Timedelta(min_lead) / HOUR)
+
+    return max_issue_hours
+
+
+def compute_most_recent_forecasts(block: np.ndarray, issue_hours, max_issue_hours=None, k: int = 1):
+    """
+    Values of the `k` most recent available forecasts of each row.
+
+    Forecasts are ordered once by decreasing issue time (the first ones in the block first, in case of a tie). A
+    forecast is available if it's not missing and issued at most at the latest issue time of its row. The rank of
+    each available forecast is then a cumulated sum over the row, and the forecasts of each rank are gathered with
+    fancy indexing, in a single pass over the block.
+
+    Parameters
+    ----------
+    block: np.array of shape = (n_times, n_forecasts)
+        Forecasts of a single variable, NaN when missing.
+    issue_hours: array-like of shape = (n_forecasts)
+        Issue times of the forecasts, see `get_issue_hours`.
+    max_issue_hours: array-like of shape = (n_times), optional
+        Latest issue time of the usable forecasts of each row, see `get_max_issue_hours`. By default, all the
+        forecasts are usable.
+    k: int, optional
+        Number of forecasts.
+
+    Returns
+    -------
+    values: np.array of shape = (n_times, k)
+        From the most recent forecast to the least recent one, NaN when less than `k` forecasts are available.
+    issue_hours: np.array of shape = (n_times, k)
+        Issue times of these forecasts, NaN when they are missing.
+
+    Raises
+    ------
+    ValueError
+        If `k` is not positive.
+    """
+
+    if k < 1:
+        raise ValueError('k should be positive, got: {}'.format(k))
+
+    issue_hours = np.asarray(issue_hours, dtype=np.float64)
+    order = np.argsort(-issue_hours, kind='stable')
+    block = block[:, order]
+    issue_hours = issue_hours[order]
+    n_times, n_forecasts = block.shape
+
+    is_available = ~np.isnan(block)
+
+    if max_issue_hours is not None:
+        is_available &= issue_hours[None, :] <= np.asarray(max_issue_hours)[:, None]
+
+    values = np.full((n_times, k), np.nan, dtype=np.result_type(block, np.float16))
+    selected_issue_hours = np.full((n_times, k), np.nan)
+
+    if not n_forecasts:
+        return values, selected_issue_hours
+
+    ranks = np.cumsum(is_available, axis=1, dtype=np.int32)
+    rows = np.arange(n_times)
+
+    for rank in range(k):
+        has_forecast = ranks[:, -1] > rank
+        # First forecast of this rank (argmax returns the first True).
+        positions = np.argmax(is_available & (ranks == rank + 1), axis=1)[has_forecast]
+
+        values[has_forecast, rank] = block[rows[has_forecast], positions]
+        selected_issue_hours[has_forecast, rank] = issue_hours[positions]
+
+    return values, selected_issue_hours
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from wind_power_forecasting.features_extraction.weather.ensemble import compute_ensemble_statistics, \
+    UnexpectedStatistic
+
+
+class TestComputeEnsembleStatistics:
+
+    @pytest.mark.filterwarnings('ignore::RuntimeWarning')
+    def test_ok(self):
+        block = np.array([[1, 2, np.nan, 4],
+                          [np.nan, np.nan, np.nan, np.nan],
+                          [3, np.nan, 1, np.nan],
+                          [5, 5, 5, 5]])
+
+        output = compute_ensemble_statistics(block, ['median', 'mean', 'std', 'min', 'max', 'count', 0.25])
+
+        np.testing.assert_array_equal(output['median'], [2, np.nan, 2, 5])
+        np.testing.assert_array_equal(output['mean'], [7 / 3, np.nan, 2, 5])
+        np.testing.assert_allclose(output['std'], np.nanstd(block, axis=1))
+        np.testing.assert_array_equal(output['min'], [1, np.nan, 1, 5])
+        np.testing.assert_array_equal(output['max'], [4, np.nan, 3, 5])
+        np.testing.assert_array_equal(output['count'], [3, 0, 2, 4])
+        np.testing.assert_allclose(output[0.25], [1.5, np.nan, 1.5, 5])
+
+    def test_same_as_numpy(self):
+        rng = np.random.RandomState(0)
+        block = rng.randn(100, 7)
+        block[rng.rand(*block.shape) < 0.4] = np.nan
+
+        output = compute_ensemble_statistics(block, ['median', 0.1, 0.9])
+
+        np.testing.assert_array_equal(output['median'], np.nanmedian(block, axis=1))
+        np.testing.assert_allclose(output[0.1], np.nanquantile(block, 0.1, axis=1))
+        np.testing.assert_allclose(output[0.9], np.nanquantile(block, 0.9, axis=1))
+
+    def test_keep_dtype(self):
+        block = np.array([[1, 2, np.nan], [3, 4, 5]], dtype=np.float32)
+
+        output = compute_ensemble_statistics(block, ['median', 'mean', 'std'])
+
+        assert all(values.dtype == np.float32 for values in output.values())
+
+    def test_unexpected_statistic(self):
+        with pytest.raises(UnexpectedStatistic):
+            compute_ensemble_statistics(np.zeros((2, 2)), ['mode'])
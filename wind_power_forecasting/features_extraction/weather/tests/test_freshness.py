@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from wind_power_forecasting.features_extraction.weather.freshness import compute_most_recent_forecasts, \
+    get_issue_hours, get_max_issue_hours
+
+
+class TestComputeMostRecentForecasts:
+
+    def test_same_as_loop(self):
+        rng = np.random.RandomState(0)
+        index = pd.date_range('2018-01-01', periods=48, freq='H')
+        issue_hours = get_issue_hours([0, 12, 0, 12, 18], [-2, -2, -1, -1, -1])
+        block = rng.randn(48, 5)
+        block[rng.rand(48, 5) < 0.4] = np.nan
+        max_issue_hours = get_max_issue_hours(index, min_lead='30H')
+
+        values, selected_issue_hours = compute_most_recent_forecasts(block, issue_hours, max_issue_hours, k=2)
+
+        for row in range(48):
+            available = [(-issue_hours[i], i) for i in range(5)
+                         if not np.isnan(block[row, i]) and issue_hours[i] <= max_issue_hours[row]]
+            expected = [block[row, i] for _, i in sorted(available)[:2]]
+            expected += [np.nan] * (2 - len(expected))
+            np.testing.assert_array_equal(values[row], expected)
+
+        assert np.all(np.isnan(values) == np.isnan(selected_issue_hours))
+        # Runs of the target day are never used, and the lead time is respected.
+        hours_in_day = np.tile(np.arange(24), 2)
+        assert np.all((selected_issue_hours < 0) | np.isnan(selected_issue_hours))
+        assert np.all((hours_in_day[:, None] - selected_issue_hours >= 30) | np.isnan(selected_issue_hours))
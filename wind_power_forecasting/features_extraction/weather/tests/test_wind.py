@@ -0,0 +1,44 @@
+import numpy as np
+
+from wind_power_forecasting.features_extraction.weather.wind import compute_wind_features, compute_wind_speed, \
+    compute_wind_vector_azimuth, compute_meteorological_wind_direction
+
+
+class TestComputeWindFeatures:
+
+    def test_same_as_single_features(self):
+        rng = np.random.RandomState(0)
+        u = rng.randn(1000, 3) * 5
+        v = rng.randn(1000, 3) * 5
+        u[:4, 0] = [0., -0., 0., np.nan]
+        v[:4, 0] = [1., 0., -1., 2.]
+
+        output = compute_wind_features(u, v)
+
+        for pair in range(u.shape[1]):
+            # Contiguous columns, as the ones of a dataframe: for a strided column, NumPy may use its scalar arctan2
+            # instead of its SIMD one (which can differ by an ulp), depending on where the output gets allocated.
+            u_pair, v_pair = u[:, pair].copy(), v[:, pair].copy()
+            np.testing.assert_array_equal(output[:, 0, pair], compute_wind_speed(u_pair, v_pair))
+            np.testing.assert_array_equal(output[:, 1, pair], compute_wind_vector_azimuth(u_pair, v_pair))
+            np.testing.assert_allclose(output[:, 2, pair], compute_meteorological_wind_direction(u_pair, v_pair),
+                                       rtol=0, atol=1e-12)
+
+    def test_independent_of_memory_layout(self):
+        rng = np.random.RandomState(0)
+        u = rng.randn(1000, 3) * 5
+        v = rng.randn(1000, 3) * 5
+
+        # The output right after u in memory.
+        buffer = np.empty(u.size + 3 * u.size)
+        adjacent_u = buffer[:u.size].reshape(u.shape)
+        adjacent_u[:] = u
+        adjacent_out = buffer[u.size:].reshape((1000, 3, 3), order='F')
+
+        np.testing.assert_array_equal(compute_wind_features(adjacent_u, v, out=adjacent_out),
+                                      compute_wind_features(u, v))
+
+    def test_keep_dtype(self):
+        u = np.ones((5, 2), dtype=np.float32)
+
+        assert compute_wind_features(u, u).dtype == np.float32
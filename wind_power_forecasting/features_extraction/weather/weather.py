@@ -1,23 +1,254 @@
-from wind_power_forecasting import TIME_LABEL
-from wind_power_forecasting.preprocessing.numerical_weather_prediction import format_nwp
+import numpy as np
+import pandas as pd
 
+from wind_power_forecasting.features_extraction.weather.ensemble import get_statistic_suffix, check_statistics
+from wind_power_forecasting.features_extraction.weather.freshness import compute_most_recent_forecasts, \
+    get_issue_hours, get_max_issue_hours
+from wind_power_forecasting.features_extraction.weather.wind import compute_wind_features, WIND_FEATURES
+from wind_power_forecasting.preprocessing.numerical_weather_prediction import NumericalWeatherPredictionTensor
 
-def add_numerical_weather_prediction_median(df):
-    # Here copy_or_not_copy doesn't work
-    wp_number_label = 'wp_number'
-    wp_hour_label = 'wp_hour'
-    wp_day_offset_label = 'wp_day_offset'
-    w_feature_label = 'w_feature'
-    wp_label = 'wp_value'
 
-    nwp_df = format_nwp(df, wp_number_label, wp_hour_label, wp_day_offset_label, w_feature_label, wp_label, copy=True)
+def add_numerical_weather_prediction_median(df, max_day_offset=-1, dtype=None, variables=None, drop_empty=True,
+                                            nwp=None):
+    """
+    Add the median of all the NWP forecasts of each variable (one column per variable, e.g. ``U``, ``V``...).
 
-    nwp_df = nwp_df. \
-        groupby([TIME_LABEL, w_feature_label]). \
-        wp_value. \
-        median(). \
-        reset_index(). \
-        set_index(TIME_LABEL). \
-        pivot(columns=w_feature_label, values=wp_label)
+    Parameters
+    ----------
+    {df}
+    max_day_offset: int, optional
+        Only the forecasts from runs issued at most `max_day_offset` days from the target day are used. By default,
+        the runs of the target day are ignored.
+    dtype: numpy dtype, optional
+        Dtype of the added columns. By default, the one of the NWP columns.
+    variables: list, optional
+        Variables to process. By default, all the forecast variables.
+    drop_empty: bool, optional
+        If `True` (**default**), variables without any forecast are not added.
+    nwp: NumericalWeatherPredictionTensor or PackedNumericalWeatherPredictions, optional
+        Forecasts of the rows of `df`. By default, read from the NWP columns of `df`.
 
-    return df.join(nwp_df, how='left')
+    Returns
+    -------
+    {df} A new dataframe, with the added columns.
+    """
+
+    return add_numerical_weather_prediction_statistics(df, statistics=['median'], max_day_offset=max_day_offset,
+                                                       dtype=dtype, variables=variables, drop_empty=drop_empty,
+                                                       nwp=nwp)
+
+
+def add_numerical_weather_prediction_statistics(df, statistics=('median',), max_day_offset=-1, ddof=0, dtype=None,
+                                                variables=None, drop_empty=True, nwp=None):
+    """
+    Add ensemble statistics of all the NWP forecasts of each variable.
+
+    Statistics are computed directly over the (time x forecast) block of each variable (see
+    `compute_ensemble_statistics`), or over its non missing forecasts only for packed forecasts (see
+    `compute_segment_statistics`). The median is labelled by the variable itself (e.g. ``U``) as it is the value
+    used downstream as the variable, other statistics are suffixed (e.g. ``U_std``, ``U_q10``, ``U_count``).
+
+    Parameters
+    ----------
+    {df}
+    statistics: iterable, optional
+        Statistics among ``'median'``, ``'mean'``, ``'std'``, ``'min'``, ``'max'``, ``'count'``, or floats within
+        [0, 1] for quantiles.
+    max_day_offset: int, optional
+        Only the forecasts from runs issued at most `max_day_offset` days from the target day are used. By default,
+        the runs of the target day are ignored.
+    ddof: int, optional
+        Delta degrees of freedom of the standard deviation.
+    dtype: numpy dtype, optional
+        Dtype of the added columns (``count`` included). By default, the one of the NWP columns.
+    variables: list, optional
+        Variables to process. By default, all the forecast variables.
+    drop_empty: bool, optional
+        If `True` (**default**), variables without any forecast are not added.
+    nwp: NumericalWeatherPredictionTensor or PackedNumericalWeatherPredictions, optional
+        Forecasts of the rows of `df`. By default, read from the NWP columns of `df`.
+
+    Returns
+    -------
+    {df} A new dataframe, with the added columns.
+    """
+
+    check_statistics(statistics)
+
+    if nwp is None:
+        nwp = NumericalWeatherPredictionTensor.from_frame(df, dtype=dtype)
+
+    added = {}
+
+    if variables is None:
+        variables = nwp.variables
+
+    for variable in variables:
+        if drop_empty and not nwp.count_forecasts(variable, max_day_offset=max_day_offset):
+            continue
+
+        for statistic, values in nwp.compute_variable_statistics(variable, statistics, max_day_offset=max_day_offset,
+                                                                 ddof=ddof).items():
+            if dtype is not None:
+                values = values.astype(dtype, copy=False)
+
+            added[get_numerical_weather_prediction_label(variable, statistic)] = values
+
+    return pd.concat([df, pd.DataFrame(added, index=df.index)], axis=1)
+
+
+def add_numerical_weather_prediction_wind_features(df, max_day_offset=-1, dtype=None, models=None, drop_empty=True,
+                                                   nwp=None):
+    """
+    Add the wind features of each NWP model, computed from its median ``U`` and ``V`` forecasts (e.g.
+    ``wind_speed_NWP1``).
+
+    The medians of all the models are stacked into a single (time x model) block for each of ``U`` and ``V``, then
+    the wind features of all the models are computed at once, see `compute_wind_features`.
+
+    Parameters
+    ----------
+    {df}
+    max_day_offset: int, optional
+        Only the forecasts from runs issued at most `max_day_offset` days from the target day are used. By default,
+        the runs of the target day are ignored.
+    dtype: numpy dtype, optional
+        Dtype of the added columns. By default, the one of the NWP columns.
+    models: list, optional
+        Models to process. By default, all the models forecasting both ``U`` and ``V``.
+    drop_empty: bool, optional
+        If `True` (**default**), models without any ``U`` or ``V`` forecast are not added.
+    nwp: NumericalWeatherPredictionTensor or PackedNumericalWeatherPredictions, optional
+        Forecasts of the rows of `df`. By default, read from the NWP columns of `df`.
+
+    Returns
+    -------
+    {df} A new dataframe, with the added columns.
+    """
+
+    if nwp is None:
+        nwp = NumericalWeatherPredictionTensor.from_frame(df, dtype=dtype)
+
+    if models is None:
+        models = get_numerical_weather_prediction_wind_models(nwp, max_day_offset)
+
+    u_medians, v_medians, kept_models = [], [], []
+
+    for model in models:
+        if drop_empty and not (nwp.count_forecasts('U', max_day_offset=max_day_offset, model=model)
+                               and nwp.count_forecasts('V', max_day_offset=max_day_offset, model=model)):
+            continue
+
+        u_medians.append(nwp.compute_variable_statistics('U', max_day_offset=max_day_offset, model=model)['median'])
+        v_medians.append(nwp.compute_variable_statistics('V', max_day_offset=max_day_offset, model=model)['median'])
+        kept_models.append(model)
+
+    if not kept_models:
+        return df
+
+    block = compute_wind_features(np.column_stack(u_medians), np.column_stack(v_medians))
+    added = {get_numerical_weather_prediction_wind_label(feature, model): block[:, feature_idx, model_idx]
+             for model_idx, model in enumerate(kept_models) for feature_idx, feature in enumerate(WIND_FEATURES)}
+
+    return pd.concat([df, pd.DataFrame(added, index=df.index)], axis=1)
+
+
+def add_numerical_weather_prediction_most_recent(df, k=1, cutoff='0H', min_lead=None, dtype=None, variables=None,
+                                                 by_model=False, add_age=False, drop_empty=True, nwp=None):
+    """
+    Add the values of the `k` most recent forecasts of each variable available for each target time, e.g.
+    ``U_fresh1`` for the most recent one.
+
+    Forecasts are only usable if issued before a cutoff (and a minimal lead time before the target time, if any),
+    so the features don't use forecasts unknown when predicting, see `compute_most_recent_forecasts`.
+
+    Parameters
+    ----------
+    {df}
+    k: int, optional
+        Number of forecasts per variable.
+    cutoff: str or Timedelta, optional
+        See `get_max_issue_hours`. By default, the runs of the target day are ignored, as for the median.
+    min_lead: str or Timedelta, optional
+        See `get_max_issue_hours`.
+    dtype: numpy dtype, optional
+        Dtype of the added columns. By default, the one of the NWP columns.
+    variables: list, optional
+        Variables to process. By default, all the forecast variables.
+    by_model: bool, optional
+        If `True`, the forecasts of each model are selected separately (e.g. ``U_NWP1_fresh1``).
+    add_age: bool, optional
+        If `True`, also add the time (in hours) between the issue of each forecast and the target time (e.g.
+        ``U_fresh1_age``).
+    drop_empty: bool, optional
+        If `True` (**default**), variables (or models) without any forecast are not added.
+    nwp: NumericalWeatherPredictionTensor or PackedNumericalWeatherPredictions, optional
+        Forecasts of the rows of `df`. By default, read from the NWP columns of `df`.
+
+    Returns
+    -------
+    {df} A new dataframe, with the added columns.
+    """
+
+    if nwp is None:
+        nwp = NumericalWeatherPredictionTensor.from_frame(df, dtype=dtype)
+
+    max_issue_hours = get_max_issue_hours(df.index, cutoff=cutoff, min_lead=min_lead)
+    hours_in_day = np.asarray((df.index - df.index.normalize()) / pd.Timedelta('1H'))
+    added = {}
+
+    if variables is None:
+        variables = nwp.variables
+
+    for variable in variables:
+        models = nwp.models if by_model else [None]
+
+        for model in models:
+            _, run_hours, day_offsets = nwp.get_variable_coordinates(variable, model=model)
+            issue_hours = get_issue_hours(run_hours, day_offsets)
+            # Forecasts issued after the cutoff are never usable.
+            is_usable = issue_hours < pd.Timedelta(cutoff) / pd.Timedelta('1H')
+            block = nwp.get_variable_block(variable, model=model)[:, is_usable]
+
+            if drop_empty and np.isnan(block).all():
+                continue
+
+            values, issue_hours = compute_most_recent_forecasts(block, issue_hours[is_usable],
+                                                                max_issue_hours=max_issue_hours, k=k)
+
+            for rank in range(k):
+                label = get_numerical_weather_prediction_most_recent_label(variable, rank + 1, model)
+                added[label] = values[:, rank] if dtype is None else values[:, rank].astype(dtype, copy=False)
+
+                if add_age:
+                    age = hours_in_day - issue_hours[:, rank]
+                    added[label + '_age'] = age if dtype is None else age.astype(dtype, copy=False)
+
+    return pd.concat([df, pd.DataFrame(added, index=df.index)], axis=1)
+
+
+def get_numerical_weather_prediction_most_recent_label(variable, rank, model=None) -> str:
+    return variable + ('' if model is None else '_' + model) + '_fresh' + str(rank)
+
+
+def get_numerical_weather_prediction_wind_models(nwp: NumericalWeatherPredictionTensor, max_day_offset=-1) -> list:
+    """Models having at least one ``U`` and one ``V`` forecast."""
+
+    if 'U' not in nwp.variables or 'V' not in nwp.variables:
+        return []
+
+    has_u = nwp.get_variable_mask('U', max_day_offset).any(axis=(1, 2))
+    has_v = nwp.get_variable_mask('V', max_day_offset).any(axis=(1, 2))
+
+    return [model for model, has_wind in zip(nwp.models, has_u & has_v) if has_wind]
+
+
+def get_numerical_weather_prediction_wind_label(feature, model) -> str:
+    return feature + '_' + model
+
+
+def get_numerical_weather_prediction_label(variable, statistic) -> str:
+    if statistic == 'median':
+        return variable
+
+    return variable + '_' + get_statistic_suffix(statistic)
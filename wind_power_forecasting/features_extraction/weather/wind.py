@@ -1,52 +1,150 @@
 import numpy as np
+import pandas as pd
 from sklearn.utils import check_consistent_length, check_array
 
+from wind_power_forecasting import WIND_SPEED_LABEL, WIND_VECTOR_AZIMUTH_LABEL, METEOROLOGICAL_WIND_DIRECTION_LABEL
 from wind_power_forecasting.utils.dataframe import copy_or_not_copy
 
+# Features computed by `compute_wind_features`, in order.
+WIND_FEATURES = [WIND_SPEED_LABEL, WIND_VECTOR_AZIMUTH_LABEL, METEOROLOGICAL_WIND_DIRECTION_LABEL]
 
-def add_wind_speed(df, u_label, v_label, wind_speed_label='wind_speed', copy=True):
+
+def add_wind_features(df, u_labels, v_labels, label_suffixes=None, copy=True, dtype='numeric'):
+    """
+    Add the wind speed, vector azimuth and meteorological direction of several (U, V) pairs, see
+    `compute_wind_features`.
+
+    Parameters
+    ----------
+    {df}
+    u_labels: list of str
+    v_labels: list of str
+        Same length as `u_labels`.
+    label_suffixes: list of str, optional
+        Suffix of the labels of the features of each pair (e.g. ``wind_speed_NWP1`` for ``'_NWP1'``). By default,
+        features are not suffixed, which is only possible for a single pair.
+    copy: bool, optional
+        Only kept for backward compatibility: the output is always a new dataframe.
+    dtype: str, type or None
+        See `sklearn.utils.check_array`.
+
+    Returns
+    -------
+    {df} A new dataframe, with the added columns (replacing the existing ones of the same labels).
+    """
+
+    if label_suffixes is None:
+        if len(u_labels) != 1:
+            raise ValueError('label_suffixes has to be provided when there are several pairs.')
+        label_suffixes = ['']
+
+    check_consistent_length(u_labels, v_labels, label_suffixes)
+
+    u = check_array(df.loc[:, list(u_labels)], force_all_finite=False, dtype=dtype)
+    v = check_array(df.loc[:, list(v_labels)], force_all_finite=False, dtype=dtype)
+    block = compute_wind_features(u, v)
+
+    # The features of each pair, one after the other, attached with a single concatenation.
+    labels = [feature + suffix for suffix in label_suffixes for feature in WIND_FEATURES]
+    features_df = pd.DataFrame(block.transpose(0, 2, 1).reshape(len(block), -1), index=df.index, columns=labels)
+
+    return pd.concat([df.drop(columns=[label for label in labels if label in df]), features_df], axis=1)
+
+
+def compute_wind_features(u, v, out=None) -> np.ndarray:
+    """
+    Compute the wind speed, vector azimuth and meteorological direction of a block of (U, V) pairs in a single pass.
+
+    The direction is derived from the azimuth (opposite direction) instead of computing a second ``arctan2``, and
+    all the features are written into a single block.
+
+    Parameters
+    ----------
+    u: np.array of shape = (n_times, n_pairs)
+    v: np.array of shape = (n_times, n_pairs)
+    out: np.array of shape = (n_times, 3, n_pairs), optional
+        Block where the output is written. Column-major (``order='F'``) blocks make each feature of each pair
+        contiguous.
+
+    Returns
+    -------
+    block: np.array of shape = (n_times, 3, n_pairs)
+        Speed, azimuth and direction (in degrees, within [-180, 180]) of each pair.
+    """
+
+    u = np.asarray(u)
+    v = np.asarray(v)
+
+    if u.shape != v.shape or u.ndim != 2:
+        raise ValueError('u and v should be 2D arrays of the same shape, got: {} and {}'.format(u.shape, v.shape))
+
+    if out is None:
+        out = np.empty((u.shape[0], len(WIND_FEATURES), u.shape[1]), dtype=np.result_type(u, v, np.float16),
+                       order='F')
+
+    speed, azimuth, direction = out[:, 0], out[:, 1], out[:, 2]
+
+    # The direction is used as buffer before being computed.
+    np.square(u, out=speed)
+    np.square(v, out=direction)
+    np.add(speed, direction, out=speed)
+    np.sqrt(speed, out=speed)
+
+    np.arctan2(u, v, out=azimuth)
+    np.degrees(azimuth, out=azimuth)
+
+    # Same as np.degrees(np.arctan2(-u, -v)) up to rounding, signed zeros included: +0 -> -180, -0 -> 180.
+    np.copysign(180, azimuth, out=direction)
+    np.subtract(azimuth, direction, out=direction)
+
+    return out
+
+
+def add_wind_speed(df, u_label, v_label, wind_speed_label='wind_speed', copy=True, dtype='numeric'):
     df = copy_or_not_copy(df, copy)
 
-    df[wind_speed_label] = compute_wind_speed(df[u_label], df[v_label])
+    df[wind_speed_label] = compute_wind_speed(df[u_label], df[v_label], dtype=dtype)
 
     return df
 
 
-def add_wind_vector_azimuth(df, u_label, v_label, wind_speed_label='wind_vector_azimuth', copy=True):
+def add_wind_vector_azimuth(df, u_label, v_label, wind_speed_label='wind_vector_azimuth', copy=True, dtype='numeric'):
     df = copy_or_not_copy(df, copy)
 
-    df[wind_speed_label] = compute_wind_vector_azimuth(df[u_label], df[v_label])
+    df[wind_speed_label] = compute_wind_vector_azimuth(df[u_label], df[v_label], dtype=dtype)
 
     return df
 
 
 def add_meteorological_wind_direction(df, u_label, v_label,
-                                      meteorological_wind_direction_label='meteorological_wind_direction', copy=True):
+                                      meteorological_wind_direction_label='meteorological_wind_direction', copy=True,
+                                      dtype='numeric'):
     df = copy_or_not_copy(df, copy)
 
-    df[meteorological_wind_direction_label] = compute_meteorological_wind_direction(df[u_label], df[v_label])
+    df[meteorological_wind_direction_label] = compute_meteorological_wind_direction(df[u_label], df[v_label],
+                                                                                    dtype=dtype)
 
     return df
 
 
-def compute_wind_speed(u, v):
-    u = check_array(u, ensure_2d=False, force_all_finite=False)
-    v = check_array(v, ensure_2d=False, force_all_finite=False)
+def compute_wind_speed(u, v, dtype='numeric'):
+    u = check_array(u, ensure_2d=False, force_all_finite=False, dtype=dtype)
+    v = check_array(v, ensure_2d=False, force_all_finite=False, dtype=dtype)
     check_consistent_length(u, v)
 
     return np.sqrt(np.square(u) + np.square(v))
 
 
-def compute_wind_vector_azimuth(u, v):
-    u = check_array(u, ensure_2d=False, force_all_finite=False)
-    v = check_array(v, ensure_2d=False, force_all_finite=False)
+def compute_wind_vector_azimuth(u, v, dtype='numeric'):
+    u = check_array(u, ensure_2d=False, force_all_finite=False, dtype=dtype)
+    v = check_array(v, ensure_2d=False, force_all_finite=False, dtype=dtype)
     check_consistent_length(u, v)
     return np.degrees(np.arctan2(u, v))
 
 
-def compute_meteorological_wind_direction(u, v):
-    u = check_array(u, ensure_2d=False, force_all_finite=False)
-    v = check_array(v, ensure_2d=False, force_all_finite=False)
+def compute_meteorological_wind_direction(u, v, dtype='numeric'):
+    u = check_array(u, ensure_2d=False, force_all_finite=False, dtype=dtype)
+    v = check_array(v, ensure_2d=False, force_all_finite=False, dtype=dtype)
     check_consistent_length(u, v)
     return np.degrees(np.arctan2(-u, -v))
 
@@ -0,0 +1,204 @@
+from typing import Dict
+
+import numpy as np
+from scipy.cluster.hierarchy import fcluster, linkage
+from scipy.spatial.distance import squareform
+from sklearn.base import BaseEstimator
+from sklearn.feature_selection.base import SelectorMixin
+from sklearn.utils import check_array
+from sklearn.utils.validation import check_is_fitted
+
+from wind_power_forecasting.features_selection.covariance import CovarianceAccumulator
+
+VALID_REPRESENTATIVES = ['central', 'variance', 'first']
+
+
+class CorrelationClusterThreshold(BaseEstimator, SelectorMixin):
+    """
+    Feature selector that keeps a single representative of each cluster of correlated features.
+
+    Features are clustered hierarchically on the ``1 - |correlation|`` distance, and the clusters are cut at
+    ``1 - threshold``: with the (default) complete linkage, all the features of a cluster are correlated by at least
+    `threshold`. It is a cheap pre-selection before the variance inflation factor one, which then only has to process
+    the representatives.
+
+    Parameters
+    ----------
+    threshold: float, optional
+        Minimal absolute correlation within a cluster.
+    representative: str, optional
+        Feature kept in each cluster:
+
+        + ``'central'`` (**default**): the one with the highest absolute correlation with the others.
+        + ``'variance'``: the one with the highest variance.
+        + ``'first'``: the first one, in the order of the features.
+    method: str, optional
+        Linkage method, see `scipy.cluster.hierarchy.linkage`.
+
+    Attributes
+    ----------
+    cluster_ids: np.array of int of shape = (n_features)
+        Cluster of each feature, from 1.
+    is_removed: np.array of bool of shape = (n_features)
+        Features which are not the representative of their cluster.
+    kept_labels: list or None
+        In case where input data (`X`) where a pandas DataFrame object, store the conserved columns labels.
+    labels: list or None
+        Labels of all the features.
+    """
+
+    def __init__(self, threshold=0.95, representative='central', method='complete'):
+        self.threshold = threshold
+        self.representative = representative
+        self.method = method
+
+    def fit(self, X, y=None):
+        """
+        Cluster the features and select their representatives
+
+        Parameters
+        ----------
+        {X}
+        y : any
+            Ignored. This parameter exists only for compatibility with
+            sklearn.pipeline.Pipeline.
+
+        Returns
+        -------
+        self: returns an instance of self.
+        """
+
+        # Missing values raise, as with the other selectors (the accumulator would ignore their rows).
+        check_array(X, ('csr', 'csc'), dtype=np.float64)
+
+        return self.fit_covariance(CovarianceAccumulator().partial_fit(X))
+
+    def fit_covariance(self, covariance: CovarianceAccumulator, labels=None):
+        """
+        Cluster the features from accumulated statistics, e.g. of data read by chunks
+
+        Parameters
+        ----------
+        covariance: CovarianceAccumulator
+        labels: list, optional
+            If given, only these features are selected from (the ones of the chunks by default).
+
+        Returns
+        -------
+        self: returns an instance of self.
+
+        Raises
+        ------
+        ValueError
+            If the representative rule is unknown.
+        """
+
+        if self.representative not in VALID_REPRESENTATIVES:
+            raise ValueError('Unexpected representative: {}. Should be one of: {}'.format(self.representative,
+                                                                                        VALID_REPRESENTATIVES))
+
+        if labels is None and covariance.labels is not None:
+            labels = list(covariance.labels)
+
+        abs_corr = np.abs(covariance.get_correlation(labels))
+        self.cluster_ids = cluster_correlated_features(abs_corr, self.threshold, self.method)
+
+        if self.representative == 'central':
+            scores = get_cluster_centralities(abs_corr, self.cluster_ids)
+        elif self.representative == 'variance':
+            scores = covariance.get_variances(labels)
+        else:
+            scores = np.zeros(len(abs_corr))
+
+        representatives = get_cluster_representatives(self.cluster_ids, scores)
+        self.is_removed = np.repeat(True, len(abs_corr))
+        self.is_removed[representatives] = False
+        self.labels = labels
+        self.kept_labels = None if labels is None else [label for label, is_removed in zip(labels, self.is_removed)
+                                                        if not is_removed]
+
+        return self
+
+    def get_clusters(self) -> Dict:
+        """
+        Members of each cluster.
+
+        Returns
+        -------
+        clusters: dict
+            Maps the representative of each cluster to all its members (itself included), by label if the features
+            have labels, by position otherwise.
+        """
+
+        check_is_fitted(self, ['cluster_ids'])
+        names = np.arange(len(self.cluster_ids)) if self.labels is None else np.array(self.labels, dtype=object)
+        members = {cluster_id: names[self.cluster_ids == cluster_id].tolist()
+                   for cluster_id in np.unique(self.cluster_ids)}
+
+        return {names[position]: members[self.cluster_ids[position]] for position in np.flatnonzero(~self.is_removed)}
+
+    def _get_support_mask(self):
+        check_is_fitted(self, ['is_removed'])
+
+        return ~self.is_removed
+
+
+def cluster_correlated_features(abs_corr: np.ndarray, threshold=0.95, method='complete') -> np.ndarray:
+    """
+    Cluster features hierarchically on the ``1 - |correlation|`` distance, see `CorrelationClusterThreshold`.
+
+    Parameters
+    ----------
+    abs_corr: np.array of shape = (n_features, n_features)
+        Absolute correlations of the features.
+    threshold: float, optional
+    method: str, optional
+
+    Returns
+    -------
+    cluster_ids: np.array of int of shape = (n_features)
+    """
+
+    n_features = len(abs_corr)
+
+    if n_features < 2:
+        return np.ones(n_features, dtype=np.int32)
+
+    distances = np.clip(1. - abs_corr, 0., 1.)
+    np.fill_diagonal(distances, 0.)
+    tree = linkage(squareform(distances, checks=False), method=method)
+
+    return fcluster(tree, t=1. - threshold, criterion='distance').astype(np.int32)
+
+
+def get_cluster_centralities(abs_corr: np.ndarray, cluster_ids: np.ndarray) -> np.ndarray:
+    """Sum of the absolute correlations of each feature with the other features of its cluster."""
+
+    is_same_cluster = cluster_ids[:, None] == cluster_ids[None, :]
+
+    return np.sum(np.where(is_same_cluster, abs_corr, 0.), axis=1) - np.diag(abs_corr)
+
+
+def get_cluster_representatives(cluster_ids: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """
+    Position of the feature with the highest score of each cluster (the first one in case of a tie).
+
+    Parameters
+    ----------
+    cluster_ids: np.array of int of shape = (n_features)
+    scores: np.array of shape = (n_features)
+
+    Returns
+    -------
+    representatives: np.array of int of shape = (n_clusters)
+        Sorted positions.
+    """
+
+    if not len(cluster_ids):
+        return np.array([], dtype=np.int64)
+
+    # Sorted by cluster, then by decreasing score, then by position: the first feature of each cluster wins.
+    order = np.lexsort((np.arange(len(cluster_ids)), -np.asarray(scores), cluster_ids))
+    is_first = np.r_[True, cluster_ids[order][1:] != cluster_ids[order][:-1]]
+
+    return np.sort(order[is_first])
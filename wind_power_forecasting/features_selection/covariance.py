@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.utils import check_array
+from sklearn.utils.extmath import safe_sparse_dot
+
+# Relative standard deviation under which a feature is constant (rounding errors of the accumulation).
+CONSTANT_TOLERANCE = np.sqrt(np.finfo(np.float64).eps)
+
+
+class CovarianceAccumulator:
+    """
+    Single pass, chunked accumulation of the means, variances and co-moments of features.
+
+    Each chunk is reduced to its own means and centered co-moments, which are merged into the accumulated ones
+    (Welford / Chan update): the accumulation is numerically as accurate as a centered two pass computation, and the
+    chunks never have to sit in memory together. The variance and collinearity selectors are then fitted from the
+    accumulated statistics (see `remove_variance_threshold` and `remove_collinear_drivers`).
+
+    As with a `dropna`, the rows with a missing value are ignored.
+
+    Attributes
+    ----------
+    labels: list or None
+        Labels of the features, if the chunks are pandas DataFrame objects.
+    n_samples: int
+    mean: np.array of shape = (n_features)
+    comoment: np.array of shape = (n_features, n_features)
+        Sums of the products of the centered features.
+    min, max: np.array of shape = (n_features)
+
+    Examples
+    --------
+    >>> covariance = CovarianceAccumulator()
+    >>> for chunk_df in pd.read_csv(path, chunksize=100000):
+    ...     covariance.partial_fit(chunk_df)
+    >>> covariance.get_correlation()
+    """
+
+    def __init__(self):
+        self.labels = None
+        self.n_samples = 0
+        self.mean = None
+        self.comoment = None
+        self.min = None
+        self.max = None
+
+    def partial_fit(self, X):
+        """
+        Accumulate the statistics of a chunk of rows.
+
+        Parameters
+        ----------
+        {X} Dense or sparse (without missing values), or a pandas DataFrame object with the same columns for all the
+        chunks.
+
+        Returns
+        -------
+        self: returns an instance of self.
+
+        Raises
+        ------
+        ValueError
+            If the features of the chunk are not the ones of the previous chunks.
+        """
+
+        if isinstance(X, pd.DataFrame):
+            self._check_labels(list(X))
+
+        X = check_array(X, ('csr', 'csc'), dtype=np.float64, force_all_finite='allow-nan', ensure_min_samples=0)
+
+        if not sparse.issparse(X):
+            X = X[~np.isnan(X).any(axis=1)]
+
+        n_samples, n_features = X.shape
+
+        if self.mean is None:
+            self.mean = np.zeros(n_features)
+            self.comoment = np.zeros((n_features, n_features))
+            self.min = np.full(n_features, np.inf)
+            self.max = np.full(n_features, -np.inf)
+
+        elif n_features != len(self.mean):
+            raise ValueError('Expected {} features, got: {}'.format(len(self.mean), n_features))
+
+        if not n_samples:
+            return self
+
+        mean = _to_row(X.mean(axis=0))
+        self.min = np.minimum(self.min, _to_row(X.min(axis=0)))
+        self.max = np.maximum(self.max, _to_row(X.max(axis=0)))
+
+        if sparse.issparse(X):
+            # Centering would densify the chunk.
+            comoment = safe_sparse_dot(X.T, X, dense_output=True) - n_samples * np.outer(mean, mean)
+        else:
+            X = X - mean
+            comoment = X.T @ X
+
+        # Merge the statistics of the chunk into the accumulated ones.
+        n_total = self.n_samples + n_samples
+        delta = mean - self.mean
+        self.mean += delta * n_samples / n_total
+        self.comoment += comoment + np.outer(delta, delta) * self.n_samples * n_samples / n_total
+        self.n_samples = n_total
+
+        return self
+
+    def fit_chunks(self, chunks):
+        """Accumulate the statistics of an iterable of chunks, see `partial_fit`."""
+
+        for chunk in chunks:
+            self.partial_fit(chunk)
+
+        return self
+
+    def get_positions(self, labels=None) -> np.ndarray:
+        """Positions of features given by their labels (all the features by default)."""
+
+        if labels is None:
+            return np.arange(len(self.mean))
+
+        if self.labels is None:
+            raise ValueError('Features can only be selected by label when the chunks are dataframes')
+
+        positions = {label: position for position, label in enumerate(self.labels)}
+
+        return np.array([positions[label] for label in labels], dtype=np.int64)
+
+    def get_variances(self, labels=None) -> np.ndarray:
+        """
+        Variances (with ``ddof=0``) of the features, exactly 0 for constant features.
+
+        Parameters
+        ----------
+        labels: list, optional
+            If given, only these features (in this order).
+
+        Returns
+        -------
+        variances: np.array of shape = (n_features)
+        """
+
+        positions = self.get_positions(labels)
+        variances = np.clip(np.diag(self.comoment)[positions], 0., None) / max(self.n_samples, 1)
+        variances[self._is_constant()[positions]] = 0.
+
+        return variances
+
+    def get_correlation(self, labels=None) -> np.ndarray:
+        """
+        Correlation matrix of the features.
+
+        The rows and columns of constant features are null (including their diagonal term), so that their variance
+        inflation factor is infinite, as for a feature collinear to the intercept.
+
+        Parameters
+        ----------
+        labels: list, optional
+            If given, only these features (in this order).
+
+        Returns
+        -------
+        corr: np.array of shape = (n_features, n_features)
+        """
+
+        positions = self.get_positions(labels)
+        std = np.sqrt(np.clip(np.diag(self.comoment)[positions], 0., None))
+        std[self._is_constant()[positions]] = np.inf
+
+        return self.comoment[np.ix_(positions, positions)] / std[:, None] / std[None, :]
+
+    def _is_constant(self) -> np.ndarray:
+        std = np.sqrt(np.clip(np.diag(self.comoment), 0., None) / max(self.n_samples, 1))
+
+        return (self.max <= self.min) | (std <= CONSTANT_TOLERANCE * np.abs(self.mean))
+
+    def _check_labels(self, labels):
+        if self.labels is None and self.mean is None:
+            self.labels = labels
+        elif labels != self.labels:
+            raise ValueError('The features of the chunk differ from the ones of the previous chunks')
+
+
+def _to_row(statistics) -> np.ndarray:
+    """Statistics over the rows of a dense or sparse matrix, as a 1D array."""
+
+    if sparse.issparse(statistics):
+        statistics = statistics.toarray()
+
+    return np.asarray(statistics, dtype=np.float64).ravel()
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from wind_power_forecasting.features_selection.correlation_clustering import CorrelationClusterThreshold
+
+
+class TestCorrelationClusterThreshold:
+
+    def setup_method(self):
+        rng = np.random.RandomState(0)
+        z = rng.randn(1000, 3)
+        # 3 clusters: a-b-c, d-e and f, `c` being noisier and `b` the most central of the first one.
+        self.X_df = pd.DataFrame({'a': z[:, 0] + 0.1 * rng.randn(1000), 'b': z[:, 0],
+                                  'c': z[:, 0] + 0.2 * rng.randn(1000), 'd': 10 * z[:, 1],
+                                  'e': -z[:, 1] + 0.05 * rng.randn(1000), 'f': z[:, 2]})
+
+    def test_clusters(self):
+        selector = CorrelationClusterThreshold(threshold=0.9).fit(self.X_df)
+
+        assert selector.kept_labels == ['b', 'd', 'f']
+        assert selector.get_clusters() == {'b': ['a', 'b', 'c'], 'd': ['d', 'e'], 'f': ['f']}
+
+    def test_representatives(self):
+        for representative, expected in [('first', ['a', 'd', 'f']), ('variance', ['c', 'd', 'f'])]:
+            selector = CorrelationClusterThreshold(threshold=0.9, representative=representative).fit(self.X_df)
+
+            assert selector.kept_labels == expected
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from wind_power_forecasting.features_selection.covariance import CovarianceAccumulator
+from wind_power_forecasting.features_selection.variance_inflation_factor import remove_collinear_drivers
+
+
+class TestCovarianceAccumulator:
+
+    def setup_method(self):
+        rng = np.random.RandomState(0)
+        # Large means, on which an uncentered accumulation would lose precision.
+        self.X = 1e4 + rng.randn(1000, 5) @ rng.randn(5, 5)
+        self.X[rng.rand(1000) < 0.1, 2] = np.nan
+
+    def test_chunks_same_as_complete_rows(self):
+        covariance = CovarianceAccumulator().fit_chunks(np.array_split(self.X, 7))
+
+        complete_X = self.X[~np.isnan(self.X).any(axis=1)]
+        assert covariance.n_samples == len(complete_X)
+        np.testing.assert_allclose(covariance.mean, complete_X.mean(axis=0), rtol=1e-12)
+        np.testing.assert_allclose(covariance.get_variances(), complete_X.var(axis=0), rtol=1e-9)
+        np.testing.assert_allclose(covariance.get_correlation(), np.corrcoef(complete_X, rowvar=False), atol=1e-12)
+
+    def test_sparse_chunks(self):
+        X = np.where(np.isnan(self.X), 0., self.X) - 1e4
+        X[X < 0] = 0.
+
+        covariance = CovarianceAccumulator().fit_chunks([sparse.csr_matrix(X[:400]), sparse.csr_matrix(X[400:])])
+
+        np.testing.assert_allclose(covariance.get_variances(), X.var(axis=0), rtol=1e-9)
+
+    def test_same_selection_as_rows(self):
+        df = pd.DataFrame(np.c_[self.X, 2 * self.X[:, 0]], columns=list('abcdef'))
+        covariance = CovarianceAccumulator().fit_chunks([df.iloc[:500], df.iloc[500:]])
+
+        expected = remove_collinear_drivers(df, threshold=5)
+
+        assert list(remove_collinear_drivers(df, threshold=5, covariance=covariance)) == list(expected)
@@ -0,0 +1,51 @@
+import numpy as np
+
+from wind_power_forecasting.features_selection.variance_inflation_factor import compute_variance_inflation_factor, \
+    VarianceInflationFactorThreshold
+
+
+def compute_ols_variance_inflation_factor(X):
+    """1 / (1 - R²) of the regression of each feature on the other ones, with an intercept."""
+
+    vif = []
+
+    for j in range(X.shape[1]):
+        others = np.c_[np.ones(len(X)), np.delete(X, j, axis=1)]
+        residuals = X[:, j] - others @ np.linalg.lstsq(others, X[:, j], rcond=None)[0]
+        vif.append(np.var(X[:, j]) / np.var(residuals))
+
+    return np.array(vif)
+
+
+class TestVarianceInflationFactor:
+
+    def setup_method(self):
+        rng = np.random.RandomState(0)
+        self.X = rng.randn(500, 8) @ rng.randn(8, 8) + 0.3 * rng.randn(500, 8)
+
+    def test_same_as_ols(self):
+        np.testing.assert_allclose(compute_variance_inflation_factor(self.X),
+                                   compute_ols_variance_inflation_factor(self.X), rtol=1e-10)
+
+    def test_collinear_and_constant_features(self):
+        X = np.c_[self.X, 2 * self.X[:, 0], np.full(len(self.X), 3.)]
+
+        vif = compute_variance_inflation_factor(X)
+
+        assert np.isinf(vif[[0, 8, 9]]).all()
+        assert np.isfinite(vif[1:8]).all()
+
+    def test_same_selection_as_recomputing(self):
+        # With 2 features left, both have the same vif: the removed one is down to rounding errors.
+        for threshold in [1.5, 2., 5., 20.]:
+            is_removed = np.repeat(False, self.X.shape[1])
+            kept = list(range(self.X.shape[1]))
+
+            for _ in range(len(kept) - 1):
+                vif = compute_ols_variance_inflation_factor(self.X[:, kept])
+                if vif.max() <= threshold:
+                    break
+                is_removed[kept.pop(vif.argmax())] = True
+
+            np.testing.assert_array_equal(VarianceInflationFactorThreshold(threshold).fit(self.X).is_removed,
+                                          is_removed)
@@ -1,18 +1,27 @@
 import numpy as np
 import pandas as pd
-import statsmodels.stats.outliers_influence as oi
 from sklearn.base import BaseEstimator
 from sklearn.feature_selection.base import SelectorMixin
 from sklearn.utils import check_array
 from sklearn.utils.validation import check_is_fitted
-from statsmodels.tools import add_constant
 
+from wind_power_forecasting.features_selection.covariance import CovarianceAccumulator
 from wind_power_forecasting.utils import get_X_y_df, split_features_to_process_df
 
+# Squared weight above which a feature is part of a null direction of the correlation matrix, i.e. is a linear
+# combination of the others.
+NULL_SPACE_TOLERANCE = np.sqrt(np.finfo(np.float64).eps)
+# Removing a feature with a higher vif from the inverse loses too much precision, it's inverted again instead.
+MAX_DOWNDATE_VIF = 1. / np.sqrt(np.finfo(np.float64).eps)
+
 
 class VarianceInflationFactorThreshold(BaseEstimator, SelectorMixin):
     """
-    Feature selector that removes all low variance-inflation-factor (vif) features.
+    Feature selector that removes all high variance-inflation-factor (vif) features.
+
+    The feature with the highest vif is removed, and the vifs of the remaining features are updated, until the
+    highest vif is lower than the threshold. The vifs are the diagonal of the inverse of the correlation matrix,
+    computed once (see `select_by_variance_inflation_factor`).
 
     This feature selection algorithm looks only at the features (X), not the
     desired outputs (y), and can thus be used for unsupervised learning.
@@ -20,31 +29,34 @@ class VarianceInflationFactorThreshold(BaseEstimator, SelectorMixin):
     Parameters
     ----------
     threshold : float, optional
-        Features with a training-set variance lower than this threshold will
-        be removed. The default is to keep all features with non-zero vif,
-        i.e. remove the features that have the same value in all samples.
+        Features are removed until all the remaining ones have a vif lower than this threshold. The default is to
+        keep a single feature (a vif is at least 1).
 
     Attributes
     ----------
-    is_removed:
+    is_removed: np.array of bool of shape = (n_features)
+        Removed features.
     kept_labels: list or None
         In case where input data (`X`) where a pandas DataFrame object, store the conserved columns labels.
 
     Examples
     --------
     The following data set has integer features, the second one is a multiple of the first one.
-    It is removed with the default setting for threshold:
+    It is removed (its vif is infinite):
 
-        >>> X = [[1, 2, 0, 3], [2, 4, 7, 3], [3, 6, 1, 2]]
-        >>> selector = VarianceInflationFactorThreshold()
+        >>> X = [[1, 2, 0, 3], [2, 4, 7, 3], [3, 6, 1, 2], [4, 8, 2, 1], [5, 10, 4, 4], [6, 12, 3, 0]]
+        >>> selector = VarianceInflationFactorThreshold(threshold=5)
         >>> # Check for every features if they are kept or not.
         >>> selector.fit(X).get_support()
-        array([False,  True,  True,  True], dtype=bool)
+        array([False,  True,  True,  True])
         >>> # Remove filtered features from data set.
         >>> selector.fit_transform(X)
-        array([[2, 0, 3],
-               [4, 7, 3],
-               [6, 1, 2]])
+        array([[ 2,  0,  3],
+               [ 4,  7,  3],
+               [ 6,  1,  2],
+               [ 8,  2,  1],
+               [10,  4,  4],
+               [12,  3,  0]])
     """
 
     def __init__(self, threshold=0.):
@@ -72,40 +84,96 @@ class VarianceInflationFactorThreshold(BaseEstimator, SelectorMixin):
             labels = None
 
         X = check_array(X, ('csr', 'csc'), dtype=np.float64)
-        is_removed = np.repeat(False, X.shape[1])
 
-        for _ in range(X.shape[1] - 1):
+        return self._fit_correlation(compute_correlation_matrix(X), labels)
 
-            vif = compute_variance_inflation_factor(X)
-            # Retrieve the column index of the column presenting the highest collinearity value
-            max_vif_idx = vif.argmax()
+    def fit_covariance(self, covariance: CovarianceAccumulator, labels=None):
+        """
+        Apply the variance inflation threshold to accumulated statistics, e.g. of data read by chunks
 
-            # If the highest collinearity value is smaller than threshold
-            # no need to continue, exist of the loop
-            if vif[max_vif_idx] <= self.threshold:
-                continue
-            else:
-                is_removed[max_vif_idx] = True
-                X = np.delete(X, max_vif_idx, axis=1)
+        Parameters
+        ----------
+        covariance: CovarianceAccumulator
+        labels: list, optional
+            If given, only these features are selected from (the ones of the chunks by default).
 
-                if labels is not None:
-                    labels.remove(labels[max_vif_idx])
+        Returns
+        -------
+        self: returns an instance of self.
+        """
+
+        if labels is None and covariance.labels is not None:
+            labels = list(covariance.labels)
 
-        self.is_removed = is_removed
-        self.kept_labels = labels
+        return self._fit_correlation(covariance.get_correlation(labels), labels)
+
+    def _fit_correlation(self, corr, labels):
+        self.is_removed = select_by_variance_inflation_factor(corr, self.threshold)
+        self.kept_labels = None if labels is None else [label for label, is_removed in zip(labels, self.is_removed)
+                                                        if not is_removed]
 
         return self
 
     def _get_support_mask(self):
         check_is_fitted(self, ['is_removed'])
 
-        return np.array([not self.is_removed[idx] for idx in range(self.is_removed.size)])
+        return ~self.is_removed
+
+
+def compute_correlation_matrix(X) -> np.array:
+    """
+    Compute the correlation matrix of the features of a matrix, see `CovarianceAccumulator.get_correlation`
+
+    Parameters
+    ----------
+    {X} Dense or sparse.
+
+    Returns
+    -------
+    corr: np.array of shape = (n_features, n_features)
+    """
+
+    return CovarianceAccumulator().partial_fit(X).get_correlation()
+
+
+def invert_correlation_matrix(corr: np.array):
+    """
+    Compute the (pseudo-)inverse of a correlation matrix, and the variance inflation factors of its features
+
+    The vif of a feature is the diagonal term of the inverse of the correlation matrix. The matrix is inverted
+    through its eigen decomposition, dropping its null directions: features lying on one of them are linear
+    combinations of the others, their vif is infinite.
+
+    Parameters
+    ----------
+    corr: np.array of shape = (n_features, n_features)
+
+    Returns
+    -------
+    inverse: np.array of shape = (n_features, n_features)
+        Pseudo-inverse of `corr`, its inverse if no vif is infinite.
+    vif: np.array of shape = (n_features)
+    """
+
+    eigenvalues, eigenvectors = np.linalg.eigh(corr)
+    is_null = eigenvalues <= len(corr) * np.finfo(np.float64).eps * max(eigenvalues.max(initial=0.), 1.)
+
+    eigenvectors, null_eigenvectors = eigenvectors[:, ~is_null], eigenvectors[:, is_null]
+    inverse = (eigenvectors / eigenvalues[~is_null]) @ eigenvectors.T
+
+    vif = np.diag(inverse).copy()
+    vif[np.sum(null_eigenvectors ** 2, axis=1) > NULL_SPACE_TOLERANCE] = np.inf
 
+    return inverse, vif
 
-def compute_variance_inflation_factor(X: np.array) -> np.array:
+
+def compute_variance_inflation_factor(X) -> np.array:
     """
     Compute the variance inflation factor for each features of a matrix
 
+    This is the same as ``1 / (1 - R²)`` of the regression of each feature on the other ones (with an intercept),
+    for all the features at once, see `invert_correlation_matrix`.
+
     Parameters
     ----------
     {X}
@@ -116,18 +184,65 @@ def compute_variance_inflation_factor(X: np.array) -> np.array:
         variance inflation factor of each features of the input matrix
     """
 
-    # Add a constant columns as suggest here:
-    # https://stackoverflow.com/questions/42658379/variance-inflation-factor-in-python
-    X = add_constant(X, prepend=True)
-    vif = np.array([oi.variance_inflation_factor(X, j) for j in range(X.shape[1])])
-    # remove the firs element corresponding to the constant col
-    vif = np.delete(vif, 0)
-    vif[np.isnan(vif)] = np.inf
+    X = check_array(X, ('csr', 'csc'), dtype=np.float64)
 
-    return vif
+    return invert_correlation_matrix(compute_correlation_matrix(X))[1]
 
 
-def remove_collinear_drivers(df: pd.DataFrame, target_label=None, threshold=0., force_keeping=None):
+def select_by_variance_inflation_factor(corr: np.array, threshold=0.) -> np.array:
+    """
+    Remove the features with the highest variance inflation factor, one by one, until it's lower than a threshold
+
+    The correlation matrix is inverted once. Removing a feature `j` from the correlation matrix downdates its inverse
+    `P` (Schur complement), in O(n_features²):
+
+    .. math::
+        P_{-j, -j} - P_{-j, j} P_{j, -j} / P_{j, j}
+
+    The matrix is only inverted again when it's singular (infinite vifs) or when the downdate would lose precision.
+
+    Parameters
+    ----------
+    corr: np.array of shape = (n_features, n_features)
+        See `compute_correlation_matrix`.
+    threshold: float, optional
+        See `VarianceInflationFactorThreshold`.
+
+    Returns
+    -------
+    is_removed: np.array of bool of shape = (n_features)
+    """
+
+    n_features = len(corr)
+    is_removed = np.repeat(False, n_features)
+    # Positions of the remaining features in `corr`.
+    kept = np.arange(n_features)
+    inverse, vif = invert_correlation_matrix(corr)
+
+    for _ in range(n_features - 1):
+        # Retrieve the column index of the column presenting the highest collinearity value
+        max_vif_idx = vif.argmax()
+        max_vif = vif[max_vif_idx]
+
+        # If the highest collinearity value is smaller than threshold, all the remaining features are kept
+        if max_vif <= threshold:
+            break
+
+        is_removed[kept[max_vif_idx]] = True
+        kept = np.delete(kept, max_vif_idx)
+
+        if max_vif <= MAX_DOWNDATE_VIF:
+            column = np.delete(inverse[:, max_vif_idx], max_vif_idx)
+            inverse = np.delete(np.delete(inverse, max_vif_idx, axis=0), max_vif_idx, axis=1)
+            inverse -= np.outer(column, column) / max_vif
+            vif = np.diag(inverse).copy()
+        else:
+            inverse, vif = invert_correlation_matrix(corr[np.ix_(kept, kept)])
+
+    return is_removed
+
+
+def remove_collinear_drivers(df: pd.DataFrame, target_label=None, threshold=0., force_keeping=None, covariance=None):
     """
     This module remove all columns of a dataframe presenting high collinearity.
     Collinearity is estimated using the variance inflation factor (VIF):
@@ -152,19 +267,29 @@ def remove_collinear_drivers(df: pd.DataFrame, target_label=None, threshold=0.,
             i.e. remove the features that have the same value in all samples.
     force_keeping: array-like, optional
         List of features which will be kept whatever their variance
+    covariance: CovarianceAccumulator, optional
+        Statistics accumulated over the rows of `df` (or of any data with the same features). If given, the vifs are
+        computed from them and the rows with missing values are not dropped.
 
     Returns
     -------
-    {df} Same as the input from which features with a low variance inflation factor where removed.
+    {df} Same as the input from which features with a high variance inflation factor where removed.
     """
 
     df, kept_features_df = split_features_to_process_df(df, force_keeping)
     n_kept = kept_features_df.shape[1] if kept_features_df is not None else 0
 
-    X_df, y_df = get_X_y_df(df, target_label, rm_na=True)
+    X_df, y_df = get_X_y_df(df, target_label, rm_na=covariance is None)
 
     if X_df.shape[1] > 0 and X_df.shape[1] + n_kept >= 1:
-        is_selected = VarianceInflationFactorThreshold(threshold).fit(X_df).get_support()
+        selector = VarianceInflationFactorThreshold(threshold)
+
+        if covariance is None:
+            selector.fit(X_df)
+        else:
+            selector.fit_covariance(covariance, labels=list(X_df))
+
+        is_selected = selector.get_support()
         X_df = X_df.loc[:, is_selected]
 
     return pd.concat([y_df, X_df, kept_features_df], axis=1)
@@ -4,7 +4,7 @@ from sklearn.feature_selection import VarianceThreshold
 from wind_power_forecasting.utils import split_features_to_process_df, get_X_y_df
 
 
-def remove_variance_threshold(df: pd.DataFrame, target_label=None, threshold=0., force_keeping=None):
+def remove_variance_threshold(df: pd.DataFrame, target_label=None, threshold=0., force_keeping=None, covariance=None):
     """
     This module remove all columns of a dataframe presenting high low variance.
 
@@ -18,6 +18,9 @@ def remove_variance_threshold(df: pd.DataFrame, target_label=None, threshold=0.,
             i.e. remove the features that have the same value in all samples.
     force_keeping: array-like, optional
         List of features which will be kept whatever their variance
+    covariance: CovarianceAccumulator, optional
+        Statistics accumulated over the rows of `df` (or of any data with the same features). If given, the variances
+        are read from them and the rows with missing values are not dropped.
 
     Returns
     -------
@@ -28,13 +31,17 @@ def remove_variance_threshold(df: pd.DataFrame, target_label=None, threshold=0.,
     df, kept_features_df = split_features_to_process_df(df, force_keeping)
 
     n_kept = kept_features_df.shape[1] if kept_features_df is not None else 0
-    X_df, y_df = get_X_y_df(df, target_label, rm_na=True)
+    X_df, y_df = get_X_y_df(df, target_label, rm_na=covariance is None)
 
     if X_df.shape[1] > 0 and X_df.shape[1] + n_kept >= 1:
         # Var[X] = p * (1 - p)
         threshold = threshold * (1 - threshold)
 
-        is_selected = VarianceThreshold(threshold).fit(X_df).get_support()
+        if covariance is None:
+            is_selected = VarianceThreshold(threshold).fit(X_df).get_support()
+        else:
+            is_selected = covariance.get_variances(list(X_df)) > threshold
+
         X_df = X_df.loc[:, is_selected]
 
     return pd.concat([y_df, X_df, kept_features_df], axis=1)
@@ -1,31 +1,52 @@
-import pandas as pd
+import argparse
+
+from wind_power_forecasting import X_TRAIN_FILE, WF_LABEL, Y_TRAIN_FILE, ID_LABEL, X_TEST_FILE, SUBMISSION_FILE, \
+    CHECKPOINT_DIR
+from wind_power_forecasting.model_selection.utils import VALID_ESTIMATORS
+from wind_power_forecasting.models.training import fit_predict_wind_farms, fit_predict_global
+from wind_power_forecasting.preprocessing.raw_inputs import read_raw_inputs
+from wind_power_forecasting.utils import DataFramePartition
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Fit the wind farms models and write the submission file.')
+    parser.add_argument('--mode', choices=['per-farm', 'global'], default='per-farm',
+                        help='One model per wind farm (default), or a single model of all the wind farms.')
+    parser.add_argument('--estimator', choices=VALID_ESTIMATORS, default='random_forest',
+                        help='Estimator searched (default: random_forest).')
+    parser.add_argument('--jobs', type=int, default=1, help='Number of wind farms fitted in parallel.')
+    parser.add_argument('--cores', type=int, default=None,
+                        help='Cores shared by the wind farms and their hyper parameters searches (default: all).')
+    parser.add_argument('--checkpoint-dir', default=CHECKPOINT_DIR, help='Where each wind farm checkpoint is saved.')
+    parser.add_argument('--no-resume', dest='resume', action='store_false',
+                        help='Fit all the wind farms again, even the already checkpointed ones.')
+
+    return parser.parse_args()
 
-from wind_power_forecasting import X_TRAIN_FILE, TIME_LABEL, WF_LABEL, Y_TRAIN_FILE, ID_LABEL, TARGET_LABEL, \
-    X_TEST_FILE, SUBMISSION_FILE
-from wind_power_forecasting.models.wind_power_forcaster import WindPowerForecaster
-from wind_power_forecasting.utils import get_sub_df
 
 if __name__ == '__main__':
 
-    X_train_all_df = pd.read_csv(X_TRAIN_FILE)
-    X_test_all_df = pd.read_csv(X_TEST_FILE)
-    y_train_all_df = pd.read_csv(Y_TRAIN_FILE)
-    predict_dfs = []
-    all_wf = X_train_all_df[WF_LABEL].unique()
+    args = parse_args()
 
-    for i, wf in enumerate(all_wf):
-        print('Wind farm: {}: {}/{}'.format(wf, i + 1, len(all_wf)))
+    # The NWP forecasts are packed as soon as they are loaded: only their non missing values are kept in memory.
+    (X_train_all_df, nwp_train), (X_test_all_df, nwp_test), (y_train_all_df, _) = read_raw_inputs(
+        X_TRAIN_FILE, X_TEST_FILE, Y_TRAIN_FILE, pack_nwp=True)
 
-        X_train_wf_df = get_sub_df(X_train_all_df, WF_LABEL, wf)
-        X_test_wf_df = get_sub_df(X_test_all_df, WF_LABEL, wf)
-        y_train_wf_df = get_sub_df(y_train_all_df, ID_LABEL, X_train_wf_df[ID_LABEL], keep_column=True)
+    if args.mode == 'global':
+        final_predict_df = fit_predict_global(X_train_all_df, y_train_all_df, X_test_all_df,
+                                              checkpoint_dir=args.checkpoint_dir, resume=args.resume,
+                                              n_cores=args.cores, estimator_name=args.estimator,
+                                              nwp_train=nwp_train, nwp_test=nwp_test).reset_index()
 
-        wpf = WindPowerForecaster(target_label=TARGET_LABEL, datetime_label=TIME_LABEL)
-        predict_df = wpf.fit_predict(X_train_wf_df, y_train_wf_df, X_test_wf_df,
-                                     output_type='dataframe', prediction_label='Production')
-        predict_dfs.append(predict_df)
+    else:
+        X_train_partition = DataFramePartition(X_train_all_df, WF_LABEL)
+        X_test_partition = DataFramePartition(X_test_all_df, WF_LABEL)
+        y_train_partition = X_train_partition.align(y_train_all_df, ID_LABEL)
 
-    final_predict_df = pd.concat(predict_dfs).reset_index()
+        final_predict_df = fit_predict_wind_farms(X_train_partition, y_train_partition, X_test_partition,
+                                                  n_jobs=args.jobs, checkpoint_dir=args.checkpoint_dir,
+                                                  resume=args.resume, n_cores=args.cores,
+                                                  estimator_name=args.estimator, nwp_train=nwp_train,
+                                                  nwp_test=nwp_test).reset_index()
 
     final_predict_df.to_csv(SUBMISSION_FILE, index=False)
-    pass
@@ -1,25 +1,110 @@
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import TimeSeriesSplit, RandomizedSearchCV, GridSearchCV
+from sklearn.pipeline import Pipeline
 
-from wind_power_forecasting.model_selection.utils import get_estimator_parameters_dict
+from wind_power_forecasting.model_selection.binning import FeatureBinner, HistGradientBoostingRegressor, bin_folds
+from wind_power_forecasting.model_selection.halving import SuccessiveHalvingSearchCV
+from wind_power_forecasting.model_selection.utils import get_estimator_parameters_dict, get_time_series_folds
+from wind_power_forecasting.model_selection.warm_start import WarmStartForestSearchCV
+from wind_power_forecasting.utils.parallel import shared_arrays
 
 
-def model_autotuning(X, y, estimator=None, n_splits=3, strategy='randomized', **kwargs):
+def model_autotuning(X, y, estimator=None, n_splits=3, strategy='randomized', random_state=42, n_jobs=None,
+                     shared_memory=True, times=None, **kwargs):
+    """
+    Search the hyper parameters of an estimator over time series folds.
+
+    The folds are computed once, cut between distinct `times` if given (see `get_time_series_folds`). With several
+    jobs, `X` and `y` are memory-mapped once (see `shared_arrays`): the workers read the same copy of the data instead
+    of receiving their own.
+
+    For a `HistGradientBoostingRegressor`, the features of each fold are binned once from its training rows (see
+    `bin_folds`) and the search runs on the ``uint8`` codes. The best candidate is then fitted on the codes of all the
+    rows, binned from all of them: the best estimator is a pipeline binning the features before predicting.
+
+    Parameters
+    ----------
+    {X}
+    {y}
+    estimator: estimator object, optional
+        By default, a `RandomForestRegressor` (see `get_estimator`).
+    n_splits: int, optional
+        Number of `TimeSeriesSplit` folds.
+    strategy: str, optional
+        ``'grid'``, ``'randomized'`` (**default**), ``'halving'`` or ``'warm_start'``.
+    random_state: int, optional
+    n_jobs: int, optional
+        Number of candidates and folds fitted in parallel (within the core budget of the caller).
+    shared_memory: bool, optional
+        If `False`, the data is not memory-mapped.
+    times: array-like of shape = (n_samples,), optional
+        Timestamps of the rows, in increasing order, e.g. of rows of several wind farms. By default, each row is its
+        own timestamp.
+    kwargs:
+        Forwarded to the search, e.g. ``scoring``.
+
+    Returns
+    -------
+    best_estimator: estimator object
+    best_params: dict
+    best_score: float
+    """
+
     if estimator is None:
         estimator = RandomForestRegressor(random_state=42)
 
     params_grid = get_estimator_parameters_dict(estimator)
-    tscv = TimeSeriesSplit(n_splits=n_splits)
+    # Precomputed once for all the candidates.
+    if times is None:
+        cv = list(TimeSeriesSplit(n_splits=n_splits).split(X))
+    else:
+        cv = get_time_series_folds(times, n_splits=n_splits)
+
+    is_binned = isinstance(estimator, HistGradientBoostingRegressor)
+    X_search, y_search = X, y
+
+    if is_binned:
+        # Binned once per fold for all the candidates: the best candidate is fitted below, on the rows binned as a
+        # whole.
+        X_search, y_search, cv = bin_folds(X, y, cv, random_state=random_state)
+        kwargs['refit'] = False
+
+    if strategy == 'halving' and 'n_estimators' not in estimator.get_params():
+        # E.g. a boosting, stopped early.
+        kwargs.setdefault('resource', 'n_samples')
 
     if strategy == 'grid':
-        clf = GridSearchCV(estimator, params_grid, cv=tscv, **kwargs)
+        clf = GridSearchCV(estimator, params_grid, cv=cv, n_jobs=n_jobs, **kwargs)
 
     elif strategy == 'randomized':
-        clf = RandomizedSearchCV(estimator, params_grid, cv=tscv, **kwargs)
+        # Fixed random state: the sampled candidates must not depend on the run (nor on the number of jobs).
+        clf = RandomizedSearchCV(estimator, params_grid, cv=cv, random_state=random_state, n_jobs=n_jobs, **kwargs)
+
+    elif strategy == 'halving':
+        # Many candidates with few trees, only the best ones with more.
+        clf = SuccessiveHalvingSearchCV(estimator, params_grid, cv=cv, random_state=random_state, n_jobs=n_jobs,
+                                        **kwargs)
+
+    elif strategy == 'warm_start':
+        # All the forest sizes of each sampled group of parameters, from a single forest per fold.
+        clf = WarmStartForestSearchCV(estimator, params_grid, cv=cv, random_state=random_state, n_jobs=n_jobs,
+                                      **kwargs)
 
     else:
         raise ValueError('Unexpected SearchCV strategy: {}'.format(strategy))
 
-    clf.fit(X, y)
+    if shared_memory and n_jobs not in (None, 1):
+        with shared_arrays(X_search, y_search) as (X_search, y_search):
+            clf.fit(X_search, y_search)
+    else:
+        clf.fit(X_search, y_search)
+
+    if is_binned:
+        binner = FeatureBinner(random_state=random_state).fit(X)
+        best_estimator = clone(estimator).set_params(**clf.best_params_).fit(binner.transform(X), y)
+        best_estimator = Pipeline([('binning', binner), ('estimator', best_estimator)])
+    else:
+        best_estimator = clf.best_estimator_
 
-    return clf.best_estimator_, clf.best_params_, clf.best_score_
+    return best_estimator, clf.best_params_, clf.best_score_
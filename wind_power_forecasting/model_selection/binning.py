@@ -0,0 +1,193 @@
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.utils import check_array, check_random_state
+from sklearn.utils.validation import check_is_fitted
+
+try:
+    from sklearn.ensemble import HistGradientBoostingRegressor
+except ImportError:
+    # scikit-learn < 1.0: the histogram gradient boosting is experimental.
+    from sklearn.experimental import enable_hist_gradient_boosting  # noqa: F401
+    from sklearn.ensemble import HistGradientBoostingRegressor
+
+# Bins of the non missing values, the missing values having their own bin: all the codes fit in an uint8, and the
+# histogram gradient boosting (255 bins at most) maps each of them to its own bin.
+MAX_BINS = 254
+# Rows the bin thresholds are computed from.
+BINNING_SUBSAMPLE = 200000
+
+
+class FeatureBinner(BaseEstimator, TransformerMixin):
+    """
+    Quantization of each feature into at most `max_bins` quantile bins, coded as ``uint8``.
+
+    The thresholds are the midpoints of the distinct values of a feature if it has at most `max_bins` of them, of its
+    quantiles otherwise (as the binning of `HistGradientBoostingRegressor`). Missing values are coded `max_bins`.
+
+    The features of each fold of a search are binned once for all the candidates (see `bin_folds`), which share 4
+    times smaller copies of the data: the binning of a histogram gradient boosting fitted on the codes is then a one
+    to one mapping of at most 255 distinct values, without quantiles to compute.
+
+    Parameters
+    ----------
+    max_bins: int, optional
+        At most 255.
+    subsample: int, optional
+        Number of rows (drawn at random) the thresholds are computed from. If `None`, all the rows.
+    random_state: int, optional
+
+    Attributes
+    ----------
+    bin_thresholds: list of np.array
+        Increasing thresholds of each feature: values up to ``bin_thresholds[j][i]`` (included) are coded ``i`` or
+        less.
+    """
+
+    def __init__(self, max_bins=MAX_BINS, subsample=BINNING_SUBSAMPLE, random_state=None):
+        self.max_bins = max_bins
+        self.subsample = subsample
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        """
+        Compute the thresholds of the bins of each feature
+
+        Parameters
+        ----------
+        {X}
+        y : any
+            Ignored. This parameter exists only for compatibility with
+            sklearn.pipeline.Pipeline.
+
+        Returns
+        -------
+        self: returns an instance of self.
+
+        Raises
+        ------
+        ValueError
+            If `max_bins` is not between 2 and 255.
+        """
+
+        if not 2 <= self.max_bins <= 255:
+            raise ValueError('max_bins should be between 2 and 255, got: {}'.format(self.max_bins))
+
+        X = check_array(X, dtype=np.float64, force_all_finite='allow-nan')
+
+        if self.subsample is not None and len(X) > self.subsample:
+            rows = check_random_state(self.random_state).choice(len(X), self.subsample, replace=False)
+            X = X[np.sort(rows)]
+
+        self.bin_thresholds = [get_bin_thresholds(column, self.max_bins) for column in X.T]
+
+        return self
+
+    def transform(self, X):
+        """
+        Bin codes of the features.
+
+        Parameters
+        ----------
+        {X}
+
+        Returns
+        -------
+        X_binned: np.array of uint8 of shape = (n_samples, n_features)
+        """
+
+        check_is_fitted(self, ['bin_thresholds'])
+        X = check_array(X, dtype=None, force_all_finite='allow-nan')
+
+        if X.shape[1] != len(self.bin_thresholds):
+            raise ValueError('Expected {} features, got: {}'.format(len(self.bin_thresholds), X.shape[1]))
+
+        X_binned = np.empty(X.shape, dtype=np.uint8)
+
+        for position, thresholds in enumerate(self.bin_thresholds):
+            column = X[:, position]
+            X_binned[:, position] = np.searchsorted(thresholds, column, side='left')
+            X_binned[np.isnan(column), position] = self.max_bins
+
+        return X_binned
+
+
+def bin_folds(X, y, cv, max_bins=MAX_BINS, subsample=BINNING_SUBSAMPLE, random_state=None):
+    """
+    Codes of the rows of each fold of `cv`, binned from the training rows of the fold (see `FeatureBinner`): the
+    validation scores don't depend on the distribution of the validation rows.
+
+    The codes of the folds are stacked, each fold indexing its own rows, as well as the target of the rows.
+
+    Parameters
+    ----------
+    {X}
+    {y}
+    cv: iterable of (train, test) indices
+    max_bins: int, optional
+    subsample: int, optional
+    random_state: int, optional
+        See `FeatureBinner`.
+
+    Returns
+    -------
+    X_binned: np.array of uint8 of shape = (n_fold_samples, n_features)
+    y_folds: np.array of shape = (n_fold_samples,)
+    folds: list of (train, test) tuples of np.array
+        Positions of the rows of each fold in `X_binned`, in the order of `cv`.
+    """
+
+    X_binned = []
+    rows = []
+    folds = []
+    offset = 0
+
+    for train, test in cv:
+        binner = FeatureBinner(max_bins=max_bins, subsample=subsample, random_state=random_state).fit(X[train])
+        rows.append(np.concatenate([train, test]))
+        X_binned.append(binner.transform(X[rows[-1]]))
+        folds.append((offset + np.arange(len(train)), offset + len(train) + np.arange(len(test))))
+        offset += len(rows[-1])
+
+    return np.concatenate(X_binned), np.asarray(y)[np.concatenate(rows)], folds
+
+
+def get_bin_thresholds(column: np.ndarray, max_bins=MAX_BINS) -> np.ndarray:
+    """
+    Thresholds of the bins of a feature, see `FeatureBinner`.
+
+    Returns
+    -------
+    thresholds: np.array of shape = (n_bins - 1)
+    """
+
+    column = column[~np.isnan(column)]
+    distinct_values = np.unique(column)
+
+    if len(distinct_values) <= max_bins:
+        return (distinct_values[:-1] + distinct_values[1:]) / 2.
+
+    percentiles = np.linspace(0, 100, num=max_bins + 1)[1:-1]
+
+    try:
+        quantiles = np.percentile(column, percentiles, method='midpoint')
+    except TypeError:
+        # numpy < 1.22
+        quantiles = np.percentile(column, percentiles, interpolation='midpoint')
+
+    return np.unique(quantiles)
+
+
+def get_histogram_gradient_boosting(random_state=42) -> HistGradientBoostingRegressor:
+    """
+    Histogram gradient boosting stopped early: boosting stops once the loss on 10% of the training data (held out)
+    hasn't improved for 10 iterations, so that the number of iterations is not searched.
+    """
+
+    estimator = HistGradientBoostingRegressor(max_iter=1000, scoring='loss', validation_fraction=0.1,
+                                              n_iter_no_change=10, random_state=random_state)
+
+    if 'early_stopping' in estimator.get_params():
+        # scikit-learn >= 0.23: by default, only for more than 10000 samples.
+        estimator.set_params(early_stopping=True)
+
+    return estimator
@@ -0,0 +1,227 @@
+import warnings
+from math import ceil
+from time import perf_counter
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, clone
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import ParameterSampler, TimeSeriesSplit, check_cv
+
+from wind_power_forecasting.model_selection.utils import as_slice
+
+VALID_RESOURCES = ['n_estimators', 'n_samples']
+
+
+class SuccessiveHalvingSearchCV(BaseEstimator):
+    """
+    Successive halving search of hyper parameters: many candidates are evaluated on a small budget, and only the best
+    ones move on to larger budgets.
+
+    At each rung, all the remaining candidates are scored on all the folds of `cv` with the budget of the rung, and
+    the best ``1 / factor`` of them are kept. Budgets grow geometrically up to `max_resource`, reached by the last
+    rung, which scores at most `factor` candidates. The budget is either:
+
+    + ``'n_estimators'``: the number of trees of ensembles (it's then no longer a searched parameter).
+    + ``'n_samples'``: the number of most recent training samples of each fold, the folds keeping their time
+      ordering.
+
+    (`sklearn.model_selection.HalvingRandomSearchCV` subsamples the training sets at random, which doesn't suit time
+    series.)
+
+    Parameters
+    ----------
+    estimator: estimator object
+    param_distributions: dict
+        See `sklearn.model_selection.ParameterSampler`.
+    n_candidates: int, optional
+        Number of candidates of the first rung.
+    factor: int, optional
+        Budget growth, and inverse of the share of candidates kept, from one rung to the next.
+    resource: str, optional
+        ``'n_estimators'`` (**default**) or ``'n_samples'``.
+    min_resource: int, optional
+        Budget of the first rung. By default, ``max_resource / factor ** (n_rungs - 1)``.
+    max_resource: int, optional
+        Budget of the last rung. By default, the largest `n_estimators` of `param_distributions` (or the one of
+        `estimator`), or all the training samples.
+    cv: cross-validation generator or iterable of (train, test) indices, optional
+        By default, ``TimeSeriesSplit(n_splits=3)``.
+    scoring: str or callable, optional
+    n_jobs: int, optional
+        Number of (candidate, fold) fits run in parallel.
+    random_state: int, optional
+        Seed of the candidates sampling.
+    verbose: bool, optional
+        If `True`, print a line per rung.
+    refit: bool, optional
+        If `False`, the best candidate is not fitted on all the data (e.g. when the folds index rows of another
+        array), and there is no `best_estimator_`.
+
+    Attributes
+    ----------
+    best_estimator_: estimator object
+        Best candidate, fitted on all the data with `max_resource` (if `refit`).
+    best_params_: dict
+        Including the budget, for ``'n_estimators'``.
+    best_score_: float
+        Mean score of the best candidate on the last rung.
+    rung_results_: list of dict
+        For each rung: its ``resource``, the scored ``params``, their ``mean_test_score``, the elapsed ``time`` and
+        the sum of the ``fit_time`` of the rung.
+    """
+
+    def __init__(self, estimator, param_distributions, n_candidates=27, factor=3, resource='n_estimators',
+                 min_resource=None, max_resource=None, cv=None, scoring=None, n_jobs=None, random_state=None,
+                 verbose=False, refit=True):
+        self.estimator = estimator
+        self.param_distributions = param_distributions
+        self.n_candidates = n_candidates
+        self.factor = factor
+        self.resource = resource
+        self.min_resource = min_resource
+        self.max_resource = max_resource
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.verbose = verbose
+        self.refit = refit
+
+    def fit(self, X, y):
+        """
+        Run the search, and fit the best candidate on all the data (if `refit`).
+
+        Returns
+        -------
+        self: returns an instance of self.
+
+        Raises
+        ------
+        ValueError
+            If the resource is unknown, or is ``'n_estimators'`` for an estimator without such a parameter.
+        """
+
+        if self.resource not in VALID_RESOURCES:
+            raise ValueError('Unexpected resource: {}. Should be one of: {}'.format(self.resource, VALID_RESOURCES))
+
+        if self.resource == 'n_estimators' and 'n_estimators' not in self.estimator.get_params():
+            raise ValueError('The estimator has no n_estimators parameter: {}'.format(self.estimator))
+
+        cv = check_cv(TimeSeriesSplit(n_splits=3) if self.cv is None else self.cv)
+        splits = list(cv.split(X, y))
+        scorer = check_scoring(self.estimator, scoring=self.scoring)
+
+        param_distributions = dict(self.param_distributions)
+        max_resource = self._get_max_resource(param_distributions, splits)
+
+        if self.resource == 'n_estimators':
+            # The number of trees is the budget.
+            param_distributions.pop('n_estimators', None)
+
+        candidates = list(ParameterSampler(param_distributions, self.n_candidates, random_state=self.random_state))
+        resources = get_resources(len(candidates), self.factor, max_resource, self.min_resource)
+        self.rung_results_ = []
+
+        for rung, resource in enumerate(resources):
+            start = perf_counter()
+            results = Parallel(n_jobs=self.n_jobs)(
+                delayed(_fit_and_score)(self.estimator, params, X, y, train, test, scorer, self.resource, resource)
+                for params in candidates for train, test in splits)
+
+            scores, fit_times = np.array(results).reshape(len(candidates), len(splits), 2).transpose(2, 0, 1)
+            mean_scores = scores.mean(axis=1)
+            self.rung_results_.append({'resource': resource, 'params': candidates, 'mean_test_score': mean_scores,
+                                       'time': perf_counter() - start, 'fit_time': fit_times.sum()})
+
+            if self.verbose:
+                print('Rung {}: {} candidates, {}={}: {:.1f}s'.format(rung, len(candidates), self.resource, resource,
+                                                                     self.rung_results_[-1]['time']))
+
+            # Best candidates first (failed ones, scored NaN, last).
+            order = np.argsort(-mean_scores, kind='stable')
+            n_kept = len(candidates) if rung == len(resources) - 1 else ceil(len(candidates) / self.factor)
+            candidates = [candidates[position] for position in order[:n_kept]]
+
+        self.best_score_ = mean_scores[order[0]]
+        self.best_params_ = dict(candidates[0])
+
+        if self.resource == 'n_estimators':
+            self.best_params_['n_estimators'] = max_resource
+
+        if self.refit:
+            self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+
+        return self
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+    def _get_max_resource(self, param_distributions, splits) -> int:
+        if self.max_resource is not None:
+            return self.max_resource
+
+        if self.resource == 'n_samples':
+            return max(len(train) for train, _ in splits)
+
+        n_estimators = param_distributions.get('n_estimators')
+
+        if isinstance(n_estimators, (list, tuple, np.ndarray)):
+            return int(max(n_estimators))
+
+        return self.estimator.get_params()['n_estimators']
+
+
+def get_resources(n_candidates: int, factor: int, max_resource: int, min_resource: int = None) -> list:
+    """
+    Budget of each rung of a successive halving search.
+
+    There are as many rungs as needed to keep at most `factor` candidates, starting from `n_candidates` and keeping
+    ``1 / factor`` of them at each rung. Budgets grow geometrically from `min_resource` to `max_resource`.
+
+    Returns
+    -------
+    resources: list of int
+    """
+
+    if factor <= 1:
+        raise ValueError('factor should be greater than 1, got: {}'.format(factor))
+
+    n_rungs = 1
+
+    while n_candidates > factor:
+        n_candidates = ceil(n_candidates / factor)
+        n_rungs += 1
+
+    if min_resource is None:
+        min_resource = max_resource / factor ** (n_rungs - 1)
+
+    resources = np.geomspace(max(min(min_resource, max_resource), 1), max_resource, n_rungs)
+
+    return [int(round(resource)) for resource in resources]
+
+
+def _fit_and_score(estimator, params, X, y, train, test, scorer, resource, value):
+    """Score of a candidate on a fold with a budget, and its fit time. Failed fits are scored NaN."""
+
+    estimator = clone(estimator).set_params(**params)
+
+    if resource == 'n_estimators':
+        estimator.set_params(n_estimators=value)
+    else:
+        # Most recent samples of the fold.
+        train = train[-value:]
+
+    # Time series folds are contiguous: slicing them doesn't copy the (shared) data.
+    train, test = as_slice(train), as_slice(test)
+    start = perf_counter()
+
+    try:
+        estimator.fit(X[train], y[train])
+    except Exception as error:
+        warnings.warn('Candidate {} failed: {!r}'.format(params, error))
+        return np.nan, perf_counter() - start
+
+    fit_time = perf_counter() - start
+
+    return scorer(estimator, X[test], y[test]), fit_time
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from sklearn.model_selection import TimeSeriesSplit
+
+from wind_power_forecasting.model_selection.autotuning import model_autotuning
+from wind_power_forecasting.model_selection.binning import FeatureBinner, bin_folds, get_histogram_gradient_boosting
+
+
+def test_codes():
+    rng = np.random.RandomState(0)
+    X = np.c_[rng.randn(1000), rng.randint(0, 5, 1000)]
+    X[::7, 0] = np.nan
+
+    X_binned = FeatureBinner(max_bins=16).fit(X).transform(X)
+    is_missing = np.isnan(X[:, 0])
+
+    assert X_binned.dtype == np.uint8
+    assert np.all(X_binned[is_missing, 0] == 16)
+    # Quantile bins, in the order of the values.
+    codes = X_binned[~is_missing, 0][np.argsort(X[~is_missing, 0])]
+    assert np.all(np.diff(codes.astype(int)) >= 0) and codes.max() == 15
+    # Few distinct values: a bin per value.
+    np.testing.assert_array_equal(X_binned[:, 1], X[:, 1])
+
+    with pytest.raises(ValueError):
+        FeatureBinner(max_bins=256).fit(X)
+
+
+def test_bin_folds():
+    rng = np.random.RandomState(0)
+    # Drifting feature: most of its range is after the first fold.
+    X = np.c_[np.arange(600.), rng.rand(600)]
+    y = rng.rand(600)
+    cv = list(TimeSeriesSplit(n_splits=3).split(X))
+
+    X_binned, y_folds, folds = bin_folds(X, y, cv, random_state=42)
+
+    assert X_binned.dtype == np.uint8 and len(X_binned) == len(y_folds) == sum(len(tr) + len(te) for tr, te in cv)
+    for (train, test), (binned_train, binned_test) in zip(cv, folds):
+        # Codes of the rows of the fold, binned from its training rows.
+        binner = FeatureBinner(random_state=42).fit(X[train])
+        np.testing.assert_array_equal(X_binned[binned_train], binner.transform(X[train]))
+        np.testing.assert_array_equal(X_binned[binned_test], binner.transform(X[test]))
+        np.testing.assert_array_equal(y_folds[binned_train], y[train])
+        np.testing.assert_array_equal(y_folds[binned_test], y[test])
+
+    # The rows after the first fold are not clamped to its last bin.
+    last_train = folds[-1][0]
+    assert len(np.unique(X_binned[last_train[len(cv[0][0]):], 0])) > 100
+
+
+def test_autotuning_bins_once():
+    rng = np.random.RandomState(0)
+    X = np.c_[rng.rand(600, 3), np.arange(600.)]
+    y = X[:, 0] + 0.1 * rng.randn(600)
+
+    estimator = get_histogram_gradient_boosting().set_params(max_iter=20)
+    best_estimator, best_params, _ = model_autotuning(X, y, estimator=estimator, n_iter=2)
+
+    binner = best_estimator.named_steps['binning']
+    # The best candidate is fitted on the rows binned from all of them.
+    expected = FeatureBinner(random_state=42).fit(X)
+    for thresholds, expected_thresholds in zip(binner.bin_thresholds, expected.bin_thresholds):
+        np.testing.assert_array_equal(thresholds, expected_thresholds)
+    first_train = next(TimeSeriesSplit(n_splits=3).split(X))[0]
+    assert binner.bin_thresholds[3][-1] > X[first_train, 3].max()
+    assert set(best_params) <= set(estimator.get_params())
+    assert best_estimator.predict(X).shape == (600,)
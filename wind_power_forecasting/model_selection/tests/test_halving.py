@@ -0,0 +1,42 @@
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import TimeSeriesSplit
+
+from wind_power_forecasting.model_selection.halving import SuccessiveHalvingSearchCV, get_resources
+
+
+def test_get_resources():
+    # 27 -> 9 -> 3 candidates.
+    assert get_resources(27, 3, max_resource=900) == [100, 300, 900]
+    assert get_resources(3, 3, max_resource=900) == [900]
+
+
+class TestSuccessiveHalvingSearchCV:
+
+    def setup_method(self):
+        rng = np.random.RandomState(0)
+        self.X = rng.rand(300, 4)
+        self.y = self.X[:, 0] + 0.1 * rng.randn(300)
+
+    def test_n_estimators(self):
+        search = SuccessiveHalvingSearchCV(RandomForestRegressor(random_state=0),
+                                           {'n_estimators': [10, 90], 'max_depth': [1, 2, 3, 4, 5, 6, 7, 8, None]},
+                                           n_candidates=9, cv=TimeSeriesSplit(n_splits=2), random_state=0)
+        search.fit(self.X, self.y)
+
+        assert [len(rung['params']) for rung in search.rung_results_] == [9, 3]
+        assert [rung['resource'] for rung in search.rung_results_] == [30, 90]
+        # Only the best candidates of a rung are scored on the next one.
+        first_rung = search.rung_results_[0]
+        best_params = [first_rung['params'][i] for i in np.argsort(-first_rung['mean_test_score'])[:3]]
+        assert search.rung_results_[1]['params'] == best_params
+        assert search.best_params_['n_estimators'] == search.best_estimator_.n_estimators == 90
+
+    def test_n_samples(self):
+        search = SuccessiveHalvingSearchCV(RandomForestRegressor(n_estimators=10, random_state=0),
+                                           {'max_depth': [1, 2, 3, 4, 5, 6, 7, 8, None]}, n_candidates=9,
+                                           resource='n_samples', cv=TimeSeriesSplit(n_splits=2), random_state=0)
+        search.fit(self.X, self.y)
+
+        # The last fold trains on 200 samples.
+        assert [rung['resource'] for rung in search.rung_results_] == [67, 200]
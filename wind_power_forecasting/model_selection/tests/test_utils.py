@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.model_selection import TimeSeriesSplit
+
+from wind_power_forecasting.model_selection.utils import get_time_series_folds
+
+
+def test_time_series_folds():
+    # 3 wind farms, some of them missing some hours.
+    times = np.repeat(pd.date_range('2021-01-01', periods=50, freq='H').values, 3)
+    times = np.delete(times, [4, 5, 30, 100, 149])
+
+    folds = get_time_series_folds(times, n_splits=4)
+
+    assert len(folds) == 4
+    for train, test in folds:
+        assert times[train].max() < times[test].min()
+        np.testing.assert_array_equal(train, np.arange(len(train)))
+        np.testing.assert_array_equal(test, np.arange(test[0], test[0] + len(test)))
+    # All the rows are validated once, but the ones of the first training set.
+    np.testing.assert_array_equal(np.concatenate([test for _, test in folds]), np.arange(len(folds[0][0]), len(times)))
+
+    # Distinct timestamps: the folds of a TimeSeriesSplit.
+    for (train, test), (expected_train, expected_test) in zip(get_time_series_folds(np.arange(20.)),
+                                                              TimeSeriesSplit(n_splits=3).split(np.arange(20))):
+        np.testing.assert_array_equal(train, expected_train)
+        np.testing.assert_array_equal(test, expected_test)
+
+    with pytest.raises(ValueError):
+        get_time_series_folds(times[::-1])
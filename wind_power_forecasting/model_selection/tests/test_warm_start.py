@@ -0,0 +1,25 @@
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import TimeSeriesSplit, cross_val_score
+
+from wind_power_forecasting.model_selection.warm_start import WarmStartForestSearchCV
+
+
+def test_same_scores_as_from_scratch():
+    rng = np.random.RandomState(0)
+    X = rng.rand(200, 4)
+    y = X[:, 0] + 0.1 * rng.randn(200)
+    cv = TimeSeriesSplit(n_splits=2)
+
+    search = WarmStartForestSearchCV(RandomForestRegressor(random_state=0),
+                                     {'n_estimators': [20, 5, 10], 'max_depth': [2, 4]}, n_iter=2, cv=cv,
+                                     random_state=0).fit(X, y)
+
+    for curve in search.curves_:
+        assert curve['n_estimators'] == [5, 10, 20]
+        for size, score in zip(curve['n_estimators'], curve['mean_test_score']):
+            estimator = RandomForestRegressor(n_estimators=size, random_state=0, **curve['params'])
+            assert score == cross_val_score(estimator, X, y, cv=cv).mean()
+
+    assert search.best_score_ == max(curve['mean_test_score'].max() for curve in search.curves_)
+    assert search.best_estimator_.n_estimators == search.best_params_['n_estimators']
@@ -3,6 +3,37 @@ from typing import Dict
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import TimeSeriesSplit
+
+from wind_power_forecasting.model_selection.binning import HistGradientBoostingRegressor, \
+    get_histogram_gradient_boosting
+
+VALID_ESTIMATORS = ['random_forest', 'hist_gradient_boosting']
+
+
+def get_estimator(name='random_forest', random_state=42):
+    """
+    Estimator to search the hyper parameters of, by name.
+
+    Parameters
+    ----------
+    name: str, optional
+        ``'random_forest'`` (**default**) or ``'hist_gradient_boosting'`` (stopped early, see
+        `get_histogram_gradient_boosting`).
+    random_state: int, optional
+
+    Returns
+    -------
+    estimator: estimator object
+    """
+
+    if name == 'random_forest':
+        return RandomForestRegressor(random_state=random_state)
+
+    if name == 'hist_gradient_boosting':
+        return get_histogram_gradient_boosting(random_state=random_state)
+
+    raise ValueError('Unexpected estimator: {}. Should be one of: {}'.format(name, VALID_ESTIMATORS))
 
 
 def get_estimator_parameters_dict(estimator) -> Dict:
@@ -33,7 +64,76 @@ def get_estimator_parameters_dict(estimator) -> Dict:
                        'min_samples_leaf': min_samples_leaf,
                        'bootstrap': bootstrap}
 
+    elif isinstance(estimator, HistGradientBoostingRegressor):
+
+        # The number of iterations is given by the early stopping (see get_histogram_gradient_boosting)
+        # Shrinkage of each tree
+        learning_rate = [0.02, 0.05, 0.1, 0.2]
+        # Maximum number of leaves of each tree
+        max_leaf_nodes = [15, 31, 63, 127]
+        # Maximum number of levels in tree
+        max_depth = [4, 6, 8, 12, None]
+        # Minimum number of samples required at each leaf node
+        min_samples_leaf = [10, 20, 50, 100, 200]
+        # L2 regularization of the leaves values
+        l2_regularization = [0., 0.1, 1., 10.]
+        # Create the parameter grid
+        params_grid = {'learning_rate': learning_rate,
+                       'max_leaf_nodes': max_leaf_nodes,
+                       'max_depth': max_depth,
+                       'min_samples_leaf': min_samples_leaf,
+                       'l2_regularization': l2_regularization}
+
     else:
         raise ValueError('Unexpected estimator: {}'.format(estimator))
 
     return params_grid
+
+
+def as_slice(indices):
+    """
+    Contiguous increasing indices (e.g. of a `TimeSeriesSplit` fold) as a slice, so that indexing an array with them
+    returns a view instead of a copy (e.g. of a memory-mapped array). Other indices are returned as is.
+    """
+
+    indices = np.asarray(indices)
+
+    if len(indices) and np.array_equal(np.diff(indices), np.ones(len(indices) - 1, dtype=indices.dtype)):
+        return slice(int(indices[0]), int(indices[-1]) + 1)
+
+    return indices
+
+
+def get_time_series_folds(times, n_splits=3) -> list:
+    """
+    `TimeSeriesSplit` folds of rows sorted by time, cut between distinct timestamps: the rows of a timestamp (e.g. of
+    several wind farms) are all in the same set, and all the validation rows of a fold come after its training rows.
+
+    Parameters
+    ----------
+    times: array-like of shape = (n_samples,)
+        Timestamps of the rows, in increasing order.
+    n_splits: int, optional
+
+    Returns
+    -------
+    folds: list of (train, test) tuples of np.array
+        Contiguous positions of the rows.
+
+    Raises
+    ------
+    ValueError
+        If the rows are not sorted by time.
+    """
+
+    times = np.asarray(times)
+
+    if np.any(times[1:] < times[:-1]):
+        raise ValueError('The rows should be sorted by time')
+
+    distinct_times = np.unique(times)
+    # Position of the first row of each timestamp, and the end of the rows.
+    bounds = np.r_[np.searchsorted(times, distinct_times, side='left'), len(times)]
+
+    return [(np.arange(bounds[train[-1] + 1]), np.arange(bounds[test[0]], bounds[test[-1] + 1]))
+            for train, test in TimeSeriesSplit(n_splits=n_splits).split(distinct_times)]
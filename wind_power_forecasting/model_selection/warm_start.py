@@ -0,0 +1,143 @@
+from time import perf_counter
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, clone
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import ParameterSampler, TimeSeriesSplit, check_cv
+
+from wind_power_forecasting.model_selection.utils import as_slice
+
+
+class WarmStartForestSearchCV(BaseEstimator):
+    """
+    Randomized search of the hyper parameters of an ensemble, where all the ensemble sizes are scored by growing a
+    single ensemble per fold.
+
+    The parameters other than `n_estimators` are sampled `n_iter` times. For each of these groups and each fold, the
+    ensemble is grown with `warm_start` through the `n_estimators` values (sorted), and scored at each of them: a
+    2000 trees forest already holds the first 200, 400, ... trees (the trees are the same as when fitting each size
+    from scratch, the seeds of the trees being drawn in order). Scoring all the sizes costs as much as fitting the
+    largest ensemble once per fold.
+
+    Parameters
+    ----------
+    estimator: estimator object
+        Ensemble with `n_estimators` and `warm_start` parameters (e.g. `RandomForestRegressor`).
+    param_distributions: dict
+        See `sklearn.model_selection.ParameterSampler`. Its `n_estimators`, if any, is the list of the scored sizes.
+    n_iter: int, optional
+        Number of groups of parameters (all their sizes are scored).
+    n_estimators: list of int, optional
+        Scored sizes, if not in `param_distributions`.
+    cv: cross-validation generator or iterable of (train, test) indices, optional
+        By default, ``TimeSeriesSplit(n_splits=3)``.
+    scoring: str or callable, optional
+    n_jobs: int, optional
+        Number of (group, fold) ensembles grown in parallel.
+    random_state: int, optional
+        Seed of the parameters sampling.
+    refit: bool, optional
+        If `False`, the best candidate is not fitted on all the data (e.g. when the folds index rows of another
+        array), and there is no `best_estimator_`.
+
+    Attributes
+    ----------
+    best_estimator_: estimator object
+        Best candidate, fitted on all the data (if `refit`).
+    best_params_: dict
+    best_score_: float
+    curves_: list of dict
+        For each group: its ``params``, the scored ``n_estimators``, the ``mean_test_score`` of each size, the
+        ``test_scores`` of each fold and size, and the ``fit_time`` of the ensembles of all the folds.
+    """
+
+    def __init__(self, estimator, param_distributions, n_iter=10, n_estimators=None, cv=None, scoring=None,
+                 n_jobs=None, random_state=None, refit=True):
+        self.estimator = estimator
+        self.param_distributions = param_distributions
+        self.n_iter = n_iter
+        self.n_estimators = n_estimators
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.refit = refit
+
+    def fit(self, X, y):
+        """
+        Run the search, and fit the best candidate on all the data (if `refit`).
+
+        Returns
+        -------
+        self: returns an instance of self.
+
+        Raises
+        ------
+        ValueError
+            If the estimator can't be grown with `warm_start`, or if there is no size to score.
+        """
+
+        estimator_params = self.estimator.get_params()
+
+        if 'n_estimators' not in estimator_params or 'warm_start' not in estimator_params:
+            raise ValueError('The estimator should have n_estimators and warm_start parameters: {}'.format(
+                self.estimator))
+
+        param_distributions = dict(self.param_distributions)
+        sizes = param_distributions.pop('n_estimators', self.n_estimators)
+
+        if sizes is None or not len(sizes):
+            raise ValueError('No n_estimators to score')
+
+        sizes = sorted(set(int(size) for size in sizes))
+        cv = check_cv(TimeSeriesSplit(n_splits=3) if self.cv is None else self.cv)
+        splits = list(cv.split(X, y))
+        scorer = check_scoring(self.estimator, scoring=self.scoring)
+        groups = list(ParameterSampler(param_distributions, self.n_iter, random_state=self.random_state))
+
+        results = Parallel(n_jobs=self.n_jobs)(
+            delayed(_grow_and_score)(self.estimator, params, sizes, X, y, train, test, scorer)
+            for params in groups for train, test in splits)
+
+        self.curves_ = []
+
+        for position, params in enumerate(groups):
+            group_results = results[position * len(splits):(position + 1) * len(splits)]
+            test_scores = np.array([scores for scores, _ in group_results])
+            self.curves_.append({'params': params, 'n_estimators': sizes, 'mean_test_score': test_scores.mean(axis=0),
+                                 'test_scores': test_scores, 'fit_time': sum(time for _, time in group_results)})
+
+        # Best size of each group (the smallest one in case of a tie), then best group.
+        best_sizes = [np.argmax(curve['mean_test_score']) for curve in self.curves_]
+        best_scores = [curve['mean_test_score'][size] for curve, size in zip(self.curves_, best_sizes)]
+        best_group = int(np.argmax(best_scores))
+
+        self.best_score_ = best_scores[best_group]
+        self.best_params_ = dict(groups[best_group], n_estimators=sizes[best_sizes[best_group]])
+        if self.refit:
+            self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+
+        return self
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+
+def _grow_and_score(estimator, params, sizes, X, y, train, test, scorer):
+    """Scores of an ensemble grown on a fold through increasing sizes, and its total fit time."""
+
+    estimator = clone(estimator).set_params(warm_start=True, **params)
+    # Time series folds are contiguous: slicing them doesn't copy the (shared) data.
+    train, test = as_slice(train), as_slice(test)
+    scores = []
+    fit_time = 0.
+
+    for size in sizes:
+        start = perf_counter()
+        # Only the missing estimators are fitted.
+        estimator.set_params(n_estimators=size).fit(X[train], y[train])
+        fit_time += perf_counter() - start
+        scores.append(scorer(estimator, X[test], y[test]))
+
+    return np.array(scores), fit_time
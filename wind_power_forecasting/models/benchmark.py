@@ -0,0 +1,156 @@
+import argparse
+import os
+import tempfile
+from time import perf_counter
+from typing import Tuple
+
+import pandas as pd
+
+from wind_power_forecasting import X_TRAIN_FILE, X_TEST_FILE, Y_TRAIN_FILE, ID_LABEL, TARGET_LABEL, TIME_LABEL, \
+    WF_LABEL
+from wind_power_forecasting.metrics.regression import cumulated_absolute_percentage_error
+from wind_power_forecasting.model_selection.utils import VALID_ESTIMATORS
+from wind_power_forecasting.models.wind_power_forcaster import WindPowerForecaster
+from wind_power_forecasting.preprocessing.raw_inputs import read_raw_inputs
+from wind_power_forecasting.utils.parallel import get_n_jobs_per_worker
+
+PER_FARM_MODE = 'per-farm'
+GLOBAL_MODE = 'global'
+
+
+def compare_global_and_per_farm(X_df, y_df, test_size=0.2, n_cores=None, estimator_name='random_forest',
+                                verbose=True) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Compare one model per wind farm with a single model of all the wind farms, on a time holdout.
+
+    The last `test_size` share of the hours of each wind farm is held out. Both modes are fitted on the rest, with
+    the same core budget, and predict the holdout.
+
+    Parameters
+    ----------
+    X_df: pandas DataFrame object
+        Features of all the wind farms, with the ``WF`` column.
+    y_df: pandas DataFrame object
+        Targets, with the ``ID`` column.
+    test_size: float, optional
+        Share of the most recent hours of each wind farm held out.
+    n_cores: int, optional
+        Core budget of each search. By default, all the cores usable by the current process.
+    estimator_name: str, optional
+        Estimator searched by both modes, see `get_estimator`.
+    verbose: bool, optional
+
+    Returns
+    -------
+    cape_df: pandas DataFrame object
+        CAPE on the holdout of each wind farm (index) and mode (columns).
+    summary_df: pandas DataFrame object
+        For each mode (index): the ``fit_time`` and ``predict_time`` (in seconds, all the wind farms), the saved
+        ``model_size`` (in bytes, all the models) and the ``cape`` on all the holdouts.
+    """
+
+    is_test = X_df.groupby(WF_LABEL)[TIME_LABEL].rank(method='first', pct=True) > 1. - test_size
+    X_train_df, X_test_df = X_df[~is_test], X_df[is_test]
+    y_train_df = y_df[y_df[ID_LABEL].isin(X_train_df[ID_LABEL])]
+    y_test = y_df.set_index(ID_LABEL)[TARGET_LABEL]
+    n_jobs = get_n_jobs_per_worker(1, n_cores)
+
+    predictions, summaries = {}, {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+
+        # Per farm: a model, a features selection and a search per wind farm.
+        fit_time = predict_time = 0.
+        model_size = 0
+        predict_dfs = []
+
+        for wf, X_train_wf_df in X_train_df.groupby(WF_LABEL, sort=True):
+            X_train_wf_df = X_train_wf_df.drop(columns=WF_LABEL)
+            X_test_wf_df = X_test_df[X_test_df[WF_LABEL] == wf].drop(columns=WF_LABEL)
+            wpf = WindPowerForecaster(target_label=TARGET_LABEL, datetime_label=TIME_LABEL, n_jobs=n_jobs,
+                                      keep_training_data=False, estimator_name=estimator_name)
+
+            start = perf_counter()
+            wpf.fit(X_train_wf_df, y_train_df[y_train_df[ID_LABEL].isin(X_train_wf_df[ID_LABEL])])
+            fit_time += perf_counter() - start
+
+            start = perf_counter()
+            predict_dfs.append(wpf.predict(X_test_wf_df, output_type='dataframe').assign(**{WF_LABEL: wf}))
+            predict_time += perf_counter() - start
+
+            model_size += _get_saved_size(wpf, os.path.join(tmp_dir, '{}.pkl'.format(wf)))
+
+            if verbose:
+                print('Per farm: {}: done'.format(wf))
+
+        predictions[PER_FARM_MODE] = pd.concat(predict_dfs)
+        summaries[PER_FARM_MODE] = {'fit_time': fit_time, 'predict_time': predict_time, 'model_size': model_size}
+
+        # Global: a single model of all the wind farms.
+        wpf = WindPowerForecaster(target_label=TARGET_LABEL, datetime_label=TIME_LABEL, n_jobs=n_jobs,
+                                  keep_training_data=False, group_label=WF_LABEL, estimator_name=estimator_name)
+
+        start = perf_counter()
+        wpf.fit(X_train_df, y_train_df)
+        fit_time = perf_counter() - start
+
+        start = perf_counter()
+        predict_df = wpf.predict(X_test_df, output_type='dataframe')
+        predict_time = perf_counter() - start
+
+        wf_by_id = X_test_df.set_index(ID_LABEL)[WF_LABEL]
+        predictions[GLOBAL_MODE] = predict_df.assign(**{WF_LABEL: wf_by_id.reindex(predict_df.index).values})
+        summaries[GLOBAL_MODE] = {'fit_time': fit_time, 'predict_time': predict_time,
+                                  'model_size': _get_saved_size(wpf, os.path.join(tmp_dir, 'global.pkl'))}
+
+        if verbose:
+            print('Global: done')
+
+    cape_df = pd.DataFrame({mode: _get_capes(predict_df, y_test) for mode, predict_df in predictions.items()})
+    summary_df = pd.DataFrame.from_dict(summaries, orient='index')
+    summary_df['cape'] = [_get_capes(predictions[mode], y_test, by_wind_farm=False) for mode in summary_df.index]
+
+    return cape_df, summary_df
+
+
+def _get_saved_size(wpf, path) -> int:
+    wpf.save(path)
+
+    return os.path.getsize(path)
+
+
+def _get_capes(predict_df, y_test, by_wind_farm=True):
+    """CAPE of the predictions of the held out rows (the rows added for the gaps of the time series are ignored)."""
+
+    predict_df = predict_df[~predict_df.index.duplicated()]
+    predict_df = predict_df.assign(truth=y_test.reindex(predict_df.index).values).dropna()
+
+    if not by_wind_farm:
+        return cumulated_absolute_percentage_error(predict_df['truth'], predict_df.iloc[:, 0])
+
+    return predict_df.groupby(WF_LABEL).apply(
+        lambda wf_df: cumulated_absolute_percentage_error(wf_df['truth'], wf_df.iloc[:, 0]))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Compare one model per wind farm with a single model of all the '
+                                                 'wind farms, on a time holdout of the training set.')
+    parser.add_argument('--test-size', type=float, default=0.2,
+                        help='Share of the most recent hours of each wind farm held out.')
+    parser.add_argument('--cores', type=int, default=None, help='Core budget of each search (default: all).')
+    parser.add_argument('--estimator', choices=VALID_ESTIMATORS, default='random_forest',
+                        help='Estimator searched (default: random_forest).')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+
+    args = parse_args()
+
+    X_train_all_df, _, y_train_all_df = read_raw_inputs(X_TRAIN_FILE, X_TEST_FILE, Y_TRAIN_FILE)
+    cape_df, summary_df = compare_global_and_per_farm(X_train_all_df, y_train_all_df, test_size=args.test_size,
+                                                      n_cores=args.cores, estimator_name=args.estimator)
+
+    print(cape_df.to_string(float_format='{:.2f}'.format))
+    print(summary_df.to_string(float_format='{:.2f}'.format))
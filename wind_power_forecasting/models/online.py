@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+from sklearn.utils import check_array
+from sklearn.utils.validation import check_is_fitted
+
+from wind_power_forecasting import ID_LABEL
+from wind_power_forecasting.features_extraction.time.windows import get_window_size
+from wind_power_forecasting.models.wind_power_forcaster import WindPowerForecaster, PREDICTION_ATTRIBUTES, FREQ
+
+
+class OnlineFeatureState:
+    """
+    Incremental feature extraction of a fitted `WindPowerForecaster`, to score the inputs of each new time step as
+    it arrives.
+
+    The state holds a ring buffer with the last rows of the lagged and rolled columns, and the last values seen by
+    the forward fill of `predict`. Pushing the raw inputs of a new time step only extracts the features of this time
+    step (and of the time steps missing since the previous one, as `predict` does with `asfreq`): the lags and
+    rolling windows are computed over the ring buffer with the same kernels as the batch extraction. The output is
+    hence exactly the one of `predict` over the whole history, at a cost independent of the history length.
+
+    Parameters
+    ----------
+    forecaster: WindPowerForecaster
+        Fitted forecaster.
+    X_history_df: pandas DataFrame object, optional
+        Raw inputs preceding the ones to push (same format as for `predict`), used to initialize the state.
+
+    Raises
+    ------
+    ValueError
+        If the forecaster interpolates the NWP forecasts, which needs the next time steps, or if it's fitted on
+        several groups (see `WindPowerForecaster.fit`).
+
+    Examples
+    --------
+    >>> state = OnlineFeatureState(wpf, X_history_df)
+    >>> y_pred = state.predict(X_new_hour_df)
+    """
+
+    def __init__(self, forecaster: WindPowerForecaster, X_history_df: pd.DataFrame = None):
+        check_is_fitted(forecaster, PREDICTION_ATTRIBUTES)
+
+        if forecaster.nwp_interpolation is not None:
+            # Filling a gap needs the forecasts of the next time steps, which are not pushed yet.
+            raise ValueError('Online features are not supported with NWP interpolation')
+
+        if forecaster.group_label is not None:
+            raise ValueError('Online features are not supported for a model fitted on several groups')
+
+        self.forecaster = forecaster
+        self.raw_labels = None
+        self.last_time = None
+        self.last_seen_df = None
+
+        if X_history_df is not None:
+            self._initialize(list(X_history_df))
+            self._initialize_from_history(X_history_df)
+
+    def push(self, X_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Extract the model-ready features of new time steps, and update the state.
+
+        Parameters
+        ----------
+        X_df: pandas DataFrame object
+            Raw inputs of time steps after the last pushed one (same format as for `predict`).
+
+        Returns
+        -------
+        features_df: pandas DataFrame object
+            Features of each row of `X_df`, indexed by ``ID``, as `predict` feeds them to the estimator.
+
+        Raises
+        ------
+        ValueError
+            If a time step is not after the last pushed one.
+        """
+
+        if self.raw_labels is None:
+            self._initialize(list(X_df))
+
+        X_df, nwp = self.forecaster._preprocess_data(X_df.loc[:, self.raw_labels], copy=True)
+        features_dfs = []
+
+        for time in X_df.index:
+            if self.last_time is not None and time <= self.last_time:
+                raise ValueError('Time steps should be pushed in order, got {} after {}'.format(time,
+                                                                                              self.last_time))
+
+            # Time steps missing since the last push are extracted as empty rows, as `asfreq` does.
+            start = time if self.last_time is None else self.last_time + self.freq
+            index = pd.date_range(start, time, freq=FREQ)
+            rows = np.full(len(index), -1)
+            rows[-1] = X_df.index.get_loc(time)
+            features_df = self._extract_features(X_df.loc[[time]].reindex(index), nwp.take(rows, index=index))
+            features_dfs.append(features_df.iloc[[-1]])
+            self.last_time = time
+
+        return pd.concat(features_dfs)
+
+    def predict(self, X_df: pd.DataFrame) -> np.ndarray:
+        """Push new time steps and apply the model, see `push`."""
+
+        features_df = self.push(X_df)
+        X = check_array(features_df, accept_sparse='csr', dtype=self.forecaster._get_array_dtype())
+
+        return self.forecaster.estimator.predict(X)
+
+    def _initialize(self, raw_labels):
+        forecaster = self.forecaster
+        self.raw_labels = raw_labels
+        self.freq = to_offset(FREQ)
+
+        self.graph = forecaster._get_feature_graph([l for l in raw_labels if l != forecaster.datetime_label])
+        self.to_extract = self.graph.get_ancestors(forecaster.X_labels)
+
+        lag_range, to_lag_labels, periods, to_roll_labels = forecaster._get_time_shifted_inputs(self.graph,
+                                                                                               self.to_extract)
+        windows = [get_window_size(period, pd.DatetimeIndex([], freq=FREQ)) for period in periods]
+        self.buffer_labels = list(dict.fromkeys(to_lag_labels + to_roll_labels))
+        # Previous rows needed by the lags and by the rolling windows (which include the current row).
+        self.buffer_size = max([max(lag_range, default=0)] + [window - 1 for window in windows])
+        self.buffer = None
+        self.buffer_position = 0
+
+    def _initialize_from_history(self, X_history_df):
+        features_df = self.forecaster._build_features(X_history_df, labels=self.forecaster.X_labels)
+
+        self._push_to_buffer(features_df.loc[:, self.buffer_labels].to_numpy())
+        self.last_seen_df = self._select(features_df).fillna(method='ffill').iloc[[-1]]
+        self.last_time = features_df.index[-1]
+
+    def _extract_features(self, X_df, nwp):
+        forecaster = self.forecaster
+        X_df = forecaster._add_instantaneous_features(X_df, self.graph, self.to_extract, drop_empty=False, nwp=nwp)
+
+        # Lags and rolling windows over the previous rows of the buffer followed by the new rows.
+        new_rows = X_df.loc[:, self.buffer_labels].to_numpy()
+        window = np.concatenate([self._get_buffer(new_rows.dtype), new_rows])
+        window_df = pd.DataFrame(window, columns=self.buffer_labels,
+                                 index=pd.date_range(end=X_df.index[-1], periods=len(window), freq=FREQ))
+        time_shifted_df = forecaster._add_time_shifted_features(window_df, self.graph, self.to_extract)
+        time_shifted_df = time_shifted_df.iloc[-len(X_df):].drop(columns=self.buffer_labels)
+        self._push_to_buffer(new_rows)
+
+        features_df = self._select(pd.concat([X_df, time_shifted_df], axis=1))
+
+        # Forward fill from the last seen values, as `predict` does over the whole history.
+        if self.last_seen_df is not None:
+            features_df = pd.concat([self.last_seen_df, features_df])
+
+        features_df = features_df.fillna(method='ffill')
+        self.last_seen_df = features_df.iloc[[-1]]
+
+        if len(features_df) > len(X_df):
+            features_df = features_df.iloc[1:]
+
+        features_df, _ = forecaster._data_cleaning(features_df, from_fit=False, copy=False)
+
+        return features_df
+
+    def _select(self, features_df):
+        return features_df.loc[:, self.forecaster.X_labels + [ID_LABEL]]
+
+    def _get_buffer(self, dtype) -> np.ndarray:
+        """Rows of the ring buffer, from the oldest to the most recent."""
+
+        if self.buffer is None:
+            self.buffer = np.full((self.buffer_size, len(self.buffer_labels)), np.nan, dtype=dtype)
+
+        positions = (self.buffer_position + np.arange(self.buffer_size)) % max(self.buffer_size, 1)
+
+        return self.buffer[positions]
+
+    def _push_to_buffer(self, rows):
+        """Overwrite the oldest rows of the ring buffer with the most recent of `rows`."""
+
+        self._get_buffer(rows.dtype)
+
+        if not self.buffer_size:
+            return
+
+        for row in rows[-self.buffer_size:]:
+            self.buffer[self.buffer_position] = row
+            self.buffer_position = (self.buffer_position + 1) % self.buffer_size
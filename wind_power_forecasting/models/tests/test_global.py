@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+from wind_power_forecasting import ID_LABEL, TARGET_LABEL, TIME_LABEL, WF_CODE_LABEL, WF_LABEL
+from wind_power_forecasting.model_selection.utils import get_time_series_folds
+from wind_power_forecasting.models.wind_power_forcaster import WindPowerForecaster
+
+NWP_LABELS = ['NWP1_00h_D-1_U', 'NWP1_00h_D-1_V', 'NWP1_12h_D-1_U', 'NWP1_12h_D-1_V', 'NWP1_00h_D-1_T',
+              'NWP2_00h_D-1_U', 'NWP2_00h_D-1_V', 'NWP2_00h_D-2_U', 'NWP2_00h_D-2_V']
+
+
+def make_inputs(wind_farms, n_hours, start='2018-05-01', first_id=1, seed=0):
+    """Raw inputs of the wind farms, all of them at each time, and their production."""
+
+    rng = np.random.RandomState(seed)
+    times = pd.date_range(start, periods=n_hours, freq='H').strftime('%Y-%m-%d %H:%M:%S')
+    n_rows = n_hours * len(wind_farms)
+    X_df = pd.DataFrame({ID_LABEL: first_id + np.arange(n_rows), WF_LABEL: np.tile(wind_farms, n_hours),
+                         TIME_LABEL: np.repeat(times, len(wind_farms))})
+    nwp = rng.randn(n_rows, len(NWP_LABELS)) * 3
+    nwp[rng.rand(*nwp.shape) < 0.05] = np.nan
+    X_df = pd.concat([X_df, pd.DataFrame(nwp, columns=NWP_LABELS)], axis=1)
+    y_df = pd.DataFrame({ID_LABEL: X_df[ID_LABEL],
+                         TARGET_LABEL: np.hypot(nwp[:, 0], nwp[:, 1]).clip(0, 10) + rng.rand(n_rows)}).fillna(1.)
+
+    return X_df, y_df
+
+
+class _Forecaster(WindPowerForecaster):
+    """Forecaster with a short search, recording the timestamps of the rows it runs on."""
+
+    def _model_selection(self, X, y, **kwargs):
+        self.search_times_ = kwargs['times']
+        return super()._model_selection(X, y, n_iter=1, **kwargs)
+
+
+class _PredictRecorder:
+
+    def __init__(self, estimator):
+        self.estimator = estimator
+
+    def predict(self, X):
+        self.X = X
+        return self.estimator.predict(X)
+
+
+def make_forecaster(**kwargs):
+    return _Forecaster(TARGET_LABEL, TIME_LABEL, estimator_name='hist_gradient_boosting', **kwargs)
+
+
+class TestGlobalForecaster:
+
+    def setup_method(self):
+        self.wind_farms = ['WF1', 'WF2', 'WF3']
+        self.X_train, self.y_train = make_inputs(self.wind_farms, 150)
+        self.X_test, _ = make_inputs(self.wind_farms, 48, start='2018-06-01', first_id=1000, seed=1)
+
+    def test_folds_respect_time(self):
+        wpf = make_forecaster(group_label=WF_LABEL).fit(self.X_train, self.y_train)
+        times = wpf.search_times_
+        codes = wpf.X[:, wpf.X_labels.index(WF_CODE_LABEL)]
+
+        assert np.all(np.diff(times.astype(np.int64)) >= 0)
+        # The rows of each time in order of the wind farms.
+        assert np.all(np.diff(codes)[times[1:] == times[:-1]] > 0)
+        for train, test in get_time_series_folds(times):
+            assert times[train].max() < times[test].min()
+            # Each fold has the rows of all the wind farms.
+            assert set(codes[train]) == set(codes[test]) == {0, 1, 2}
+
+    def test_same_row_order_as_per_wind_farm(self):
+        wpf = make_forecaster(group_label=WF_LABEL).fit(self.X_train, self.y_train)
+        predict_df = wpf.predict(self.X_test, output_type='dataframe')
+
+        per_wind_farm_dfs = []
+        for wf in self.wind_farms:
+            X_train = self.X_train[self.X_train[WF_LABEL] == wf].drop(columns=WF_LABEL)
+            X_test = self.X_test[self.X_test[WF_LABEL] == wf].drop(columns=WF_LABEL)
+            wind_farm_wpf = make_forecaster().fit(X_train, self.y_train[self.y_train[ID_LABEL].isin(X_train[ID_LABEL])])
+            per_wind_farm_dfs.append(wind_farm_wpf.predict(X_test, output_type='dataframe'))
+
+        pd.testing.assert_index_equal(predict_df.index, pd.concat(per_wind_farm_dfs).index)
+
+    def test_unknown_wind_farm(self):
+        wpf = make_forecaster(group_label=WF_LABEL).fit(self.X_train, self.y_train)
+        X_test, _ = make_inputs(self.wind_farms + ['WF9'], 48, start='2018-06-01', first_id=1000, seed=1)
+        wpf.estimator = _PredictRecorder(wpf.estimator)
+
+        predict_df = wpf.predict(X_test, output_type='dataframe')
+
+        codes = pd.Series(wpf.estimator.X[:, wpf.X_labels.index(WF_CODE_LABEL)], index=predict_df.index)
+        expected = X_test.set_index(ID_LABEL)[WF_LABEL].map({'WF1': 0, 'WF2': 1, 'WF3': 2, 'WF9': -1})
+        pd.testing.assert_series_equal(codes, expected.loc[codes.index].astype(codes.dtype), check_names=False)
+        assert np.all(np.isfinite(predict_df.values))
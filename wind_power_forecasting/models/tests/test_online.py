@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from wind_power_forecasting import ID_LABEL, WF_LABEL
+from wind_power_forecasting.features_extraction.time.time_shift import get_lag_label
+from wind_power_forecasting.models.online import OnlineFeatureState
+from wind_power_forecasting.models.tests.test_global import make_forecaster, make_inputs
+
+
+def test_same_features_as_batch():
+    X_train, y_train = make_inputs(['WF1'], 150)
+    wpf = make_forecaster(lag_range=(1, 2, 5), roll_periods=('3H', '12H', '24H'))
+    wpf.fit(X_train.drop(columns=WF_LABEL), y_train)
+    X_df, _ = make_inputs(['WF1'], 100, start='2018-06-01', first_id=1000, seed=1)
+    # Missing time steps, filled by both extractions.
+    X_df = X_df.drop(columns=WF_LABEL).drop(index=[70, 71, 85])
+
+    state = OnlineFeatureState(wpf, X_df.iloc[:50])
+    online_df = pd.concat([state.push(X_df.iloc[[position]]) for position in range(50, len(X_df))])
+
+    batch_df = wpf._build_features(X_df, labels=wpf.X_labels)
+    batch_df = wpf._features_selection(batch_df, from_fit=False)
+    batch_df, _ = wpf._data_cleaning(batch_df, from_fit=False)
+    # The filled time steps have the ID of the previous one.
+    batch_df = batch_df[~batch_df.index.duplicated(keep='first')].loc[online_df.index]
+
+    assert list(online_df) == list(batch_df)
+    assert {get_lag_label('U', 2), get_lag_label('U', 5)} <= set(online_df)
+    assert {label.rsplit('_', 1)[1] for label in online_df if '_rollmean_' in label} == {'3H', '12H', '24H'}
+    np.testing.assert_array_equal(online_df.index, X_df[ID_LABEL].iloc[50:])
+    assert np.array_equal(online_df.values, batch_df.values)
@@ -0,0 +1,285 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from wind_power_forecasting import TARGET_LABEL, TIME_LABEL, WF_LABEL
+from wind_power_forecasting.models.wind_power_forcaster import WindPowerForecaster
+from wind_power_forecasting.utils.parallel import get_n_jobs_per_worker, limit_threads
+
+MODEL_FILE = 'model.pkl'
+PREDICTIONS_FILE = 'predictions.pkl'
+CONFIG_FILE = 'config.json'
+# Checkpoint name of the model of all the wind farms.
+GLOBAL_MODEL_NAME = 'global'
+
+
+def fit_predict_wind_farms(X_train_partition, y_train_partition, X_test_partition, n_jobs=1, checkpoint_dir=None,
+                           resume=True, prediction_label=TARGET_LABEL, verbose=True, n_cores=None,
+                           estimator_name='random_forest', nwp_train=None, nwp_test=None) -> pd.DataFrame:
+    """
+    Fit one `WindPowerForecaster` per wind farm and predict the test set of each of them.
+
+    Wind farms are dispatched to a pool of `n_jobs` processes. The cores are shared between the workers: each
+    of them runs its hyper parameters search with ``n_cores // n_jobs`` jobs (the search workers reading a single
+    shared copy of the features of their wind farm).
+
+    When `checkpoint_dir` is given, the fitted model and the predictions of each wind farm are saved as soon as it
+    is done. With `resume`, wind farms already checkpointed with the same configuration (see
+    `WindPowerForecaster.get_run_config`) are not fitted again, so that an interrupted run only
+    fits the missing ones.
+
+    Parameters
+    ----------
+    X_train_partition: DataFramePartition
+        Training features partitioned by wind farm.
+    y_train_partition: DataFramePartition
+        Training target partitioned by wind farm.
+    X_test_partition: DataFramePartition
+        Test features partitioned by wind farm.
+    n_jobs: int, optional
+        Number of wind farms fitted at the same time.
+    checkpoint_dir: str, optional
+        Directory where each wind farm checkpoint is stored. If `None`, nothing is saved.
+    resume: bool, optional
+        If `True` (**default**), reuse the checkpoints found in `checkpoint_dir`.
+    prediction_label: str, optional
+    verbose: bool, optional
+    n_cores: int, optional
+        Core budget shared by the wind farms workers and their searches. By default, all the cores usable by the
+        current process.
+    estimator_name: str, optional
+        Estimator searched for each wind farm, see `get_estimator`.
+    nwp_train: PackedNumericalWeatherPredictions, optional
+        Forecasts of the rows of the dataframe `X_train_partition` splits (see `read_raw_inputs` with `pack_nwp`).
+        By default, the NWP columns of `X_train_partition`.
+    nwp_test: PackedNumericalWeatherPredictions, optional
+        Same as `nwp_train`, for `X_test_partition`.
+
+    Returns
+    -------
+    predict_df: pandas DataFrame object
+        Predictions of all the wind farms, indexed by ``ID`` and ordered as `X_train_partition.groups`, whatever
+        the order in which the wind farms were completed.
+    """
+
+    all_wf = X_train_partition.groups
+    predict_dfs = {}
+
+    if checkpoint_dir is not None and resume:
+        config = make_wind_farm_forecaster(estimator_name=estimator_name).get_run_config()
+
+        for wf in all_wf:
+            if has_wind_farm_checkpoint(checkpoint_dir, wf, config):
+                predict_dfs[wf] = load_wind_farm_predictions(checkpoint_dir, wf)
+
+    to_fit_wf = [wf for wf in all_wf if wf not in predict_dfs]
+
+    if verbose and predict_dfs:
+        print('Resuming: {}/{} wind farms already done'.format(len(predict_dfs), len(all_wf)))
+
+    n_workers = max(1, min(n_jobs, len(to_fit_wf)))
+    n_jobs_per_worker = get_n_jobs_per_worker(n_workers, n_cores)
+
+    # Forecasts sorted by wind farm once, so that those of each wind farm are a range of rows.
+    nwp_train = None if nwp_train is None else nwp_train.take(X_train_partition.positions)
+    nwp_test = None if nwp_test is None else nwp_test.take(X_test_partition.positions)
+
+    def get_args(wf):
+        return (wf, X_train_partition.get_group(wf), y_train_partition.get_group(wf), X_test_partition.get_group(wf),
+                n_jobs_per_worker, checkpoint_dir, prediction_label, estimator_name,
+                _take_group_forecasts(nwp_train, X_train_partition, wf),
+                _take_group_forecasts(nwp_test, X_test_partition, wf))
+
+    if n_workers == 1:
+        for wf in to_fit_wf:
+            predict_dfs[wf] = fit_predict_wind_farm(*get_args(wf))
+            _print_progress(verbose, wf, predict_dfs, all_wf)
+
+    else:
+        # Each worker also caps its native thread pools (BLAS, OpenMP) to its share of the cores.
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=limit_threads, initargs=(n_jobs_per_worker,)) as executor:
+            futures = {executor.submit(fit_predict_wind_farm, *get_args(wf)): wf for wf in to_fit_wf}
+
+            for future in as_completed(futures):
+                wf = futures[future]
+                predict_dfs[wf] = future.result()
+                _print_progress(verbose, wf, predict_dfs, all_wf)
+
+    return pd.concat([predict_dfs[wf] for wf in all_wf])
+
+
+def fit_predict_global(X_train_df, y_train_df, X_test_df, checkpoint_dir=None, resume=True,
+                       prediction_label=TARGET_LABEL, verbose=True, n_cores=None,
+                       estimator_name='random_forest', nwp_train=None, nwp_test=None) -> pd.DataFrame:
+    """
+    Fit a single `WindPowerForecaster` on all the wind farms, the wind farm being a feature, and predict their test
+    sets at once.
+
+    The features selection and the hyper parameters search run once, with all the cores of the budget.
+
+    Parameters
+    ----------
+    X_train_df: pandas DataFrame object
+        Training features of all the wind farms, with the ``WF`` column.
+    y_train_df: pandas DataFrame object
+    X_test_df: pandas DataFrame object
+        Test features of all the wind farms, with the ``WF`` column.
+    checkpoint_dir: str, optional
+        Directory where the model and its predictions are saved (as the ``global`` checkpoint). If `None`, nothing
+        is saved.
+    resume: bool, optional
+        If `True` (**default**), reuse the checkpoint found in `checkpoint_dir`, if it has the same configuration.
+    prediction_label: str, optional
+    verbose: bool, optional
+    n_cores: int, optional
+        Core budget of the search. By default, all the cores usable by the current process.
+    estimator_name: str, optional
+        Estimator searched, see `get_estimator`.
+    nwp_train: PackedNumericalWeatherPredictions, optional
+        Forecasts of the rows of `X_train_df` (see `read_raw_inputs` with `pack_nwp`). By default, the NWP columns of
+        `X_train_df`.
+    nwp_test: PackedNumericalWeatherPredictions, optional
+        Same as `nwp_train`, for `X_test_df`.
+
+    Returns
+    -------
+    predict_df: pandas DataFrame object
+        Predictions of all the wind farms, indexed by ``ID``, one wind farm after the other.
+    """
+
+    wpf = make_wind_farm_forecaster(n_jobs=get_n_jobs_per_worker(1, n_cores), group_label=WF_LABEL,
+                                    estimator_name=estimator_name)
+
+    if checkpoint_dir is not None and resume and has_wind_farm_checkpoint(checkpoint_dir, GLOBAL_MODEL_NAME,
+                                                                          wpf.get_run_config()):
+        if verbose:
+            print('Resuming: global model already done')
+
+        return load_wind_farm_predictions(checkpoint_dir, GLOBAL_MODEL_NAME)
+
+    predict_df = wpf.fit_predict(X_train_df, y_train_df, X_test_df, nwp_train=nwp_train, nwp_test=nwp_test,
+                                 output_type='dataframe', prediction_label=prediction_label)
+
+    if checkpoint_dir is not None:
+        save_wind_farm_checkpoint(checkpoint_dir, GLOBAL_MODEL_NAME, wpf, predict_df)
+
+    if verbose:
+        print('Global model: done')
+
+    return predict_df
+
+
+def fit_predict_wind_farm(wf, X_train_df, y_train_df, X_test_df, n_jobs=None, checkpoint_dir=None,
+                          prediction_label=TARGET_LABEL, estimator_name='random_forest', nwp_train=None,
+                          nwp_test=None) -> pd.DataFrame:
+    """
+    Fit a `WindPowerForecaster` on a single wind farm and predict its test set (with the packed forecasts of the rows
+    of `X_train_df` and `X_test_df`, if given).
+
+    Returns
+    -------
+    predict_df: pandas DataFrame object
+        Predictions indexed by ``ID``.
+    """
+
+    wpf = make_wind_farm_forecaster(n_jobs=n_jobs, estimator_name=estimator_name)
+    predict_df = wpf.fit_predict(X_train_df, y_train_df, X_test_df, nwp_train=nwp_train, nwp_test=nwp_test,
+                                 output_type='dataframe', prediction_label=prediction_label)
+
+    if checkpoint_dir is not None:
+        save_wind_farm_checkpoint(checkpoint_dir, wf, wpf, predict_df)
+
+    return predict_df
+
+
+def make_wind_farm_forecaster(n_jobs=None, group_label=None, estimator_name='random_forest') -> WindPowerForecaster:
+    return WindPowerForecaster(target_label=TARGET_LABEL, datetime_label=TIME_LABEL, n_jobs=n_jobs,
+                               keep_training_data=False, group_label=group_label, estimator_name=estimator_name)
+
+
+def get_wind_farm_checkpoint_path(checkpoint_dir, wf) -> str:
+    return os.path.join(checkpoint_dir, str(wf))
+
+
+def has_wind_farm_checkpoint(checkpoint_dir, wf, config=None) -> bool:
+    """
+    Whether a wind farm is checkpointed, and if `config` is given, with this run configuration (checkpoints
+    without configuration never match it).
+    """
+
+    path = get_wind_farm_checkpoint_path(checkpoint_dir, wf)
+
+    if not os.path.isfile(os.path.join(path, PREDICTIONS_FILE)):
+        return False
+
+    if config is None:
+        return True
+
+    try:
+        with open(os.path.join(path, CONFIG_FILE)) as f:
+            saved_config = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    # Compared as read back from JSON (e.g. tuples become lists).
+    return saved_config == json.loads(json.dumps(config))
+
+
+def save_wind_farm_checkpoint(checkpoint_dir, wf, wpf, predict_df):
+    """
+    Save the fitted model, its run configuration and the predictions of a wind farm.
+
+    All the files are written in a temporary directory renamed at the end: a checkpoint interrupted while being
+    written is never considered as done.
+    """
+
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    path = get_wind_farm_checkpoint_path(checkpoint_dir, wf)
+    tmp_path = tempfile.mkdtemp(prefix='.tmp_', dir=checkpoint_dir)
+
+    try:
+        wpf.save(os.path.join(tmp_path, MODEL_FILE))
+
+        with open(os.path.join(tmp_path, CONFIG_FILE), 'w') as f:
+            json.dump(wpf.get_run_config(), f)
+
+        predict_df.to_pickle(os.path.join(tmp_path, PREDICTIONS_FILE))
+
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def load_wind_farm_predictions(checkpoint_dir, wf) -> pd.DataFrame:
+    return pd.read_pickle(os.path.join(get_wind_farm_checkpoint_path(checkpoint_dir, wf), PREDICTIONS_FILE))
+
+
+def load_wind_farm_model(checkpoint_dir, wf) -> WindPowerForecaster:
+    return WindPowerForecaster.load(os.path.join(get_wind_farm_checkpoint_path(checkpoint_dir, wf), MODEL_FILE))
+
+
+def _take_group_forecasts(sorted_nwp, partition, group):
+    """Packed forecasts of the rows of a group, out of the forecasts of `partition.sorted_df`."""
+
+    if sorted_nwp is None:
+        return None
+
+    rows = partition.get_group_slice(group)
+
+    return sorted_nwp.take(np.arange(rows.start, rows.stop))
+
+
+def _print_progress(verbose, wf, predict_dfs, all_wf):
+    if verbose:
+        print('Wind farm: {}: done ({}/{})'.format(wf, len(predict_dfs), len(all_wf)))
@@ -1,48 +1,131 @@
+import pickle
+import re
+import warnings
+from itertools import product
+from typing import Dict
+
 import numpy as np
 import pandas as pd
 from sklearn.base import BaseEstimator, RegressorMixin
 from sklearn.metrics import make_scorer
 from sklearn.utils import check_array
-
-from wind_power_forecasting import NWP_PREFIX, ID_LABEL, WIND_SPEED_LABEL, WIND_VECTOR_AZIMUTH_LABEL, \
-    METEOROLOGICAL_WIND_DIRECTION_LABEL
-from wind_power_forecasting.features_extraction.time.cyclical_time import add_cyclical_time_feature
-from wind_power_forecasting.features_extraction.time.linear_time import add_day_of_week
-from wind_power_forecasting.features_extraction.time.time_shift import add_lags, add_rollmeans
-from wind_power_forecasting.features_extraction.weather.weather import add_numerical_weather_prediction_median
-from wind_power_forecasting.features_extraction.weather.wind import add_wind_speed, add_wind_vector_azimuth, \
-    add_meteorological_wind_direction
+from sklearn.utils.validation import check_is_fitted
+
+from wind_power_forecasting import NWP_PREFIX, ID_LABEL, WF_CODE_LABEL
+from wind_power_forecasting.features_extraction.cache import FeatureCache
+from wind_power_forecasting.features_extraction.graph import FeatureGraph
+from wind_power_forecasting.features_extraction.time.calendar import add_calendar_features
+from wind_power_forecasting.features_extraction.time.cyclical_time import get_cyclical_time_feature_labels, \
+    CYCLICAL_TIME_FEATURES
+from wind_power_forecasting.features_extraction.time.time_shift import get_lag_label, get_rollmean_label
+from wind_power_forecasting.features_extraction.time.windows import add_time_shifted_features
+from wind_power_forecasting.features_extraction.weather.weather import add_numerical_weather_prediction_median, \
+    add_numerical_weather_prediction_wind_features, get_numerical_weather_prediction_wind_label, \
+    add_numerical_weather_prediction_most_recent, get_numerical_weather_prediction_most_recent_label
+from wind_power_forecasting.features_extraction.weather.wind import add_wind_features, WIND_FEATURES
+from wind_power_forecasting.features_selection.correlation_clustering import CorrelationClusterThreshold
+from wind_power_forecasting.features_selection.covariance import CovarianceAccumulator
 from wind_power_forecasting.features_selection.numerical_weather_prediction import remove_numerical_weather_features
 from wind_power_forecasting.features_selection.variance_inflation_factor import remove_collinear_drivers
 from wind_power_forecasting.features_selection.variance_threshold import remove_variance_threshold
 from wind_power_forecasting.metrics.regression import cumulated_absolute_percentage_error
 from wind_power_forecasting.model_selection.autotuning import model_autotuning
-from wind_power_forecasting.preprocessing.inputs import df_to_ts
-from wind_power_forecasting.utils.dataframe import copy_or_not_copy, get_sub_df, df_to_X_y
+from wind_power_forecasting.model_selection.utils import get_estimator
+from wind_power_forecasting.preprocessing.inputs import df_to_ts, grouped_df_to_ts, get_ts_source_rows
+from wind_power_forecasting.preprocessing.interpolation import interpolate_packed_numerical_weather_predictions
+from wind_power_forecasting.preprocessing.numerical_weather_prediction import parse_nwp_labels, \
+    split_numerical_weather_predictions, PackedNumericalWeatherPredictions
+from wind_power_forecasting.utils.dataframe import copy_or_not_copy, get_sub_df, df_to_X_y, iter_row_chunks
+from wind_power_forecasting.utils.partition import DataFramePartition
+from wind_power_forecasting.utils.dtype import cast_columns, check_dtype_promotion
+
+# Frequency of the time series the features are extracted from.
+FREQ = 'H'
+# Rows converted to float64 at once when accumulating the statistics of the features selection.
+FEATURES_SELECTION_CHUNK_SIZE = 10000
+# Minimal share of non missing values of the per NWP model wind features (and of their lags) kept by the features
+# selection: the selection only reads the complete rows, which the sparse ones would otherwise leave out.
+MIN_MODEL_WIND_COVERAGE = 0.5
+# Bump it each time the content of the saved artifact changes.
+ARTIFACT_FORMAT_VERSION = 2
+# Fitted attributes needed to predict.
+PREDICTION_ATTRIBUTES = ['X_labels', 'y_label', 'y_median', 'estimator', 'best_params', 'best_estimator',
+                         'group_codes']
+TRAINING_DATA_ATTRIBUTES = ['X', 'y', 'idx']
 
 
 class WindPowerForecaster(BaseEstimator, RegressorMixin):
 
-    def __init__(self, target_label: str, datetime_label: str):
+    def __init__(self, target_label: str, datetime_label: str, n_jobs: int = None, lag_range=(1,),
+                 roll_periods=('3H',), cyclical_features=('hour_of_day', 'week_of_year', 'month_of_year'),
+                 feature_cache: FeatureCache = None, keep_training_data: bool = True, dtype=np.float32,
+                 dtype_check='warn', model_wind_features: bool = False, most_recent_forecasts: int = 0,
+                 nwp_interpolation: str = None, nwp_circular_variables=(), correlation_clustering: float = None,
+                 cluster_representative: str = 'central', search_strategy: str = 'randomized',
+                 group_label: str = None, estimator_name: str = 'random_forest'):
         self.target_label = target_label
         self.datetime_label = datetime_label
+        self.n_jobs = n_jobs
+        self.lag_range = lag_range
+        self.roll_periods = roll_periods
+        self.cyclical_features = cyclical_features
+        self.feature_cache = feature_cache
+        self.keep_training_data = keep_training_data
+        self.dtype = dtype
+        self.dtype_check = dtype_check
+        self.model_wind_features = model_wind_features
+        self.most_recent_forecasts = most_recent_forecasts
+        self.nwp_interpolation = nwp_interpolation
+        self.nwp_circular_variables = nwp_circular_variables
+        self.correlation_clustering = correlation_clustering
+        self.cluster_representative = cluster_representative
+        self.search_strategy = search_strategy
+        self.group_label = group_label
+        self.estimator_name = estimator_name
         self.score_function = cumulated_absolute_percentage_error
         self.scorer = make_scorer(self.score_function, greater_is_better=False)
 
-    def fit(self, X_df, y_df):
-        """Fit model."""
-        X_df = copy_or_not_copy(X_df, True)
+    def fit(self, X_df, y_df, nwp=None):
+        """
+        Fit model.
+
+        With a `group_label` (e.g. ``WF``), a single model is fitted on all the groups (e.g. wind farms) of `X_df`:
+        their features are extracted in one pass (see `build_grouped_features`) and stacked, with the code of the
+        group as an additional feature (``wind_farm_code``), then go through a single features selection and search.
+        The search runs on the rows of all the groups sorted by time, over folds cut between timestamps.
+
+        The NWP forecasts can be given packed (see `read_raw_inputs` with `pack_nwp`) with `nwp`, the forecasts of
+        the rows of `X_df`. Otherwise, the NWP columns of `X_df` are packed first, see `_preprocess_data`.
+        """
+        if self.group_label is None:
+            self.group_codes = None
+            X_df = self._build_features(X_df, nwp=nwp)
+        else:
+            # The NWP forecasts are packed before the rows are sorted by group.
+            X_df, nwp = self._split_nwp(X_df, nwp)
+            X_partition = DataFramePartition(X_df, self.group_label)
+            # Codes of the groups, in order of their values.
+            self.group_codes = {group: code for code, group in enumerate(sorted(X_partition.groups))}
+            # Rows of the target in the order of the stacked features.
+            y_df = X_partition.align(y_df, ID_LABEL).sorted_df
+            X_df = self._build_stacked_features(X_partition, nwp=nwp)
 
-        X_df = self._preprocess_data(X_df, copy=False)
-        X_df = self._features_extraction(X_df, copy=False)
         X_df = self._features_selection(X_df, wp_prefix=NWP_PREFIX)
+
+        if self.group_label is not None:
+            # Rows of all the groups in time order (the groups in order of their code at each time): the folds of the
+            # search, and its most recent rows, are then the ones of all the groups.
+            X_df = X_df.iloc[np.argsort(X_df.index.values, kind='stable')]
+
         X_df, y_df = self._data_cleaning(X_df, y_df)
-        X, y, X_labels = df_to_X_y(X_df=X_df, y_df=y_df)
-        best_model, best_params, best_score = self._model_selection(X, y)
+        X, y, X_labels = df_to_X_y(X_df=X_df, y_df=y_df, dtype=self._get_array_dtype())
+        best_model, best_params, best_score = self._model_selection(X, y, times=X_df.index.values)
+
+        if self.keep_training_data:
+            self.X = X
+            self.y = y
+            self.idx = X_df.index
 
-        self.X = X
-        self.y = y
-        self.idx = X_df.index
         self.X_labels = list(X_df)
         self.y_label = list(y_df)
         self.y_median = np.nanmedian(y)
@@ -52,24 +135,84 @@ class WindPowerForecaster(BaseEstimator, RegressorMixin):
 
         return self
 
+    def save(self, path, include_training_data=False):
+        """
+        Save the fitted model as a compact artifact, holding only what prediction needs.
+
+        The artifact contains the parameters (hence the feature configuration), the selected feature labels, the
+        imputation value and the estimator. The feature cache is not saved.
+
+        Parameters
+        ----------
+        path: str
+            File where the artifact is written.
+        include_training_data: bool, optional
+            If `True`, also save the training matrix (`X`, `y` and `idx`), when it was kept after fitting.
+        """
+
+        check_is_fitted(self, PREDICTION_ATTRIBUTES)
+
+        params = self.get_params()
+        params['feature_cache'] = None
+        attributes = PREDICTION_ATTRIBUTES
+
+        if include_training_data:
+            attributes = attributes + [a for a in TRAINING_DATA_ATTRIBUTES if hasattr(self, a)]
+
+        artifact = {'format_version': ARTIFACT_FORMAT_VERSION,
+                    'params': params,
+                    'attributes': {attribute: getattr(self, attribute) for attribute in attributes}}
+
+        with open(path, 'wb') as f:
+            pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path) -> 'WindPowerForecaster':
+        """
+        Load a model saved with `save`, ready to predict.
+
+        Raises
+        ------
+        ValueError
+            If the artifact was saved with another format version.
+        """
+
+        with open(path, 'rb') as f:
+            artifact = pickle.load(f)
+
+        if artifact.get('format_version') != ARTIFACT_FORMAT_VERSION:
+            raise ValueError('Unexpected artifact format version: {}. Should be: {}'.format(
+                artifact.get('format_version'), ARTIFACT_FORMAT_VERSION))
+
+        wpf = cls(**artifact['params'])
+
+        for attribute, value in artifact['attributes'].items():
+            setattr(wpf, attribute, value)
+
+        return wpf
+
     def add_prediction(self, X_df, prediction_label='prediction', preprocess=True, na_rm=False):
 
         pred_df = self.predict(X_df, preprocess=preprocess, output_type='dataframe', prediction_label=prediction_label)
         how = 'right' if na_rm else 'left'
         return X_df.join(pred_df, how=how)
 
-    def predict(self, X_df, preprocess=True, output_type='array', prediction_label='prediction'):
-        """Apply the model
+    def predict(self, X_df, preprocess=True, output_type='array', prediction_label='prediction', nwp=None):
+        """Apply the model (with the packed forecasts `nwp` of the rows of `X_df`, if given, see `fit`)
         """
-        X_df = copy_or_not_copy(X_df)
-
         if preprocess:
-            X_df = self._preprocess_data(X_df, copy=False)
-            X_df = self._features_extraction(X_df, copy=False)
+            # Only the features selected when fitting are extracted.
+            if self.group_label is None:
+                X_df = self._build_features(X_df, labels=self.X_labels, nwp=nwp)
+            else:
+                X_df, nwp = self._split_nwp(X_df, nwp)
+                X_df = self._build_stacked_features(DataFramePartition(X_df, self.group_label),
+                                                    labels=[label for label in self.X_labels if label != WF_CODE_LABEL],
+                                                    nwp=nwp)
             X_df = self._features_selection(X_df, from_fit=False)
             X_df, _ = self._data_cleaning(X_df, from_fit=False)
 
-        X = check_array(X_df, accept_sparse='csr')
+        X = check_array(X_df, accept_sparse='csr', dtype=self._get_array_dtype())
         y_pred = self.estimator.predict(X)
         if output_type == 'array':
             out = y_pred
@@ -79,69 +222,467 @@ class WindPowerForecaster(BaseEstimator, RegressorMixin):
 
         return out
 
-    def fit_predict(self, X_train_df, y_train_df, X_test_df=None, **kwargs):
+    def fit_predict(self, X_train_df, y_train_df, X_test_df=None, nwp_train=None, nwp_test=None, **kwargs):
+
+        self.fit(X_train_df, y_train_df, nwp=nwp_train)
 
-        self.fit(X_train_df, y_train_df)
-        X_to_predict_df = X_test_df if X_test_df is not None else X_train_df
+        if X_test_df is None:
+            return self.predict(X_train_df, nwp=nwp_train, **kwargs)
 
-        return self.predict(X_to_predict_df, **kwargs)
+        return self.predict(X_test_df, nwp=nwp_test, **kwargs)
 
     def score(self, X, y, sample_weight=None):
 
         return self.score_function(y, self.predict(X))
 
-    def _preprocess_data(self, X_df, copy=True):
-        # 1. Convert dataframe into time series
-        X_df = df_to_ts(X_df, self.datetime_label, freq='H', copy=copy)
+    def _build_features(self, X_df, labels=None, nwp=None):
+        """
+        Preprocess the data then extract the features (only `labels` and their ancestors if given, see
+        `_features_extraction`), reading them from `feature_cache` when possible.
+        """
+
+        def build(df):
+            df, df_nwp = self._preprocess_data(df, copy=True, nwp=nwp)
+            return self._features_extraction(df, copy=False, labels=labels, nwp=df_nwp)
+
+        if self.feature_cache is None:
+            return build(X_df)
+
+        config = self._get_features_config()
+        config['labels'] = None if labels is None else sorted(labels)
+        config['nwp'] = None if nwp is None else nwp.get_fingerprint()
+
+        return self.feature_cache.get_or_compute(X_df, config, build)
+
+    def build_grouped_features(self, X_partition: DataFramePartition, labels=None, nwp=None) -> Dict:
+        """
+        Extract the features of several groups of rows (e.g. wind farms) at once.
+
+        The features of each group are the ones `_build_features` extracts from it alone (same columns, same values),
+        but each step of the extraction runs once over all the groups stacked together: the per row features are
+        computed over the whole stack, lags and rolling windows stop at the groups boundaries, and meteorological
+        features without any value within a group are not part of its features. It's much faster than extracting
+        the groups one by one when there are many small groups. The feature cache is not used.
+
+        Parameters
+        ----------
+        X_partition: DataFramePartition
+            Raw inputs partitioned by group, without the group column.
+        labels: list, optional
+            Features to extract, along with the features they are computed from. By default, all the features.
+        nwp: PackedNumericalWeatherPredictions, optional
+            Forecasts of the rows of the dataframe `X_partition` splits, whose NWP columns are then ignored. By
+            default, the NWP columns of `X_partition`.
+
+        Returns
+        -------
+        features_dfs: dict
+            Maps each group (in the order of `X_partition.groups`) to its features, as a slice of the features of all
+            the groups (a view, unless some of its meteorological features are empty). As with `asfreq`, integer
+            columns (e.g. ``ID``) are float when a group has missing time steps.
+        """
+
+        # Row of the forecasts of each row of the sorted dataframe.
+        positions = np.arange(len(X_partition.sorted_df)) if nwp is None else X_partition.positions
+        X_df, nwp = self._split_nwp(X_partition.sorted_df, nwp)
+        X_df = cast_columns(X_df, self.dtype, exclude=[ID_LABEL])
+        rows = get_ts_source_rows(X_df, self.datetime_label, freq=FREQ, group_offsets=X_partition.offsets)
+        X_df, offsets = grouped_df_to_ts(X_df, self.datetime_label, X_partition.offsets, freq=FREQ)
+        # The forecasts are taken at the time steps of the groups in a single pass.
+        nwp = nwp.take(np.where(rows >= 0, positions[rows], -1), index=X_df.index)
+        nwp = self._interpolate_nwp(nwp, group_offsets=offsets)
+
+        graph = self._get_feature_graph(list(X_df) + nwp.labels)
+        to_extract = set(graph) if labels is None else graph.get_ancestors(labels)
+
+        # Empty features are dropped group by group afterwards.
+        X_df = self._add_instantaneous_features(X_df, graph, to_extract, drop_empty=False, nwp=nwp)
+        X_df = self._add_time_shifted_features(X_df, graph, to_extract, group_offsets=offsets)
+
+        features_dfs = {}
+
+        for group, start, end, empty_features in zip(X_partition.groups, offsets[:-1], offsets[1:],
+                                                     self._get_empty_features(nwp, graph, to_extract, offsets)):
+            if labels is None and empty_features:
+                features_df = X_df.iloc[start:end, [i for i, label in enumerate(X_df) if label not in empty_features]]
+            else:
+                features_df = X_df.iloc[start:end]
+
+            features_df.index = pd.DatetimeIndex(features_df.index, freq=FREQ)
+            features_dfs[group] = features_df
+
+        return features_dfs
+
+    def _build_stacked_features(self, X_partition: DataFramePartition, labels=None, nwp=None) -> pd.DataFrame:
+        """
+        Features of all the groups of `X_partition` one after the other (see `build_grouped_features`), along with the
+        code of their group (-1 for groups unknown when fitting).
+        """
+
+        features_dfs = self.build_grouped_features(X_partition, labels=labels, nwp=nwp)
+        codes = [self.group_codes.get(group, -1) for group in features_dfs]
+        X_df = pd.concat(list(features_dfs.values()))
+        X_df[WF_CODE_LABEL] = np.repeat(codes, [len(features_df) for features_df in features_dfs.values()]).astype(
+            np.float64 if self.dtype is None else self.dtype)
 
         return X_df
 
-    def _features_extraction(self, X_df, copy=True):
+    @staticmethod
+    def _get_empty_features(nwp: PackedNumericalWeatherPredictions, graph: FeatureGraph, to_extract,
+                            group_offsets) -> list:
+        """
+        Features of each group that `_add_instantaneous_features` doesn't add (with `drop_empty`) to the group alone:
+        variables without any forecast, models without any ``U`` or ``V`` forecast, and their lags.
+        """
 
-        # --- 0. Init some variables --- #
-        X_df = copy_or_not_copy(X_df, copy)
-        not_to_lag_features = set(X_df)
+        def has_value(input_labels):
+            # Whether each group has a forecast within the inputs.
+            return nwp.count_group_forecasts(nwp.get_columns(input_labels), group_offsets) > 0
+
+        n_groups = len(group_offsets) - 1
+        empty_features = [set() for _ in range(n_groups)]
+
+        for label in graph:
+            if label not in to_extract:
+                continue
+
+            producer = graph.nodes[label].producer
+            inputs = graph.get_inputs(label)
+
+            if producer == 'nwp_median' or (isinstance(producer, tuple) and producer[0] == 'most_recent'):
+                is_empty = ~has_value(inputs)
+            elif isinstance(producer, tuple) and producer[0] == 'model_wind':
+                _, coordinates = parse_nwp_labels(inputs)
+                is_empty = np.zeros(n_groups, dtype=bool)
+
+                for variable in ('U', 'V'):
+                    is_empty |= ~has_value([i for i, c in zip(inputs, coordinates) if c.variable == variable])
+            elif isinstance(producer, tuple) and producer[0] == 'lag':
+                is_empty = np.array([inputs[0] in features for features in empty_features])
+            else:
+                continue
+
+            for features, is_group_empty in zip(empty_features, is_empty):
+                if is_group_empty:
+                    features.add(label)
+
+        return empty_features
+
+    def _get_features_config(self):
+        return {'datetime_label': self.datetime_label,
+                'lag_range': list(self.lag_range),
+                'roll_periods': list(self.roll_periods),
+                'cyclical_features': list(self.cyclical_features),
+                'model_wind_features': self.model_wind_features,
+                'most_recent_forecasts': self.most_recent_forecasts,
+                'nwp_interpolation': self.nwp_interpolation,
+                'nwp_circular_variables': list(self.nwp_circular_variables),
+                'dtype': None if self.dtype is None else str(np.dtype(self.dtype))}
+
+    def get_run_config(self) -> Dict:
+        """
+        JSON serializable parameters the fitted model depends on (features, selection, estimator and search), e.g. to
+        tell whether a saved model was fitted with the current ones.
+        """
+
+        return dict(self._get_features_config(), target_label=self.target_label,
+                    correlation_clustering=self.correlation_clustering,
+                    cluster_representative=self.cluster_representative, search_strategy=self.search_strategy,
+                    group_label=self.group_label, estimator_name=self.estimator_name)
+
+    def _get_array_dtype(self):
+        return 'numeric' if self.dtype is None else self.dtype
+
+    def _check_dtypes(self, X_df, stage):
+        """Report the columns promoted beyond `dtype` by a stage of the pipeline, according to `dtype_check`."""
+
+        if self.dtype is not None:
+            check_dtype_promotion(X_df, self.dtype, stage, exclude=[ID_LABEL], errors=self.dtype_check)
+
+    def _preprocess_data(self, X_df, copy=True, nwp=None):
+        """
+        Convert the raw inputs into a time series.
+
+        The NWP forecasts are packed apart (see `PackedNumericalWeatherPredictions`): only the other columns go
+        through the dataframe steps, the packed forecasts being taken at the rows of the time series.
+
+        Parameters
+        ----------
+        {X_df}
+        copy: bool, optional
+        nwp: PackedNumericalWeatherPredictions, optional
+            Forecasts of the rows of `X_df`, whose NWP columns are then ignored. By default, the NWP columns of `X_df`.
+
+        Returns
+        -------
+        {X_df} Without the NWP columns.
+        nwp: PackedNumericalWeatherPredictions
+            Forecasts of the rows of `X_df`.
+        """
+
+        # 1. Pack the NWP forecasts, cast according to the dtype policy as the other raw inputs
+        X_df, nwp = self._split_nwp(X_df, nwp)
+        X_df = cast_columns(X_df, self.dtype, exclude=[ID_LABEL])
+
+        # 2. Convert dataframe into time series
+        rows = get_ts_source_rows(X_df, self.datetime_label, freq=FREQ)
+        X_df = df_to_ts(X_df, self.datetime_label, freq=FREQ, copy=copy)
+        nwp = nwp.take(rows, index=X_df.index)
+
+        # 3. Fill the gaps of the NWP forecasts (if asked)
+        nwp = self._interpolate_nwp(nwp)
+
+        return X_df, nwp
+
+    def _split_nwp(self, X_df, nwp=None):
+        """The inputs without their NWP columns, and the packed forecasts (`nwp` if given) of `dtype`."""
+
+        if nwp is None:
+            return split_numerical_weather_predictions(X_df, dtype=self.dtype)
+
+        nwp_labels, _ = parse_nwp_labels(tuple(X_df.columns))
+        X_df = X_df.drop(columns=nwp_labels) if nwp_labels else X_df
+
+        return X_df, nwp if self.dtype is None else nwp.astype(self.dtype)
+
+    def _interpolate_nwp(self, nwp: PackedNumericalWeatherPredictions, group_offsets=None):
+        """
+        Interpolate the gaps of the NWP forecasts with `nwp_interpolation`, if any, the `nwp_circular_variables`
+        (e.g. directions) along the shortest arc. The forecasts stay packed.
+        """
+
+        if self.nwp_interpolation is None:
+            return nwp
+
+        return interpolate_packed_numerical_weather_predictions(nwp, method=self.nwp_interpolation,
+                                                                circular_variables=self.nwp_circular_variables,
+                                                                group_offsets=group_offsets)
+
+    def _get_feature_graph(self, raw_labels) -> FeatureGraph:
+        """Dependency graph of the features extracted from raw inputs labelled `raw_labels`."""
+
+        graph = FeatureGraph()
 
         # --- 1. Linear time descriptors --- #
-        add_day_of_week(X_df, copy=False)
-        not_to_lag_features.update(not_to_lag_features.symmetric_difference(X_df))
+        graph.add_feature('day_of_week', producer='day_of_week')
 
         # --- 2. Cyclical time encoding --- #
-        add_cyclical_time_feature(X_df, hour_of_day=True, week_of_year=True, month_of_year=True, copy=False)
-        not_to_lag_features.update(not_to_lag_features.symmetric_difference(X_df))
+        for feature in CYCLICAL_TIME_FEATURES:
+            if feature in self.cyclical_features:
+                for label in get_cyclical_time_feature_labels([feature]):
+                    graph.add_feature(label, producer=('cyclical', feature))
+
+        # Time features are not lagged.
+        not_to_lag_features = set(raw_labels).union(graph)
 
         # --- 3. Meteorological features --- #
-        X_df = add_numerical_weather_prediction_median(X_df)
-        add_wind_speed(X_df, 'U', 'V', wind_speed_label=WIND_SPEED_LABEL, copy=False)
-        add_wind_vector_azimuth(X_df, 'U', 'V', wind_speed_label=WIND_VECTOR_AZIMUTH_LABEL, copy=False)
-        add_meteorological_wind_direction(X_df, 'U', 'V',
-                                          meteorological_wind_direction_label=METEOROLOGICAL_WIND_DIRECTION_LABEL,
-                                          copy=False)
+        nwp_labels, nwp_coordinates = parse_nwp_labels(tuple(raw_labels))
+
+        for variable in sorted({c.variable for c in nwp_coordinates}):
+            graph.add_feature(variable, inputs=[label for label, c in zip(nwp_labels, nwp_coordinates)
+                                                if c.variable == variable and c.day_offset <= -1],
+                              producer='nwp_median')
+
+        for wind_label in WIND_FEATURES:
+            graph.add_feature(wind_label, inputs=['U', 'V'], producer='wind')
+
+        if self.model_wind_features:
+            for model in sorted({c.model for c in nwp_coordinates}):
+                wind_coordinates = {label: c for label, c in zip(nwp_labels, nwp_coordinates)
+                                    if c.model == model and c.variable in ('U', 'V') and c.day_offset <= -1}
+                inputs = list(wind_coordinates)
+
+                # Models need both U and V forecasts.
+                if {c.variable for c in wind_coordinates.values()} == {'U', 'V'}:
+                    for wind_label in WIND_FEATURES:
+                        graph.add_feature(get_numerical_weather_prediction_wind_label(wind_label, model),
+                                          inputs=inputs, producer=('model_wind', model))
+
+        # Values of the most recent forecasts issued before the target day, which are not lagged.
+        for variable in sorted({c.variable for c in nwp_coordinates}):
+            inputs = [label for label, c in zip(nwp_labels, nwp_coordinates)
+                      if c.variable == variable and c.day_offset <= -1]
+
+            for rank in range(self.most_recent_forecasts):
+                label = get_numerical_weather_prediction_most_recent_label(variable, rank + 1)
+                graph.add_feature(label, inputs=inputs, producer=('most_recent', variable))
+                not_to_lag_features.add(label)
 
         # --- 4. Lag Features --- #
-        add_lags(X_df, lag_range=[1], to_not_lag_labels=not_to_lag_features, copy=False)
+        to_lag_labels = [label for label in graph if label not in not_to_lag_features]
+
+        for lag, label in product(self.lag_range, to_lag_labels):
+            graph.add_feature(get_lag_label(label, lag), inputs=[label], producer=('lag', lag))
 
         # --- 5. Rolling features --- #
-        to_roll_labels = [WIND_SPEED_LABEL, WIND_VECTOR_AZIMUTH_LABEL, METEOROLOGICAL_WIND_DIRECTION_LABEL]
-        add_rollmeans(X_df, periods=['3H'], to_roll_labels=to_roll_labels, copy=False)
+        for period, label in product(self.roll_periods, WIND_FEATURES):
+            graph.add_feature(get_rollmean_label(label, period), inputs=[label], producer=('rollmean', period))
+
+        return graph
+
+    def _features_extraction(self, X_df, copy=True, labels=None, nwp=None):
+        """
+        Extract the features.
+
+        Parameters
+        ----------
+        {X_df}
+        copy: bool, optional
+        labels: list, optional
+            Features to extract, along with the features they are computed from. By default, all the features.
+        nwp: PackedNumericalWeatherPredictions, optional
+            Forecasts of the rows of `X_df` (see `_preprocess_data`). By default, the NWP columns of `X_df`.
+        """
+
+        # --- 0. Init some variables --- #
+        X_df = copy_or_not_copy(X_df, copy)
+        graph = self._get_feature_graph(list(X_df) + ([] if nwp is None else nwp.labels))
+        to_extract = set(graph) if labels is None else graph.get_ancestors(labels)
+
+        # Features needed downstream are added even when they have no value, so that predict can fill them.
+        X_df = self._add_instantaneous_features(X_df, graph, to_extract, drop_empty=labels is None, nwp=nwp)
+        X_df = self._add_time_shifted_features(X_df, graph, to_extract)
 
         # --- 6. cumulative features --- #
         # TODO(TK): See if we can add a cumulative features ask AB which one may be pertinent
 
         return X_df
 
+    def _add_instantaneous_features(self, X_df, graph: FeatureGraph, to_extract, drop_empty=True, nwp=None):
+        """
+        Add the features computed from each row alone (time and meteorological features), among `to_extract`.
+
+        If `drop_empty`, meteorological features without any value are not added. The meteorological features are
+        read from `nwp`, the forecasts of the rows of `X_df`, if given (from the NWP columns of `X_df` otherwise).
+        """
+
+        def get_features(producer):
+            return graph.get_features(producer, to_extract)
+
+        # --- 1. Linear time descriptors and 2. Cyclical time encoding, in a single pass --- #
+        linear_features = ['day_of_week'] if get_features('day_of_week') else []
+        cyclical_features = [feature for feature in self.cyclical_features if get_features(('cyclical', feature))]
+        X_df = add_calendar_features(X_df, cyclical_features=cyclical_features, linear_features=linear_features,
+                                     dtype=self.dtype)
+        self._check_dtypes(X_df, 'time features')
+
+        # --- 3. Meteorological features --- #
+        variables = get_features('nwp_median')
+
+        if variables:
+            X_df = add_numerical_weather_prediction_median(X_df, dtype=self.dtype, variables=variables,
+                                                           drop_empty=drop_empty, nwp=nwp)
+
+        if get_features('wind'):
+            X_df = add_wind_features(X_df, ['U'], ['V'], copy=False, dtype=self._get_array_dtype())
+
+        models = [producer[1] for producer in graph.get_producers(to_extract)
+                  if isinstance(producer, tuple) and producer[0] == 'model_wind']
+
+        if models:
+            X_df = add_numerical_weather_prediction_wind_features(X_df, dtype=self.dtype, models=models,
+                                                                  drop_empty=drop_empty, nwp=nwp)
+
+        variables = [producer[1] for producer in graph.get_producers(to_extract)
+                     if isinstance(producer, tuple) and producer[0] == 'most_recent']
+
+        if variables:
+            X_df = add_numerical_weather_prediction_most_recent(X_df, k=self.most_recent_forecasts, dtype=self.dtype,
+                                                                variables=variables, drop_empty=drop_empty, nwp=nwp)
+
+        self._check_dtypes(X_df, 'meteorological features')
+
+        return X_df
+
+    def _add_time_shifted_features(self, X_df, graph: FeatureGraph, to_extract, group_offsets=None):
+        """
+        Add the lags and rolling features among `to_extract`, see `_get_time_shifted_inputs`.
+
+        With `group_offsets`, `X_df` stacks several time series, see `add_time_shifted_features`.
+        """
+
+        # --- 4. Lag Features and 5. Rolling features, in a single block --- #
+        lag_range, to_lag_labels, periods, to_roll_labels = self._get_time_shifted_inputs(graph, to_extract)
+
+        # Variables without any forecast are not added by the meteorological features.
+        X_df = add_time_shifted_features(X_df, lag_range=lag_range,
+                                         to_lag_labels=[label for label in to_lag_labels if label in X_df],
+                                         periods=periods, to_roll_labels=to_roll_labels, dtype=self.dtype,
+                                         group_offsets=group_offsets, freq=FREQ)
+        self._check_dtypes(X_df, 'time shifted features')
+
+        return X_df
+
+    def _get_time_shifted_inputs(self, graph: FeatureGraph, to_extract):
+        """Lags and columns to lag, rolling periods and columns to roll, needed for `to_extract`."""
+
+        def get_features(producer):
+            return graph.get_features(producer, to_extract)
+
+        lag_range = [lag for lag in self.lag_range if get_features(('lag', lag))]
+        to_lag_labels = self._get_unique_inputs(graph, [get_features(('lag', lag)) for lag in lag_range])
+        periods = [period for period in self.roll_periods if get_features(('rollmean', period))]
+        to_roll_labels = self._get_unique_inputs(graph, [get_features(('rollmean', period)) for period in periods])
+
+        return lag_range, to_lag_labels, periods, to_roll_labels
+
+    @staticmethod
+    def _get_unique_inputs(graph: FeatureGraph, features_groups) -> list:
+        """Inputs of several groups of features, in order of first appearance."""
+
+        inputs = [graph.get_inputs(label)[0] for features in features_groups for label in features]
+
+        return list(dict.fromkeys(inputs))
+
     def _features_selection(self, X_df, wp_prefix=None, from_fit=True):
 
         if from_fit:
             X_df = remove_numerical_weather_features(X_df, wp_prefix)
-            X_df = remove_variance_threshold(X_df, force_keeping=ID_LABEL, threshold=0.8)
-            X_df = remove_collinear_drivers(X_df, force_keeping=ID_LABEL, threshold=5)
+
+            if self.model_wind_features:
+                X_df = self._remove_sparse_model_wind_features(X_df)
+
+            # The group code is always kept.
+            kept_labels = [ID_LABEL] if self.group_label is None else [WF_CODE_LABEL, ID_LABEL]
+            # Both selectors read the statistics of a single pass over the complete rows, chunk by chunk.
+            covariance = CovarianceAccumulator().fit_chunks(
+                iter_row_chunks(X_df.drop(columns=kept_labels), FEATURES_SELECTION_CHUNK_SIZE))
+
+            if not covariance.n_samples:
+                raise ValueError('No training row without missing value, out of {} rows. Consider nwp_interpolation, '
+                                 'or fewer sparse features (e.g. model_wind_features)'.format(len(X_df)))
+
+            X_df = remove_variance_threshold(X_df, force_keeping=kept_labels, threshold=0.8, covariance=covariance)
+
+            if self.correlation_clustering is not None:
+                # A representative of each cluster of correlated features, the vif only processes them.
+                clustering = CorrelationClusterThreshold(self.correlation_clustering, self.cluster_representative)
+                clustering.fit_covariance(covariance, labels=[label for label in X_df if label not in kept_labels])
+                X_df = X_df.loc[:, clustering.kept_labels + kept_labels]
+                self.feature_clusters = clustering.get_clusters()
+
+            X_df = remove_collinear_drivers(X_df, force_keeping=kept_labels, threshold=5, covariance=covariance)
 
         else:
             X_df = X_df.loc[:, self.X_labels + [ID_LABEL]]
 
         return X_df
 
+    @staticmethod
+    def _remove_sparse_model_wind_features(X_df):
+        """Remove the per NWP model wind features (and their lags) with too many missing values."""
+
+        pattern = re.compile(r'^({})_{}\d+(_|$)'.format('|'.join(map(re.escape, WIND_FEATURES)), NWP_PREFIX))
+        labels = [label for label in X_df if pattern.match(label)]
+        coverage = X_df.loc[:, labels].notna().mean()
+        sparse_labels = list(coverage.index[coverage < MIN_MODEL_WIND_COVERAGE])
+
+        if sparse_labels:
+            warnings.warn('{} per model wind features with less than {:.0%} of non missing values are removed: '
+                          '{}'.format(len(sparse_labels), MIN_MODEL_WIND_COVERAGE, sparse_labels))
+
+        return X_df.drop(columns=sparse_labels)
+
     def _data_cleaning(self, X_df, y_df=None, from_fit=True, copy=True):
 
         X_df = copy_or_not_copy(X_df, copy)
@@ -149,8 +690,15 @@ class WindPowerForecaster(BaseEstimator, RegressorMixin):
         if from_fit:
             X_df = X_df.dropna()
         else:
-            X_df = X_df.fillna(method='ffill')
-            X_df = X_df.fillna(self.y_median)
+            if self.group_label is None:
+                X_df = X_df.fillna(method='ffill')
+            else:
+                # Values are not carried over from one group to the next.
+                filled_df = X_df.groupby(WF_CODE_LABEL, sort=False).fillna(method='ffill')
+                X_df = pd.concat([filled_df, X_df.loc[:, [WF_CODE_LABEL]]], axis=1).loc[:, X_df.columns]
+
+            # Filling with the (float64) median upcasts the columns, they are cast back to the dtype policy.
+            X_df = cast_columns(X_df.fillna(self.y_median), self.dtype, exclude=[ID_LABEL])
 
         if y_df is not None:
             y_df = copy_or_not_copy(y_df, copy)
@@ -166,4 +714,5 @@ class WindPowerForecaster(BaseEstimator, RegressorMixin):
 
     def _model_selection(self, X, y, **kwargs):
 
-        return model_autotuning(X, y, scoring=self.scorer, **kwargs)
+        return model_autotuning(X, y, estimator=get_estimator(self.estimator_name), scoring=self.scorer,
+                                n_jobs=self.n_jobs, strategy=self.search_strategy, **kwargs)
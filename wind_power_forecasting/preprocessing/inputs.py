@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+from pandas.tseries.frequencies import to_offset
 
 from wind_power_forecasting.preprocessing.dataframe import sort_df_index_if_needed, \
     convert_df_index_to_datetime_if_needed
@@ -35,6 +37,119 @@ def df_to_ts(df: pd.DataFrame, datetime_label: str, freq, copy=False) -> pd.Data
     return df
 
 
+def grouped_df_to_ts(df: pd.DataFrame, datetime_label: str, group_offsets, freq):
+    """
+    `df_to_ts` applied to each group of rows of a dataframe, in a single pass.
+
+    Groups are contiguous ranges of rows (e.g. the sorted dataframe of a `DataFramePartition`). Each group is
+    sorted and gets its own regular time index, from its first to its last time step, filled with missing values.
+    Groups stay contiguous in the output, whose index is the concatenation of the groups indexes (so without any
+    frequency). As with `asfreq`, integer columns become float when missing time steps are added.
+
+    Parameters
+    ----------
+    {df}
+    datetime_label: str
+    group_offsets: array-like of int of shape = (n_groups + 1)
+        Group `i` spans rows ``group_offsets[i]:group_offsets[i + 1]``.
+    freq: str or DateOffset
+
+    Returns
+    -------
+    {df} A new dataframe.
+    group_offsets: np.array of shape = (n_groups + 1)
+        Groups within the output.
+
+    Raises
+    ------
+    ValueError
+        If the time column cannot be converted into a datetime, or a group has duplicated time steps.
+    """
+
+    times = _get_times(df, datetime_label)
+    is_on_index, positions, new_offsets, new_ns = _get_time_steps(times, group_offsets, freq)
+
+    if len(np.unique(positions)) != len(positions):
+        raise ValueError('Groups have duplicated time steps')
+
+    df = df.iloc[is_on_index].drop(columns=datetime_label)
+    df.index = positions
+    df = df.reindex(np.arange(new_offsets[-1]))
+
+    index = pd.DatetimeIndex(new_ns.view('M8[ns]'), name=datetime_label)
+    df.index = index if times.tz is None else index.tz_localize('UTC').tz_convert(times.tz)
+
+    return df, new_offsets
+
+
+def get_ts_source_rows(df: pd.DataFrame, datetime_label: str, freq, group_offsets=None) -> np.ndarray:
+    """
+    Row of `df` of each time step of `df_to_ts` (or `grouped_df_to_ts` with `group_offsets`), e.g. to take the
+    packed forecasts of the time series rows (see `PackedNumericalWeatherPredictions.take`).
+
+    Returns
+    -------
+    rows: np.array of int of shape = (n_time_steps)
+        -1 for the time steps filled with missing values.
+    """
+
+    if group_offsets is None:
+        group_offsets = [0, len(df)]
+
+    is_on_index, positions, new_offsets, _ = _get_time_steps(_get_times(df, datetime_label), group_offsets, freq)
+    rows = np.full(new_offsets[-1], -1, dtype=np.int64)
+    rows[positions] = np.flatnonzero(is_on_index)
+
+    return rows
+
+
+def _get_times(df, datetime_label) -> pd.DatetimeIndex:
+    try:
+        return pd.DatetimeIndex(pd.to_datetime(df[datetime_label]))
+    except:
+        raise ValueError('Cannot convert the index into a datetime')
+
+
+def _get_time_steps(times: pd.DatetimeIndex, group_offsets, freq):
+    """
+    Regular time steps of each group of rows, from its first to its last time.
+
+    Returns
+    -------
+    is_on_index: np.array of bool of shape = (n_rows)
+        Whether each row is on the regular time steps of its group (other rows are dropped, as `asfreq` does).
+    positions: np.array of int
+        Time step of each row on the regular time steps.
+    new_offsets: np.array of int of shape = (n_groups + 1)
+        Groups within the time steps.
+    new_ns: np.array of int of shape = (n_time_steps)
+        Time steps, as nanoseconds.
+    """
+
+    group_offsets = np.asarray(group_offsets, dtype=np.int64)
+    sizes = np.diff(group_offsets)
+    group_ids = np.repeat(np.arange(len(sizes)), sizes)
+
+    # Integer time steps from the start of each group: first and last ones are the reductions of the group rows.
+    step = pd.Timedelta(to_offset(freq)).value
+    ns = times.asi8
+    non_empty = np.minimum(group_offsets[:-1], max(len(ns) - 1, 0))
+    starts = np.where(sizes > 0, np.minimum.reduceat(ns, non_empty) if len(ns) else 0, 0)
+    ends = np.where(sizes > 0, np.maximum.reduceat(ns, non_empty) if len(ns) else 0, 0)
+
+    new_sizes = np.where(sizes > 0, (ends - starts) // step + 1, 0)
+    new_offsets = np.concatenate([[0], np.cumsum(new_sizes)])
+    elapsed = ns - starts[group_ids]
+
+    is_on_index = elapsed % step == 0
+    positions = new_offsets[group_ids[is_on_index]] + elapsed[is_on_index] // step
+
+    new_group_ids = np.repeat(np.arange(len(sizes)), new_sizes)
+    new_ns = starts[new_group_ids] + (np.arange(new_offsets[-1]) - new_offsets[new_group_ids]) * step
+
+    return is_on_index, positions, new_offsets, new_ns
+
+
 def remove_na(df, copy=False, **kwargs):
     # Protect against automatic frequency change from pandas !!!
     # when the new dataset with dropped rows has another sampling period, pandas automatically changes it.
@@ -0,0 +1,267 @@
+import numpy as np
+import pandas as pd
+
+from wind_power_forecasting.preprocessing.numerical_weather_prediction import PackedNumericalWeatherPredictions, \
+    parse_nwp_labels
+
+VALID_INTERPOLATION_METHODS = ['linear']
+
+
+def interpolate_numerical_weather_predictions(df: pd.DataFrame, method='linear', max_gap=None, circular_variables=(),
+                                              circular_range=(-180., 180.), group_offsets=None):
+    """
+    Fill the gaps of the NWP columns, e.g. the hours between the time steps of a 3-hourly model.
+
+    All the NWP columns are interpolated at once, see `interpolate_block`. As each column holds the forecasts of a
+    single run, the values on both sides of a gap are issued at the same time: filling the gap doesn't use any
+    forecast issued later.
+
+    Parameters
+    ----------
+    {df} Its rows are regular time steps (see `df_to_ts`).
+    method: str, optional
+        Only ``'linear'``.
+    max_gap: int, optional
+        Longest gap filled, in rows. By default, all the gaps between two values are filled.
+    circular_variables: iterable, optional
+        Variables interpolated along the shortest arc (e.g. directions).
+    circular_range: tuple, optional
+        Range of the values of the circular variables.
+    group_offsets: array-like of int, optional
+        If given, groups of contiguous rows interpolated separately (see `grouped_df_to_ts`).
+
+    Returns
+    -------
+    {df} A new dataframe, unless there is no NWP column.
+    """
+
+    nwp_labels, coordinates = parse_nwp_labels(tuple(df.columns))
+
+    if not nwp_labels:
+        return df
+
+    block = df.loc[:, nwp_labels].to_numpy()
+    is_circular = np.array([c.variable in circular_variables for c in coordinates])
+
+    interpolated_df = pd.DataFrame(interpolate_block(block, method=method, max_gap=max_gap,
+                                                     group_offsets=group_offsets, is_circular=is_circular,
+                                                     circular_range=circular_range),
+                                   index=df.index, columns=nwp_labels)
+
+    # Replacing the columns as a single block is much faster than column by column.
+    return pd.concat([df.drop(columns=nwp_labels), interpolated_df], axis=1).loc[:, df.columns]
+
+
+def interpolate_packed_numerical_weather_predictions(nwp: PackedNumericalWeatherPredictions, method='linear',
+                                                     max_gap=None, circular_variables=(), circular_range=(-180., 180.),
+                                                     group_offsets=None) -> PackedNumericalWeatherPredictions:
+    """
+    Fill the gaps of packed NWP forecasts, as `interpolate_numerical_weather_predictions` fills the ones of their
+    columns.
+
+    The forecasts are not unpacked: the gaps are computed once per missing values pattern from the bitmaps (see
+    `get_gaps`), and the columns of a pattern are interpolated together from their non missing values.
+
+    Parameters
+    ----------
+    nwp: PackedNumericalWeatherPredictions
+        Its rows are regular time steps.
+    method: str, optional
+    max_gap: int, optional
+    circular_variables: iterable, optional
+    circular_range: tuple, optional
+    group_offsets: array-like of int, optional
+        See `interpolate_numerical_weather_predictions`.
+
+    Returns
+    -------
+    nwp: PackedNumericalWeatherPredictions
+        New forecasts.
+
+    Raises
+    ------
+    ValueError
+        If the method is unknown.
+    """
+
+    if method not in VALID_INTERPOLATION_METHODS:
+        raise ValueError('Unexpected interpolation method: {}. Should be one of: {}'.format(
+            method, VALID_INTERPOLATION_METHODS))
+
+    if not nwp.n_times or not nwp.labels:
+        return nwp
+
+    dtype = np.result_type(nwp.values, np.float16)
+    is_circular = np.array([c.variable in circular_variables for c in nwp.coordinates])
+
+    # Missing values patterns, keyed by the bitmaps of the columns.
+    patterns = {}
+    pattern_ids = np.array([patterns.setdefault(mask.tobytes(), len(patterns)) for mask in nwp.validity])
+    _, pattern_columns = np.unique(pattern_ids, return_index=True)
+    is_valid = np.unpackbits(nwp.validity[pattern_columns], axis=1, count=nwp.n_times).T.astype(bool)
+
+    to_fill, previous_rows, next_rows = get_gaps(is_valid, max_gap, group_offsets)
+
+    validity = np.empty_like(nwp.validity)
+    values = [None] * len(nwp.labels)
+
+    for pattern in range(len(pattern_columns)):
+        columns = np.flatnonzero(pattern_ids == pattern)
+        valid_rows = np.flatnonzero(is_valid[:, pattern])
+        filled_rows = np.flatnonzero(to_fill[:, pattern])
+        rows = np.flatnonzero(is_valid[:, pattern] | to_fill[:, pattern])
+        validity[columns] = np.packbits(is_valid[:, pattern] | to_fill[:, pattern])
+
+        # The values around a gap are consecutive values of the columns.
+        previous = previous_rows[filled_rows, pattern]
+        weights = (filled_rows - previous) / (next_rows[filled_rows, pattern] - previous)
+        previous = np.searchsorted(valid_rows, previous)
+
+        block = np.array([nwp.values[nwp.column_offsets[column]:nwp.column_offsets[column + 1]] for column in columns],
+                         dtype=dtype).reshape(len(columns), len(valid_rows))
+        interpolated = _interpolate(block[:, previous], block[:, previous + 1], weights)
+
+        if is_circular[columns].any():
+            interpolated = np.where(is_circular[columns, None],
+                                    _interpolate(block[:, previous], block[:, previous + 1], weights, circular_range),
+                                    interpolated)
+
+        is_filled = to_fill[rows, pattern]
+        out = np.empty((len(columns), len(rows)), dtype=dtype)
+        out[:, ~is_filled] = block
+        out[:, is_filled] = interpolated
+
+        for column, column_values in zip(columns, out):
+            values[column] = column_values
+
+    column_offsets = np.concatenate([[0], np.cumsum([len(v) for v in values], dtype=np.int64)])
+
+    return PackedNumericalWeatherPredictions(validity, np.concatenate(values), column_offsets, nwp.index, nwp.labels)
+
+
+def interpolate_block(block: np.ndarray, method='linear', max_gap=None, group_offsets=None, is_circular=None,
+                      circular_range=(-180., 180.)) -> np.ndarray:
+    """
+    Fill the inner gaps of all the columns of a block, in a single pass.
+
+    Columns sharing the same missing values (e.g. all the columns of a 3-hourly model) share the same gap
+    positions (see `get_gaps`), which are computed once per missing values pattern. All the gaps are then filled at
+    once, gathering the values around them with fancy indexing.
+    Leading and trailing gaps are not filled.
+
+    Parameters
+    ----------
+    block: np.array of shape = (n_times, n_columns)
+    method: str, optional
+        Only ``'linear'``.
+    max_gap: int, optional
+        Longest gap filled, in rows. By default, all the gaps between two values are filled.
+    group_offsets: array-like of int, optional
+        If given, groups of contiguous rows interpolated separately: group `i` spans rows
+        ``group_offsets[i]:group_offsets[i + 1]``.
+    is_circular: array-like of bool of shape = (n_columns), optional
+        Columns interpolated along the shortest arc, within `circular_range`.
+    circular_range: tuple, optional
+
+    Returns
+    -------
+    interpolated: np.array of shape = (n_times, n_columns)
+        A new block.
+
+    Raises
+    ------
+    ValueError
+        If the method is unknown.
+    """
+
+    if method not in VALID_INTERPOLATION_METHODS:
+        raise ValueError('Unexpected interpolation method: {}. Should be one of: {}'.format(
+            method, VALID_INTERPOLATION_METHODS))
+
+    out = np.array(block, dtype=np.result_type(block, np.float16))
+    n_times, n_columns = out.shape
+
+    if not n_times or not n_columns:
+        return out
+
+    # Missing values patterns, keyed by the bit-packed masks of the columns.
+    is_valid = ~np.isnan(out)
+    patterns = {}
+    pattern_ids = np.array([patterns.setdefault(mask.tobytes(), len(patterns))
+                            for mask in np.packbits(is_valid, axis=0).T])
+    # First column of each pattern (ids are given in order of first appearance).
+    _, pattern_columns = np.unique(pattern_ids, return_index=True)
+
+    to_fill, previous_rows, next_rows = get_gaps(is_valid[:, pattern_columns], max_gap, group_offsets)
+
+    # Gaps of all the columns, read from their pattern, and the weight of the next value of each of them.
+    rows, columns = np.nonzero(to_fill[:, pattern_ids])
+    patterns = pattern_ids[columns]
+    previous_rows, next_rows = previous_rows[rows, patterns], next_rows[rows, patterns]
+    weights = (rows - previous_rows) / (next_rows - previous_rows)
+
+    previous_values = out[previous_rows, columns]
+    next_values = out[next_rows, columns]
+
+    if is_circular is None:
+        out[rows, columns] = _interpolate(previous_values, next_values, weights)
+    else:
+        is_circular = np.asarray(is_circular, dtype=bool)[columns]
+        out[rows, columns] = np.where(is_circular,
+                                      _interpolate(previous_values, next_values, weights, circular_range),
+                                      _interpolate(previous_values, next_values, weights))
+
+    return out
+
+
+def get_gaps(is_valid: np.ndarray, max_gap=None, group_offsets=None):
+    """
+    Positions of the gaps of columns, and of the values around them.
+
+    Parameters
+    ----------
+    is_valid: np.array of bool of shape = (n_times, n_columns)
+    max_gap: int, optional
+    group_offsets: array-like of int, optional
+        See `interpolate_block`.
+
+    Returns
+    -------
+    to_fill: np.array of bool of shape = (n_times, n_columns)
+        Missing values within a gap to fill.
+    previous_rows: np.array of int of shape = (n_times, n_columns)
+        Last valid row before (or at) each row.
+    next_rows: np.array of int of shape = (n_times, n_columns)
+        First valid row after (or at) each row.
+    """
+
+    n_times = len(is_valid)
+    times = np.arange(n_times, dtype=np.int32)[:, None]
+
+    previous_rows = np.maximum.accumulate(np.where(is_valid, times, -1), axis=0)
+    next_rows = np.minimum.accumulate(np.where(is_valid, times, n_times)[::-1], axis=0)[::-1]
+    to_fill = ~is_valid & (previous_rows >= 0) & (next_rows < n_times)
+
+    if group_offsets is not None:
+        group_offsets = np.asarray(group_offsets, dtype=np.int64)
+        sizes = np.diff(group_offsets)
+        # Values of another group are out of reach.
+        to_fill &= (previous_rows >= np.repeat(group_offsets[:-1], sizes)[:, None]) & \
+                   (next_rows < np.repeat(group_offsets[1:], sizes)[:, None])
+
+    if max_gap is not None:
+        to_fill &= next_rows - previous_rows - 1 <= max_gap
+
+    return to_fill, previous_rows, next_rows
+
+
+def _interpolate(previous_values, next_values, weights, circular_range=None):
+    if circular_range is None:
+        return previous_values + weights * (next_values - previous_values)
+
+    low, high = circular_range
+    period = high - low
+    # Shortest arc from the previous value to the next one, within [-period / 2, period / 2).
+    arc = np.mod(next_values - previous_values + period / 2, period) - period / 2
+
+    return low + np.mod(previous_values + weights * arc - low, period)
@@ -1,40 +1,631 @@
+import hashlib
+import json
+import re
+from collections import namedtuple
+from functools import lru_cache
+from typing import List
+
+import numpy as np
 import pandas as pd
 
 from wind_power_forecasting import TIME_LABEL, NWP_PREFIX
-from wind_power_forecasting.utils.dataframe import extract_columns
+from wind_power_forecasting.features_extraction.weather.ensemble import compute_ensemble_statistics, \
+    compute_segment_statistics
 
+# e.g. NWP1_00h_D-2_U: model NWP1, run of 00h UTC, issued 2 days before the target day, zonal wind.
+NWP_LABEL_PATTERN = re.compile(r'^(?P<model>' + NWP_PREFIX + r'\d+)_(?P<run_hour>\d{2})h_D(?P<day_offset>-\d+)?_'
+                               r'(?P<variable>.+)$')
 
-def format_nwp(df, wp_number_label, wp_hour_label, wp_day_offset_label, w_feature_label, wp_label, copy=True):
-    if copy:
-        df = df.copy()
+NWPCoordinates = namedtuple('NWPCoordinates', ['model', 'run_hour', 'day_offset', 'variable'])
+
+# Number of set bits of each byte value.
+_BYTE_POPCOUNTS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+class NumericalWeatherPredictionTensor:
+    """
+    Numerical weather predictions stored as a (time x model x run x day offset x variable) tensor.
+
+    Column labels are parsed once into integer coordinates, values are then packed into a dense tensor filled with
+    NaNs for the coordinates without forecast. Selecting forecasts is done by coordinates, and returns views of the
+    tensor whenever possible.
+
+    Parameters
+    ----------
+    values: np.array of shape = (n_times, n_models, n_runs, n_day_offsets, n_variables)
+    index: pandas Index
+        Target times.
+    models: list of str
+        e.g. ``['NWP1', 'NWP2']``
+    run_hours: list of int
+        e.g. ``[0, 6, 12, 18]``
+    day_offsets: list of int
+        e.g. ``[-2, -1, 0]``
+    variables: list of str
+        e.g. ``['T', 'U', 'V']``
+    mask: np.array of shape = (n_models, n_runs, n_day_offsets, n_variables)
+        `True` for the coordinates having a column in the input data.
+    """
+
+    def __init__(self, values, index, models, run_hours, day_offsets, variables, mask):
+        self.values = values
+        self.index = index
+        self.models = models
+        self.run_hours = run_hours
+        self.day_offsets = day_offsets
+        self.variables = variables
+        self.mask = mask
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dtype=None) -> 'NumericalWeatherPredictionTensor':
+        """
+        Build the tensor from the NWP columns of a dataframe.
+
+        Parameters
+        ----------
+        {df} Columns that are not NWP forecasts are ignored.
+        dtype: numpy dtype, optional
+            Dtype of the tensor. By default, the one of the NWP columns.
+        """
+
+        labels, coordinates = parse_nwp_labels(tuple(df.columns))
+        block = df.loc[:, labels].to_numpy(dtype=dtype)
+
+        models = sorted({c.model for c in coordinates}, key=_natural_sort_key)
+        run_hours = sorted({c.run_hour for c in coordinates})
+        day_offsets = sorted({c.day_offset for c in coordinates})
+        variables = sorted({c.variable for c in coordinates})
+        shape = (len(models), len(run_hours), len(day_offsets), len(variables))
+
+        positions = np.ravel_multi_index(([models.index(c.model) for c in coordinates],
+                                          [run_hours.index(c.run_hour) for c in coordinates],
+                                          [day_offsets.index(c.day_offset) for c in coordinates],
+                                          [variables.index(c.variable) for c in coordinates]), shape)
+
+        values = np.full((block.shape[0], int(np.prod(shape))), np.nan, dtype=block.dtype)
+        values[:, positions] = block
+
+        mask = np.zeros(int(np.prod(shape)), dtype=bool)
+        mask[positions] = True
+
+        return cls(values.reshape((block.shape[0],) + shape), df.index, models, run_hours, day_offsets, variables,
+                   mask.reshape(shape))
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def select(self, model=None, run_hour=None, day_offset=None, variable=None) -> np.ndarray:
+        """
+        Select forecasts by coordinates.
+
+        Each coordinate left to `None` is kept as a whole dimension, the other ones are dropped from the output,
+        which is a view of the tensor.
+
+        Examples
+        --------
+        >>> tensor.select(model='NWP1', variable='U').shape  # (n_times, n_runs, n_day_offsets)
+        >>> tensor.select(model='NWP1', run_hour=0, day_offset=-1, variable='U').shape  # (n_times,)
+        """
+
+        return self.values[(slice(None),
+                            self._get_position(self.models, model),
+                            self._get_position(self.run_hours, run_hour),
+                            self._get_position(self.day_offsets, day_offset),
+                            self._get_position(self.variables, variable))]
+
+    def get_variable_block(self, variable, max_day_offset=None, model=None) -> np.ndarray:
+        """
+        All the forecasts of a variable, as a 2D (time x forecast) block.
+
+        Only the coordinates having a column in the input data are kept.
+
+        Parameters
+        ----------
+        variable: str
+        max_day_offset: int, optional
+            If given, only forecasts whose day offset is lower or equal are kept, e.g. ``-1`` to ignore the runs of
+            the target day.
+        model: str, optional
+            If given, only the forecasts of this model are kept.
+
+        Returns
+        -------
+        block: np.array of shape = (n_times, n_forecasts)
+        """
+
+        model_idx, run_idx, offset_idx = self._get_variable_positions(variable, max_day_offset, model)
+
+        return self.values[:, model_idx, run_idx, offset_idx, self.variables.index(variable)]
+
+    def get_variable_coordinates(self, variable, max_day_offset=None, model=None):
+        """
+        Coordinates of the forecasts of `get_variable_block`, column by column.
+
+        Returns
+        -------
+        models: np.array of shape = (n_forecasts)
+        run_hours: np.array of shape = (n_forecasts)
+        day_offsets: np.array of shape = (n_forecasts)
+        """
+
+        model_idx, run_idx, offset_idx = self._get_variable_positions(variable, max_day_offset, model)
+
+        return (np.asarray(self.models)[model_idx], np.asarray(self.run_hours)[run_idx],
+                np.asarray(self.day_offsets)[offset_idx])
+
+    def count_forecasts(self, variable, max_day_offset=None, model=None) -> int:
+        """Number of non missing forecasts of a variable, see `get_variable_block`."""
+
+        return int(np.count_nonzero(~np.isnan(self.get_variable_block(variable, max_day_offset, model))))
+
+    def compute_variable_statistics(self, variable, statistics=('median',), max_day_offset=None, model=None,
+                                    ddof=0):
+        """Statistics of the forecasts of a variable, see `get_variable_block` and `compute_ensemble_statistics`."""
+
+        return compute_ensemble_statistics(self.get_variable_block(variable, max_day_offset, model), statistics,
+                                           ddof=ddof)
+
+    def get_variable_mask(self, variable, max_day_offset=None) -> np.ndarray:
+        """(model x run x day offset) mask of the available forecasts of a variable."""
+
+        mask = self.mask[..., self.variables.index(variable)]
+
+        if max_day_offset is not None:
+            mask = mask & (np.asarray(self.day_offsets) <= max_day_offset)
+
+        return mask
+
+    def _get_variable_positions(self, variable, max_day_offset=None, model=None):
+        mask = self.get_variable_mask(variable, max_day_offset)
+
+        if model is not None:
+            mask = mask & (np.asarray(self.models) == model)[:, None, None]
+
+        return np.nonzero(mask)
+
+    @staticmethod
+    def _get_position(coordinates, value):
+        return slice(None) if value is None else coordinates.index(value)
+
+
+class PackedNumericalWeatherPredictions:
+    """
+    Numerical weather predictions stored column by column as a validity bitmap and the non missing values only.
+
+    Most NWP cells are missing, as each run only covers some target times. Each column is packed into a bitmap of
+    its non missing rows (1 bit per row) and the values of these rows, all the columns being concatenated into a
+    single values array (column by column, in row order). Memory is hence proportional to the number of non
+    missing cells. Selections read the bitmaps, and reductions (see `compute_variable_statistics`) only scan the
+    non missing cells.
+
+    The selection interface is the one of `NumericalWeatherPredictionTensor`, so both can be given to the feature
+    extraction.
+
+    Parameters
+    ----------
+    validity: np.array of uint8 of shape = (n_columns, ceil(n_times / 8))
+        Bit-packed masks of the non missing rows of each column (see `np.packbits`).
+    values: np.array of shape = (n_cells)
+        Non missing values, column by column.
+    column_offsets: np.array of int of shape = (n_columns + 1)
+        Values of column `i` are ``values[column_offsets[i]:column_offsets[i + 1]]``.
+    index: pandas Index
+        Target times.
+    labels: list of str
+        NWP labels of the columns.
+    """
+
+    def __init__(self, validity, values, column_offsets, index, labels):
+        self.validity = validity
+        self.values = values
+        self.column_offsets = column_offsets
+        self.index = index
+        self.labels = list(labels)
+        self._column_positions = {label: i for i, label in enumerate(self.labels)}
+
+        _, self.coordinates = parse_nwp_labels(tuple(self.labels))
+        self.models = sorted({c.model for c in self.coordinates}, key=_natural_sort_key)
+        self.run_hours = sorted({c.run_hour for c in self.coordinates})
+        self.day_offsets = sorted({c.day_offset for c in self.coordinates})
+        self.variables = sorted({c.variable for c in self.coordinates})
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dtype=np.float32) -> 'PackedNumericalWeatherPredictions':
+        """
+        Pack the NWP columns of a dataframe.
+
+        Parameters
+        ----------
+        {df} Columns that are not NWP forecasts are ignored.
+        dtype: numpy dtype, optional
+            Dtype of the values. If `None`, the one of the NWP columns.
+        """
+
+        labels, _ = parse_nwp_labels(tuple(df.columns))
+
+        if dtype is None:
+            dtype = np.result_type(*df.dtypes[labels]) if labels else np.float64
+
+        validities = []
+        values = []
+
+        for label in labels:
+            column = df[label].to_numpy(dtype=dtype)
+            is_valid = ~np.isnan(column)
+            validities.append(np.packbits(is_valid))
+            values.append(column[is_valid])
+
+        column_offsets = np.concatenate([[0], np.cumsum([len(v) for v in values], dtype=np.int64)])
+        validity = np.array(validities, dtype=np.uint8).reshape(len(labels), (len(df) + 7) // 8)
+        values = np.concatenate(values) if values else np.empty(0, dtype=dtype)
+
+        return cls(validity, values, column_offsets, df.index, labels)
+
+    @property
+    def n_times(self):
+        return len(self.index)
+
+    @property
+    def nbytes(self):
+        return self.validity.nbytes + self.values.nbytes + self.column_offsets.nbytes
+
+    @property
+    def density(self):
+        """Share of non missing cells."""
+
+        return len(self.values) / max(self.n_times * len(self.labels), 1)
+
+    def get_cells(self, columns, start=0, stop=None):
+        """
+        Non missing cells of some columns, within a range of rows.
+
+        Cells are read from the packed bitmaps: only their non zero bytes within the range are unpacked, and the
+        values of each column within the range are a slice of its values.
+
+        Parameters
+        ----------
+        columns: array-like of int
+            Positions of the columns.
+        start: int, optional
+            First row of the range.
+        stop: int, optional
+            Row after the last one of the range. By default, all the rows after `start`.
+
+        Returns
+        -------
+        column_positions: np.array of int
+            Position of the column of each cell within `columns`.
+        rows: np.array of int
+        values: np.array
+        """
+
+        columns = np.asarray(columns, dtype=np.int64)
+        stop = self.n_times if stop is None else stop
+        first_byte, last_byte = start // 8, (stop + 7) // 8
+        n_bytes = max(last_byte - first_byte, 0)
+
+        bytes_ = self.validity[columns, first_byte:last_byte]
+        n_column_cells = _BYTE_POPCOUNTS[bytes_].sum(axis=1, dtype=np.int64)
+        bytes_ = bytes_.ravel()
+
+        # Set bits of the non zero bytes, cells being column by column then in row order.
+        byte_positions = np.flatnonzero(bytes_ != 0)
+        cell_bits = np.flatnonzero(np.unpackbits(bytes_[byte_positions]))
+        column_positions = np.repeat(np.arange(len(columns)), n_column_cells)
+        rows = 8 * (byte_positions[cell_bits >> 3] - column_positions * n_bytes + first_byte) + (cell_bits & 7)
+
+        # Values of a column within the range follow the ones of the bytes before the range.
+        value_starts = self.column_offsets[columns] + _BYTE_POPCOUNTS[self.validity[columns, :first_byte]].sum(
+            axis=1, dtype=np.int64)
+        values = np.concatenate([self.values[value_start:value_start + n_cells]
+                                 for value_start, n_cells in zip(value_starts, n_column_cells)]) \
+            if len(columns) else self.values[:0]
+
+        # The first and last bytes may hold rows out of the range (the padding bits after the last row are not set).
+        if start % 8 or stop < min(8 * last_byte, self.n_times):
+            is_in_range = (rows >= start) & (rows < stop)
+            column_positions, rows, values = column_positions[is_in_range], rows[is_in_range], values[is_in_range]
+
+        return column_positions, rows, values
+
+    def to_block(self, columns) -> np.ndarray:
+        """Dense (time x column) block of some columns, NaN when missing."""
 
-    # 1. extract NWP columns
-    df = extract_columns(df, prefix=NWP_PREFIX, contained='D-')
+        column_positions, rows, values = self.get_cells(columns)
+        block = np.full((self.n_times, len(columns)), np.nan, dtype=self.values.dtype)
+        block[rows, column_positions] = values
 
-    # 2. dataframe melting by NWP
-    df = melt_nwp(df, wp_label)
+        return block
 
-    # 3. split by day offset and variable observed (day speed etc...)
-    df = split_nwp(df, [wp_number_label, wp_hour_label, wp_day_offset_label, w_feature_label])
+    def to_frame(self, labels=None) -> pd.DataFrame:
+        """Dense NWP columns (by default, all of them)."""
 
-    # 4. format day offset as int instead off str
-    df = format_day_offset(df, wp_day_offset_label)
+        labels = self.labels if labels is None else list(labels)
+        columns = [self.labels.index(label) for label in labels]
+
+        return pd.DataFrame(self.to_block(columns), index=self.index, columns=labels)
+
+    def take(self, positions, index=None) -> 'PackedNumericalWeatherPredictions':
+        """
+        Packed forecasts of some rows, e.g. the rows of a wind farm or a regular time index.
+
+        Only the cells within the range of the taken rows are read (see `get_cells`), and the output bitmaps are
+        packed from the cells directly.
+
+        Parameters
+        ----------
+        positions: array-like of int
+            Rows to take, -1 for rows without any forecast.
+        index: pandas Index, optional
+            Index of the output. By default, the index values of `positions`.
+
+        Raises
+        ------
+        ValueError
+            If a row is taken more than once.
+        """
+
+        positions = np.asarray(positions, dtype=np.int64)
+        is_taken = positions >= 0
+        taken_positions = positions[is_taken]
+        start, stop = (taken_positions.min(), taken_positions.max() + 1) if len(taken_positions) else (0, 0)
+
+        # New position of each row of the range, -1 if not taken.
+        new_rows = np.full(stop - start, -1, dtype=np.int64)
+        new_rows[taken_positions - start] = np.flatnonzero(is_taken)
+
+        if np.count_nonzero(new_rows >= 0) != len(taken_positions):
+            raise ValueError('Rows cannot be taken more than once')
+
+        columns, rows, values = self.get_cells(np.arange(len(self.labels)), start, stop)
+        rows = new_rows[rows - start]
+
+        if len(taken_positions) < stop - start:
+            is_kept = rows >= 0
+            columns, rows, values = columns[is_kept], rows[is_kept], values[is_kept]
+
+        if np.any(np.diff(taken_positions) < 0):
+            # Values are stored in row order within each column (cells stay column by column). Rows taken by
+            # increasing runs (e.g. the groups of a `DataFramePartition`) are merged by the stable sort.
+            order = np.argsort(columns * len(positions) + rows, kind='stable')
+            rows, values = rows[order], values[order]
+
+        # Bitmaps are packed from the cells: bytes are runs of cells, whose bits are combined.
+        n_columns, n_bytes = len(self.labels), (len(positions) + 7) // 8
+        validity = np.zeros(n_columns * n_bytes, dtype=np.uint8)
+
+        if len(rows):
+            byte_keys = columns * n_bytes + (rows >> 3)
+            byte_starts = np.flatnonzero(np.diff(byte_keys, prepend=-1))
+            validity[byte_keys[byte_starts]] = np.bitwise_or.reduceat(
+                np.right_shift(np.uint8(128), (rows & 7).astype(np.uint8)), byte_starts)
+
+        validity = validity.reshape(n_columns, n_bytes)
+        column_offsets = np.concatenate([[0], np.cumsum(np.bincount(columns, minlength=n_columns))])
+
+        if index is None:
+            index = self.index[np.where(is_taken, positions, 0)]
+
+        return PackedNumericalWeatherPredictions(validity, values, column_offsets, index, self.labels)
+
+    def astype(self, dtype) -> 'PackedNumericalWeatherPredictions':
+        """Forecasts with values of another dtype (`self` if they already have it)."""
+
+        if self.values.dtype == np.dtype(dtype):
+            return self
+
+        return PackedNumericalWeatherPredictions(self.validity, self.values.astype(dtype), self.column_offsets,
+                                                 self.index, self.labels)
+
+    def get_columns(self, labels) -> np.ndarray:
+        """Positions of the columns of some NWP labels."""
+
+        return np.array([self._column_positions[label] for label in labels], dtype=np.int64)
+
+    def count_group_forecasts(self, columns, group_offsets) -> np.ndarray:
+        """
+        Number of non missing cells of some columns within each group of rows.
+
+        Parameters
+        ----------
+        columns: array-like of int
+            Positions of the columns.
+        group_offsets: array-like of int of shape = (n_groups + 1)
+            Group `i` spans rows ``group_offsets[i]:group_offsets[i + 1]``.
+
+        Returns
+        -------
+        counts: np.array of int of shape = (n_groups)
+        """
+
+        group_offsets = np.asarray(group_offsets, dtype=np.int64)
+        _, rows, _ = self.get_cells(columns)
+
+        return np.bincount(np.searchsorted(group_offsets, rows, side='right') - 1, minlength=len(group_offsets) - 1)
+
+    def get_fingerprint(self) -> str:
+        """Content fingerprint of the forecasts (labels, bitmaps and values), e.g. for the feature cache."""
+
+        sha1 = hashlib.sha1()
+
+        for array in (self.validity, self.values, self.column_offsets):
+            sha1.update(np.ascontiguousarray(array).tobytes())
+
+        sha1.update(json.dumps([self.labels, str(self.values.dtype)]).encode())
+
+        return sha1.hexdigest()
+
+    def get_variable_columns(self, variable, max_day_offset=None, model=None) -> np.ndarray:
+        """
+        Positions of the columns of a variable, in the order of `NumericalWeatherPredictionTensor.get_variable_block`.
+        """
+
+        columns = [i for i, c in enumerate(self.coordinates)
+                   if c.variable == variable and (max_day_offset is None or c.day_offset <= max_day_offset)
+                   and (model is None or c.model == model)]
+
+        return np.array(sorted(columns, key=lambda i: (self.models.index(self.coordinates[i].model),
+                                                       self.coordinates[i].run_hour,
+                                                       self.coordinates[i].day_offset)), dtype=np.int64)
+
+    def get_variable_block(self, variable, max_day_offset=None, model=None) -> np.ndarray:
+        """See `NumericalWeatherPredictionTensor.get_variable_block`."""
+
+        return self.to_block(self.get_variable_columns(variable, max_day_offset, model))
+
+    def get_variable_coordinates(self, variable, max_day_offset=None, model=None):
+        """See `NumericalWeatherPredictionTensor.get_variable_coordinates`."""
+
+        coordinates = [self.coordinates[i] for i in self.get_variable_columns(variable, max_day_offset, model)]
+
+        return (np.array([c.model for c in coordinates]), np.array([c.run_hour for c in coordinates], dtype=int),
+                np.array([c.day_offset for c in coordinates], dtype=int))
+
+    def get_variable_mask(self, variable, max_day_offset=None) -> np.ndarray:
+        """See `NumericalWeatherPredictionTensor.get_variable_mask`."""
+
+        mask = np.zeros((len(self.models), len(self.run_hours), len(self.day_offsets)), dtype=bool)
+
+        for i in self.get_variable_columns(variable, max_day_offset):
+            c = self.coordinates[i]
+            mask[self.models.index(c.model), self.run_hours.index(c.run_hour), self.day_offsets.index(c.day_offset)] \
+                = True
+
+        return mask
+
+    def count_forecasts(self, variable, max_day_offset=None, model=None) -> int:
+        """Number of non missing forecasts of a variable, read from the column offsets."""
+
+        columns = self.get_variable_columns(variable, max_day_offset, model)
+
+        return int(np.sum(self.column_offsets[columns + 1] - self.column_offsets[columns]))
+
+    def compute_variable_statistics(self, variable, statistics=('median',), max_day_offset=None, model=None,
+                                    ddof=0):
+        """
+        Statistics of the forecasts of a variable, computed from the non missing cells only, see
+        `compute_segment_statistics`.
+        """
+
+        _, rows, values = self.get_cells(self.get_variable_columns(variable, max_day_offset, model))
+
+        return compute_segment_statistics(rows, values, self.n_times, statistics, ddof=ddof)
+
+
+def split_numerical_weather_predictions(df: pd.DataFrame, dtype=np.float32):
+    """
+    Pack the NWP columns of a dataframe apart from its other columns, see `PackedNumericalWeatherPredictions`.
+
+    Parameters
+    ----------
+    {df}
+    dtype: numpy dtype, optional
+        Dtype of the packed values. If `None`, the one of the NWP columns.
+
+    Returns
+    -------
+    {df} A new dataframe, without the NWP columns.
+    nwp: PackedNumericalWeatherPredictions
+        Forecasts of the rows of `df`.
+    """
+
+    nwp = PackedNumericalWeatherPredictions.from_frame(df, dtype=dtype)
+
+    return df.drop(columns=nwp.labels), nwp
+
+
+def parse_nwp_label(label: str):
+    """
+    Parse a NWP column label.
+
+    Returns
+    -------
+    coordinates: NWPCoordinates or None
+        `None` if `label` is not a NWP forecast label.
+
+    Examples
+    --------
+    >>> parse_nwp_label('NWP1_00h_D-2_U')
+    NWPCoordinates(model='NWP1', run_hour=0, day_offset=-2, variable='U')
+    >>> parse_nwp_label('NWP3_12h_D_T')
+    NWPCoordinates(model='NWP3', run_hour=12, day_offset=0, variable='T')
+    """
+
+    match = NWP_LABEL_PATTERN.match(str(label))
+
+    if match is None:
+        return None
+
+    return NWPCoordinates(model=match.group('model'),
+                          run_hour=int(match.group('run_hour')),
+                          day_offset=int(match.group('day_offset') or 0),
+                          variable=match.group('variable'))
+
+
+@lru_cache(maxsize=32)
+def parse_nwp_labels(labels: tuple):
+    """
+    Parse all the NWP labels among `labels`.
+
+    Results are cached, as the same columns are parsed again for every fit and predict.
+
+    Returns
+    -------
+    nwp_labels: list of str
+    coordinates: list of NWPCoordinates
+    """
+
+    nwp_labels = []
+    coordinates = []
+
+    for label in labels:
+        label_coordinates = parse_nwp_label(label)
+
+        if label_coordinates is not None:
+            nwp_labels.append(label)
+            coordinates.append(label_coordinates)
+
+    return nwp_labels, coordinates
+
+
+def format_nwp(df, wp_number_label, wp_hour_label, wp_day_offset_label, w_feature_label, wp_label, copy=True):
+    """
+    Format the NWP columns of a time series dataframe into a long dataframe.
 
-    return df
+    Each row of the output is a non missing forecast: its target time, the NWP model, the run hour, the day offset,
+    the variable and its value. Only the runs of previous days (``D-1``, ``D-2``...) are kept.
 
+    The output is built from the parsed column labels and the positions of the non missing values, without any
+    string processing on the rows. `df` can also be a `PackedNumericalWeatherPredictions`, whose non missing values
+    are read directly.
+    """
 
-def melt_nwp(df, wp_label):
-    return pd.melt(df.reset_index(), id_vars=TIME_LABEL, value_name=wp_label).dropna()
+    # The output is always a new dataframe: `copy` is only kept for backward compatibility.
+    if isinstance(df, PackedNumericalWeatherPredictions):
+        labels, coordinates = df.labels, df.coordinates
+    else:
+        labels, coordinates = parse_nwp_labels(tuple(df.columns))
 
+    previous_days = [i for i, c in enumerate(coordinates) if c.day_offset < 0]
+    coordinates = pd.DataFrame([coordinates[i] for i in previous_days], columns=NWPCoordinates._fields)
 
-def split_nwp(df, col_labels):
-    df[col_labels] = df['variable'].str.split('_', expand=True)
-    return df.drop('variable', axis=1)
+    if isinstance(df, PackedNumericalWeatherPredictions):
+        # Cells are packed column by column, as `pd.melt` does.
+        col_idx, time_idx, values = df.get_cells(previous_days)
+    else:
+        block = df.loc[:, [labels[i] for i in previous_days]].to_numpy()
+        # Column major, as `pd.melt` does.
+        col_idx, time_idx = np.nonzero(~np.isnan(block.T))
+        values = block[time_idx, col_idx]
 
+    return pd.DataFrame({TIME_LABEL: df.index[time_idx],
+                         wp_label: values,
+                         wp_number_label: coordinates['model'].to_numpy()[col_idx],
+                         wp_hour_label: coordinates['run_hour'].map('{:02d}h'.format).to_numpy()[col_idx],
+                         wp_day_offset_label: coordinates['day_offset'].to_numpy()[col_idx],
+                         w_feature_label: coordinates['variable'].to_numpy()[col_idx]})
 
-def format_day_offset(df, day_offset_label):
-    df[day_offset_label] = df[day_offset_label].str.replace('D-', '-')
-    df[day_offset_label] = df[day_offset_label].str.replace('D', '0')
-    df[day_offset_label] = df[day_offset_label].astype(int)
 
-    return df
+def _natural_sort_key(label: str) -> List:
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', label)]
@@ -0,0 +1,202 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from wind_power_forecasting import TIME_LABEL, WF_LABEL, ID_LABEL, NWP_PREFIX, RAW_CACHE_DIR
+from wind_power_forecasting.preprocessing.numerical_weather_prediction import split_numerical_weather_predictions
+from wind_power_forecasting.utils.storage import write_frame_blocks, read_frame_blocks, read_frame_blocks_meta, \
+    update_frame_blocks_extra_meta
+
+# Bump it each time the schema changes so that existing caches are rebuilt.
+RAW_SCHEMA_VERSION = 1
+
+
+def get_raw_dtype_schema(columns) -> Dict:
+    """
+    Explicit dtypes of the raw input files columns.
+
+        + ``Time``: datetime64
+        + ``WF``: categorical
+        + ``ID``: int32
+        + ``NWP*``: float32
+
+    Other columns (e.g. ``Production``) are left to the pandas parser.
+
+    Parameters
+    ----------
+    columns: list
+        Columns of the raw file.
+
+    Returns
+    -------
+    schema: dict
+        Mapping between column labels and dtypes.
+    """
+
+    schema = {}
+
+    for label in columns:
+        if label == TIME_LABEL:
+            schema[label] = 'datetime64[ns]'
+        elif label == WF_LABEL:
+            schema[label] = 'category'
+        elif label == ID_LABEL:
+            schema[label] = np.int32
+        elif label.startswith(NWP_PREFIX):
+            schema[label] = np.float32
+
+    return schema
+
+
+def read_raw_csv(file: str, cache_dir: str = RAW_CACHE_DIR, use_cache: bool = True, pack_nwp: bool = False):
+    """
+    Read a raw input csv file, converting it once into a typed columnar cache.
+
+    The first call parses the csv with the explicit schema of `get_raw_dtype_schema` and stores the result as
+    ``.npy`` blocks within `cache_dir`. Next calls read these blocks back, as long as the csv file did not change.
+
+    The cache is considered up to date if the size and the modification time of the csv file are the ones
+    recorded when the cache was built. If only the modification time differs, the file content hash is compared
+    before rebuilding the cache; if the content is the same, the new modification time is recorded.
+
+    Parameters
+    ----------
+    file: str
+        Path of the csv file.
+    cache_dir: str, optional
+        Directory where the cache is stored.
+    use_cache: bool, optional
+        If `False`, the csv file is parsed and the cache is neither read nor written.
+    pack_nwp: bool, optional
+        If `True`, the NWP columns are packed apart from the other columns (see `PackedNumericalWeatherPredictions`),
+        as soon as they are loaded. The cached blocks are then memory-mapped, so that the dense NWP columns are never
+        all in memory.
+
+    Returns
+    -------
+    {df} Without the NWP columns if `pack_nwp`.
+    nwp: PackedNumericalWeatherPredictions
+        Only if `pack_nwp`: forecasts of the rows of `df`.
+    """
+
+    if not use_cache:
+        df = _parse_raw_csv(file)
+    else:
+        cache_path = get_raw_cache_path(file, cache_dir)
+
+        if is_raw_cache_valid(file, cache_path):
+            df = read_frame_blocks(cache_path, mmap_mode='r' if pack_nwp else None)
+        else:
+            df = _parse_raw_csv(file)
+            fingerprint = get_file_fingerprint(file, with_hash=True)
+            write_frame_blocks(df, cache_path, extra_meta={'source': fingerprint,
+                                                           'schema_version': RAW_SCHEMA_VERSION})
+
+    if not pack_nwp:
+        return df
+
+    df, nwp = split_numerical_weather_predictions(df)
+
+    # The other columns are read out of the memory-mapped blocks.
+    return df.copy(), nwp
+
+
+def read_raw_inputs(*files: str, cache_dir: str = RAW_CACHE_DIR, use_cache: bool = True,
+                    pack_nwp: bool = False) -> List:
+    """
+    Read several raw input files concurrently.
+
+    Parameters
+    ----------
+    files: str
+        Paths of the csv files.
+    cache_dir: str, optional
+        Directory where the cache is stored.
+    use_cache: bool, optional
+        If `False`, the csv files are parsed and the cache is neither read nor written.
+    pack_nwp: bool, optional
+        If `True`, the NWP columns are packed as soon as they are loaded, see `read_raw_csv`.
+
+    Returns
+    -------
+    dfs: list of pandas DataFrame objects
+        One dataframe per file, in the same order as `files`. If `pack_nwp`, one ``(df, nwp)`` pair per file instead.
+    """
+
+    with ThreadPoolExecutor(max_workers=max(len(files), 1)) as executor:
+        futures = [executor.submit(read_raw_csv, file, cache_dir=cache_dir, use_cache=use_cache, pack_nwp=pack_nwp)
+                   for file in files]
+
+        return [future.result() for future in futures]
+
+
+def is_raw_cache_valid(file: str, cache_path: str) -> bool:
+    try:
+        extra_meta = read_frame_blocks_meta(cache_path)['extra']
+    except (FileNotFoundError, ValueError):
+        return False
+
+    if extra_meta.get('schema_version') != RAW_SCHEMA_VERSION:
+        return False
+
+    cached = extra_meta['source']
+    current = get_file_fingerprint(file)
+
+    if current['size'] != cached['size']:
+        return False
+
+    if current['mtime_ns'] == cached['mtime_ns']:
+        return True
+
+    # The file was touched or copied: only its content matters.
+    sha1 = get_file_hash(file)
+
+    if sha1 != cached['sha1']:
+        return False
+
+    # Same content: record the new modification time, so that next calls don't hash the file again.
+    update_frame_blocks_extra_meta(cache_path, {'source': dict(current, sha1=sha1)})
+
+    return True
+
+
+def get_raw_cache_path(file: str, cache_dir: str = RAW_CACHE_DIR) -> str:
+    return os.path.join(cache_dir, os.path.splitext(os.path.basename(file))[0])
+
+
+def get_file_fingerprint(file: str, with_hash: bool = False) -> Dict:
+    stat = os.stat(file)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    if with_hash:
+        fingerprint['sha1'] = get_file_hash(file)
+
+    return fingerprint
+
+
+def get_file_hash(file: str, chunk_size: int = 1 << 20) -> str:
+    sha1 = hashlib.sha1()
+
+    with open(file, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(chunk)
+
+    return sha1.hexdigest()
+
+
+def _parse_raw_csv(file):
+    columns = pd.read_csv(file, nrows=0).columns
+    schema = get_raw_dtype_schema(columns)
+
+    # Datetime parsing is done afterwards, the same way `df_to_ts` converts the index.
+    parsing_schema = {label: dtype for label, dtype in schema.items() if label != TIME_LABEL}
+    df = pd.read_csv(file, dtype=parsing_schema)
+
+    if TIME_LABEL in df:
+        df[TIME_LABEL] = pd.to_datetime(df[TIME_LABEL])
+
+    return df
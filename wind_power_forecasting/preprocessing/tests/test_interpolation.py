@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from wind_power_forecasting.preprocessing.interpolation import interpolate_block, \
+    interpolate_numerical_weather_predictions, interpolate_packed_numerical_weather_predictions
+from wind_power_forecasting.preprocessing.numerical_weather_prediction import PackedNumericalWeatherPredictions
+
+
+class TestInterpolateBlock:
+
+    def test_same_as_pandas(self):
+        rng = np.random.RandomState(0)
+        block = rng.randn(100, 6)
+        block[np.arange(100) % 3 != 0, :3] = np.nan
+        block[rng.rand(100, 6) < 0.2] = np.nan
+
+        output = interpolate_block(block, max_gap=3)
+        expected = pd.DataFrame(block).interpolate(limit_area='inside')
+        # Gaps longer than `max_gap` are not filled.
+        for column in range(6):
+            is_missing = pd.Series(np.isnan(block[:, column]))
+            gap_lengths = is_missing.groupby((~is_missing).cumsum()).transform('sum')
+            expected.loc[is_missing & (gap_lengths > 3), column] = np.nan
+
+        np.testing.assert_allclose(output, expected.to_numpy(), rtol=1e-12, atol=1e-12)
+
+    def test_groups_and_circular(self):
+        block = np.array([[170.], [np.nan], [-170.], [np.nan], [0.], [np.nan], [20.]])
+
+        output = interpolate_block(block, group_offsets=[0, 4, 7], is_circular=[True])
+
+        np.testing.assert_allclose(output.ravel(), [170., -180., -170., np.nan, 0., 10., 20.])
+
+
+def test_packed_same_as_dense():
+    rng = np.random.RandomState(0)
+    labels = ['NWP1_00h_D-1_U', 'NWP1_00h_D-1_V', 'NWP2_00h_D-1_U', 'NWP2_00h_D-1_DIR', 'NWP1_12h_D-1_T',
+              'NWP3_00h_D-1_U']
+    values = rng.randn(60, 6) * 100
+    # A 3-hourly model, sparse columns and an empty one.
+    values[np.arange(60) % 3 != 0, 2:4] = np.nan
+    values[rng.rand(60, 6) < 0.3] = np.nan
+    values[:, -1] = np.nan
+    df = pd.DataFrame(values, columns=labels, dtype=np.float32)
+
+    kwargs = dict(max_gap=4, circular_variables=['DIR'], group_offsets=[0, 25, 60])
+    output = interpolate_packed_numerical_weather_predictions(PackedNumericalWeatherPredictions.from_frame(df),
+                                                              **kwargs)
+
+    pd.testing.assert_frame_equal(output.to_frame(), interpolate_numerical_weather_predictions(df, **kwargs))
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wind_power_forecasting.preprocessing.numerical_weather_prediction import NumericalWeatherPredictionTensor, \
+    PackedNumericalWeatherPredictions
+
+
+class TestPackedNumericalWeatherPredictions:
+
+    def get_df(self):
+        rng = np.random.RandomState(0)
+        labels = ['NWP1_00h_D-2_U', 'NWP1_12h_D-1_U', 'NWP2_00h_D-1_U', 'NWP1_00h_D-1_T', 'NWP1_00h_D_U']
+        df = pd.DataFrame(rng.randn(50, 5), columns=labels, dtype=np.float32,
+                          index=pd.date_range('2018-01-01', periods=50, freq='H'))
+        df[rng.rand(50, 5) < 0.7] = np.nan
+
+        return df
+
+    def test_round_trip(self):
+        df = self.get_df()
+
+        packed = PackedNumericalWeatherPredictions.from_frame(df)
+
+        pd.testing.assert_frame_equal(packed.to_frame(), df)
+        assert packed.nbytes < df.memory_usage(index=False).sum()
+
+    def test_same_statistics_as_tensor(self):
+        df = self.get_df()
+        statistics = ['median', 'min', 'max', 'count', 0.25]
+
+        packed = PackedNumericalWeatherPredictions.from_frame(df)
+        tensor = NumericalWeatherPredictionTensor.from_frame(df)
+
+        for model in [None, 'NWP1']:
+            expected = tensor.compute_variable_statistics('U', statistics, max_day_offset=-1, model=model)
+            output = packed.compute_variable_statistics('U', statistics, max_day_offset=-1, model=model)
+
+            for statistic in statistics:
+                np.testing.assert_array_equal(output[statistic], expected[statistic])
+
+    def test_take(self):
+        df = self.get_df()
+        packed = PackedNumericalWeatherPredictions.from_frame(df)
+
+        # A range of rows, with missing time steps, then rows out of order.
+        for positions in [[-1, 9, 10, 11, -1, 12, 30], np.random.RandomState(0).permutation(50)[:20]]:
+            index = pd.RangeIndex(len(positions))
+            output = packed.take(positions, index=index)
+            expected_df = df.reset_index(drop=True).reindex(positions).set_axis(index)
+
+            pd.testing.assert_frame_equal(output.to_frame(), expected_df)
+            pd.testing.assert_frame_equal(output.to_frame(), PackedNumericalWeatherPredictions.from_frame(
+                output.to_frame()).to_frame())
+
+        with pytest.raises(ValueError):
+            packed.take([3, 4, 3])
+
+    def test_get_cells_of_a_range(self):
+        df = self.get_df()
+        packed = PackedNumericalWeatherPredictions.from_frame(df)
+        columns = [3, 0, 2]
+
+        column_positions, rows, values = packed.get_cells(columns, start=13, stop=37)
+
+        block = df.iloc[13:37, columns].to_numpy()
+        expected_column_positions, expected_rows = np.nonzero(~np.isnan(block.T))
+        np.testing.assert_array_equal(column_positions, expected_column_positions)
+        np.testing.assert_array_equal(rows, expected_rows + 13)
+        np.testing.assert_array_equal(values, block[expected_rows, expected_column_positions])
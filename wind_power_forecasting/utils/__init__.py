@@ -1,9 +1,11 @@
 import wind_power_forecasting.utils.dataframe
 import wind_power_forecasting.utils.numeric
+import wind_power_forecasting.utils.partition
 
 from wind_power_forecasting.utils.dataframe import df_to_X_y, get_sub_df, get_X_y_df, split_features_to_process_df
+from wind_power_forecasting.utils.partition import DataFramePartition
 
-__all__ = ['dataframe', 'numeric',
+__all__ = ['dataframe', 'numeric', 'partition',
 
-           'df_to_X_y', 'get_sub_df', 'get_X_y_df', 'split_features_to_process_df'
+           'df_to_X_y', 'get_sub_df', 'get_X_y_df', 'split_features_to_process_df', 'DataFramePartition'
            ]
@@ -72,7 +72,7 @@ def get_X_y_df(df, target_label=None, rm_na=False):
 
 
 def df_to_X_y(X_y_df: pd.DataFrame = None, X_df: pd.DataFrame = None, y_df: pd.DataFrame = None, target_label=None,
-              output_type='array'):
+              output_type='array', dtype='numeric'):
     """
     Split features and target from a dataframe containing both of them and return it.
 
@@ -88,6 +88,8 @@ def df_to_X_y(X_y_df: pd.DataFrame = None, X_df: pd.DataFrame = None, y_df: pd.D
     output_type: str
         Type of the output.
         If `array`, the output will be a numpy array, if `dataframe` the output will be a pandas DataFrame object.
+    dtype: str, type or None
+        Dtype of the `X` array, see `sklearn.utils.check_array`. By default, the one of `X_df` is kept if numeric.
 
     Returns
     -------
@@ -143,7 +145,7 @@ def df_to_X_y(X_y_df: pd.DataFrame = None, X_df: pd.DataFrame = None, y_df: pd.D
     X_labels = list(X_df)
 
     if output_type == 'array':
-        X_out = check_array(X_df, accept_sparse='csr')
+        X_out = check_array(X_df, accept_sparse='csr', dtype=dtype)
         y_out = np.ravel(check_array(y_df, ensure_2d=False))
 
     elif output_type == 'dataframe':
@@ -203,3 +205,10 @@ def copy_or_not_copy(df: pd.DataFrame, copy=True) -> pd.DataFrame:
         df = df.copy()
 
     return df
+
+
+def iter_row_chunks(df: pd.DataFrame, chunk_size: int):
+    """Successive chunks of at most `chunk_size` rows of a dataframe (views, not copies)."""
+
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
@@ -0,0 +1,121 @@
+import warnings
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+VALID_ERRORS = [None, 'warn', 'raise']
+
+
+class DtypePromotionWarning(UserWarning):
+    """
+    This warning is raised when a stage of the pipeline outputs columns wider than the dtype policy
+    """
+
+
+class DtypePromotionError(TypeError):
+    """
+    This error is raised when a stage of the pipeline outputs columns wider than the dtype policy
+    """
+
+
+def cast_columns(df: pd.DataFrame, dtype, exclude=None) -> pd.DataFrame:
+    """
+    Cast all the numerical columns of a dataframe to `dtype`, in a single block.
+
+    `df` itself is returned if all its columns already have the right dtype.
+
+    Parameters
+    ----------
+    {df}
+    dtype: numpy dtype or None
+        If `None`, `df` is returned as is.
+    exclude: list, optional
+        Columns not to cast (e.g. ``ID``).
+
+    Returns
+    -------
+    {df}
+    """
+
+    if dtype is None:
+        return df
+
+    dtype = np.dtype(dtype)
+    exclude = set() if exclude is None else set(exclude)
+    to_cast_labels = [label for label, column_dtype in df.dtypes.items()
+                      if label not in exclude and _is_numeric_dtype(column_dtype) and column_dtype != dtype]
+
+    if not to_cast_labels:
+        return df
+
+    # Casting the columns as a single block is much faster than column by column (e.g. with a dict).
+    to_cast_labels = set(to_cast_labels)
+    kept_labels = [label for label in df if label not in to_cast_labels]
+    cast_df = df.loc[:, [label for label in df if label in to_cast_labels]].astype(dtype)
+
+    return pd.concat([cast_df, df.loc[:, kept_labels]], axis=1).loc[:, df.columns]
+
+
+def get_promoted_columns(df: pd.DataFrame, dtype, exclude=None) -> Dict:
+    """
+    Columns that cannot be held by `dtype` without promoting it, e.g. float64 or int64 columns for float32.
+
+    Returns
+    -------
+    promoted_columns: dict
+        Maps the label of each promoted column to its dtype.
+    """
+
+    dtype = np.dtype(dtype)
+    exclude = set() if exclude is None else set(exclude)
+
+    return {label: column_dtype for label, column_dtype in df.dtypes.items()
+            if label not in exclude and _is_numeric_dtype(column_dtype)
+            and np.promote_types(column_dtype, dtype) != dtype}
+
+
+def check_dtype_promotion(df: pd.DataFrame, dtype, stage: str, exclude=None, errors='warn') -> Dict:
+    """
+    Report the columns of a dataframe promoted beyond the dtype policy after a pipeline stage.
+
+    Parameters
+    ----------
+    {df}
+    dtype: numpy dtype
+        dtype of the policy.
+    stage: str
+        Name of the stage which produced `df`, used in the report.
+    exclude: list, optional
+        Columns not to check (e.g. ``ID``).
+    errors: str or None, optional
+        ``'warn'`` (**default**) to raise a `DtypePromotionWarning`, ``'raise'`` to raise a `DtypePromotionError`,
+        `None` to only return the promoted columns.
+
+    Returns
+    -------
+    promoted_columns: dict
+        Maps the label of each promoted column to its dtype.
+    """
+
+    if errors not in VALID_ERRORS:
+        raise ValueError('Unexpected errors: {}. Should be one of: {}'.format(errors, VALID_ERRORS))
+
+    promoted_columns = get_promoted_columns(df, dtype, exclude)
+
+    if promoted_columns and errors is not None:
+        message = '{}: {} column(s) promoted beyond {}: {}'.format(
+            stage, len(promoted_columns), np.dtype(dtype),
+            ', '.join('{} ({})'.format(label, column_dtype) for label, column_dtype in promoted_columns.items()))
+
+        if errors == 'raise':
+            raise DtypePromotionError(message)
+
+        warnings.warn(message, DtypePromotionWarning)
+
+    return promoted_columns
+
+
+def _is_numeric_dtype(dtype):
+    return (pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+            and isinstance(dtype, np.dtype))
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+
+# Environment variables read by the native thread pools (BLAS, OpenMP) when they are first loaded.
+THREADS_ENV_VARIABLES = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS',
+                         'NUMEXPR_NUM_THREADS']
+# In-memory file system, where the shared arrays are preferably stored (as joblib does).
+SHARED_MEMORY_DIR = '/dev/shm'
+
+
+def get_n_cores() -> int:
+    """Number of cores usable by the current process."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+
+    return os.cpu_count() or 1
+
+
+def get_n_jobs_per_worker(n_workers: int, n_cores: int = None) -> int:
+    """
+    Share the cores between several workers, so that nested parallelism doesn't oversubscribe the machine.
+
+    Parameters
+    ----------
+    n_workers: int
+        Number of workers running at the same time.
+    n_cores: int, optional
+        Total number of cores to share. By default, all the cores usable by the current process.
+
+    Returns
+    -------
+    n_jobs: int
+        Number of jobs each worker is allowed to run (at least 1).
+    """
+
+    if n_cores is None:
+        n_cores = get_n_cores()
+
+    return max(1, n_cores // max(1, n_workers))
+
+
+def limit_threads(n_threads: int):
+    """
+    Cap the number of threads used by native libraries within the current process.
+
+    Meant to be used as a process pool initializer. The environment variables only apply to libraries loaded
+    afterwards (and are inherited by sub-processes), already loaded thread pools are capped through `threadpoolctl`
+    when it is installed.
+    """
+
+    for variable in THREADS_ENV_VARIABLES:
+        os.environ[variable] = str(n_threads)
+
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+
+    threadpool_limits(limits=n_threads)
+
+
+@contextmanager
+def shared_arrays(*arrays, temp_folder=None):
+    """
+    Memory-map arrays from a temporary folder, so that the workers of a process pool read them without copying them.
+
+    joblib sends memory-mapped arrays to its workers by reference (file name and offset) instead of pickling them:
+    all the workers map the same pages, and the data is held once whatever the number of workers. The folder is
+    removed on exit.
+
+    Parameters
+    ----------
+    arrays: np.array
+    temp_folder: str, optional
+        By default, ``/dev/shm`` if it exists (the arrays then stay in memory), the system temporary folder otherwise.
+
+    Yields
+    ------
+    shared: list of np.memmap
+        Read-only copies of `arrays`.
+
+    Examples
+    --------
+    >>> with shared_arrays(X, y) as (X, y):
+    ...     search.fit(X, y)
+    """
+
+    if temp_folder is None and os.path.isdir(SHARED_MEMORY_DIR):
+        temp_folder = SHARED_MEMORY_DIR
+
+    folder = tempfile.mkdtemp(prefix='wpf_shared_', dir=temp_folder)
+
+    try:
+        shared = []
+
+        for position, array in enumerate(arrays):
+            path = os.path.join(folder, '{}.npy'.format(position))
+            np.save(path, np.ascontiguousarray(array), allow_pickle=False)
+            shared.append(np.load(path, mmap_mode='r'))
+
+        yield shared
+
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+
+class DataFramePartition:
+    """
+    Split a dataframe by the values of one of its columns in a single pass.
+
+    Rows are stably sorted once by group, so that each group is a contiguous range of rows described by an offsets
+    table. Groups are then returned as slices of the sorted dataframe, i.e. views without any copy. Splitting cost
+    doesn't depend on the number of groups.
+
+    Parameters
+    ----------
+    {df}
+    column_label: str
+        Column whose values define the groups.
+    keep_column: bool, optional
+        If `False` (**default**) `column_label` is dropped from the groups.
+
+    Attributes
+    ----------
+    groups: list
+        Group values, in order of first appearance within `df`.
+    offsets: np.array of shape = (n_groups + 1)
+        Group `i` spans rows ``offsets[i]:offsets[i + 1]`` of the sorted dataframe.
+    sorted_df: pandas DataFrame object
+        All the groups, one after the other.
+    positions: np.array of int of shape = (n_sorted_rows)
+        Row of `df` of each row of `sorted_df`, e.g. to take the packed forecasts of `df` (see
+        `PackedNumericalWeatherPredictions.take`).
+
+    Examples
+    --------
+    >>> df = pd.DataFrame({'WF': ['WF1', 'WF2', 'WF1'], 'ID': [1, 2, 3]})
+    >>> partition = DataFramePartition(df, 'WF')
+    >>> partition.groups
+    ['WF1', 'WF2']
+    >>> partition.get_group('WF1')
+       ID
+    0   1
+    2   3
+    """
+
+    def __init__(self, df: pd.DataFrame, column_label: str, keep_column: bool = False):
+        codes, groups = pd.factorize(df[column_label], sort=False)
+
+        # Missing values get the -1 code and are sorted first: skip them.
+        order = np.argsort(codes, kind='mergesort')
+        order = order[np.count_nonzero(codes < 0):]
+        counts = np.bincount(codes[order], minlength=len(groups))
+
+        columns = [i for i, label in enumerate(df.columns) if keep_column or label != column_label]
+
+        self._set_partition(df.iloc[order, columns], list(groups), counts, order)
+
+    @classmethod
+    def _from_sorted(cls, sorted_df, groups, counts, positions):
+        partition = cls.__new__(cls)
+        partition._set_partition(sorted_df, groups, counts, positions)
+
+        return partition
+
+    def _set_partition(self, sorted_df, groups, counts, positions):
+        self.groups = groups
+        self.positions = positions
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self._sorted_df = sorted_df
+        self._group_positions = {group: i for i, group in enumerate(groups)}
+
+    @property
+    def sorted_df(self) -> pd.DataFrame:
+        return self._sorted_df
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __iter__(self):
+        for group in self.groups:
+            yield group, self.get_group(group)
+
+    def get_group(self, group) -> pd.DataFrame:
+        """
+        Rows of a group, as a view of the sorted dataframe.
+
+        An empty dataframe is returned if `group` doesn't exist.
+        """
+
+        return self._sorted_df.iloc[self.get_group_slice(group)]
+
+    def get_group_slice(self, group) -> slice:
+        """Rows of a group within `sorted_df` (an empty slice if `group` doesn't exist)."""
+
+        position = self._group_positions.get(group)
+
+        if position is None:
+            return slice(0, 0)
+
+        return slice(self.offsets[position], self.offsets[position + 1])
+
+    def align(self, other_df: pd.DataFrame, key_label: str) -> 'DataFramePartition':
+        """
+        Partition another dataframe along the same groups, matching rows through a key column.
+
+        Each row of `other_df` is assigned to the group of the row sharing the same key, using a single hash lookup
+        for all the keys. Rows of `other_df` whose key is not found are dropped, as with `get_sub_df`.
+
+        Parameters
+        ----------
+        other_df: pandas DataFrame object
+            Dataframe to partition. Its `key_label` values must be unique.
+        key_label: str
+            Column present in both dataframes, e.g. ``ID``.
+
+        Returns
+        -------
+        partition: DataFramePartition
+            Partition of `other_df` sharing the groups of `self`. Within a group, rows follow the order of `self`.
+        """
+
+        keys = self._sorted_df[key_label].to_numpy()
+        positions = pd.Index(other_df[key_label]).get_indexer(keys)
+
+        is_found = positions >= 0
+        group_ids = np.repeat(np.arange(len(self.groups)), np.diff(self.offsets))
+        counts = np.bincount(group_ids[is_found], minlength=len(self.groups))
+
+        return DataFramePartition._from_sorted(other_df.iloc[positions[is_found]], self.groups, counts,
+                                               positions[is_found])
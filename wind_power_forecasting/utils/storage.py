@@ -0,0 +1,198 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_categorical_dtype, is_datetime64_any_dtype
+
+STORAGE_FORMAT_VERSION = 1
+META_FILE = 'meta.json'
+
+
+def write_frame_blocks(df: pd.DataFrame, path: str, extra_meta: dict = None):
+    """
+    Store a dataframe as a directory of columnar ``.npy`` blocks.
+
+    Columns sharing the same dtype are packed together into a single 2D block so that reading them back is one
+    ``np.load`` per dtype instead of one per column. Categorical columns are stored as integer codes and their
+    categories are kept in the metadata file.
+
+    The directory is written next to `path` and renamed at the end, so a reader never sees a partially written
+    store.
+
+    Parameters
+    ----------
+    {df}
+    path: str
+        Directory where the blocks are stored. Replaced if it already exists.
+    extra_meta: dict, optional
+        Additional JSON serializable information stored along with the blocks.
+    """
+
+    parent_dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent_dir, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix='.tmp_', dir=parent_dir)
+
+    try:
+        blocks = []
+        categories = {}
+
+        for block_columns, values in _iter_dtype_blocks(df, categories):
+            block_file = 'block_{}.npy'.format(len(blocks))
+            np.save(os.path.join(tmp_path, block_file), values, allow_pickle=False)
+            blocks.append({'file': block_file, 'columns': block_columns})
+
+        meta = {'format_version': STORAGE_FORMAT_VERSION,
+                'columns': list(map(str, df.columns)),
+                'blocks': blocks,
+                'categories': categories,
+                'index': _write_index(df.index, tmp_path),
+                'extra': extra_meta or {}}
+
+        with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+            json.dump(meta, f)
+
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def read_frame_blocks(path: str, mmap_mode: str = None) -> pd.DataFrame:
+    """
+    Read a dataframe previously stored with `write_frame_blocks`.
+
+    Parameters
+    ----------
+    path: str
+        Directory containing the blocks.
+    mmap_mode: str, optional
+        Forwarded to ``np.load``. Use ``'r'`` to memory-map the blocks instead of reading them.
+
+    Returns
+    -------
+    {df}
+    """
+
+    meta = read_frame_blocks_meta(path)
+
+    index = _read_index(meta['index'], path)
+    frames = []
+
+    for block in meta['blocks']:
+        values = np.load(os.path.join(path, block['file']), mmap_mode=mmap_mode, allow_pickle=False)
+        columns = block['columns']
+
+        if columns[0] in meta['categories']:
+            label = columns[0]
+            values = pd.Categorical.from_codes(values[:, 0], categories=meta['categories'][label])
+            frames.append(pd.DataFrame({label: values}, index=index))
+        else:
+            frames.append(pd.DataFrame(values, index=index, columns=columns, copy=False))
+
+    df = pd.concat(frames, axis=1, copy=False) if len(frames) > 1 else frames[0]
+
+    if list(df.columns) != meta['columns']:
+        df = df.loc[:, meta['columns']]
+
+    return df
+
+
+def read_frame_blocks_meta(path: str) -> dict:
+    """
+    Read the metadata of a block store.
+
+    Raises
+    ------
+    FileNotFoundError
+        If `path` does not contain a block store.
+    ValueError
+        If the store was written with another storage format version.
+    """
+
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+
+    if meta.get('format_version') != STORAGE_FORMAT_VERSION:
+        raise ValueError('Unexpected storage format version: {}'.format(meta.get('format_version')))
+
+    return meta
+
+
+def update_frame_blocks_extra_meta(path: str, extra_meta: dict):
+    """
+    Update the additional information of a block store, without rewriting its blocks.
+
+    The metadata file is written next to the current one and renamed at the end, so a reader never sees a partially
+    written file.
+    """
+
+    meta = read_frame_blocks_meta(path)
+    meta['extra'] = dict(meta['extra'], **extra_meta)
+    fd, tmp_file = tempfile.mkstemp(prefix='.tmp_', dir=path)
+
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f)
+
+        os.replace(tmp_file, os.path.join(path, META_FILE))
+
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+def get_dir_size(path: str) -> int:
+    """Size in bytes of all files within a directory."""
+    return sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+
+
+def _iter_dtype_blocks(df, categories):
+    # Categorical columns are stored alone, as their categories differ from one column to another.
+    # All other columns are grouped by dtype, keeping the column order within each group.
+    by_dtype = {}
+
+    for label in df.columns:
+        column = df[label]
+
+        if is_categorical_dtype(column.dtype):
+            categories[str(label)] = column.cat.categories.tolist()
+            yield [str(label)], np.asarray(column.cat.codes.values).reshape(-1, 1)
+        else:
+            by_dtype.setdefault(column.dtype, []).append(label)
+
+    for dtype, labels in by_dtype.items():
+        if len(labels) == 1:
+            values = df[labels[0]].to_numpy().reshape(-1, 1)
+        else:
+            values = df.loc[:, labels].to_numpy(dtype=dtype)
+        yield list(map(str, labels)), np.ascontiguousarray(values)
+
+
+def _write_index(index, path):
+    if isinstance(index, pd.RangeIndex):
+        return {'type': 'range', 'start': int(index.start), 'stop': int(index.stop), 'step': int(index.step),
+                'name': index.name}
+
+    np.save(os.path.join(path, 'index.npy'), np.asarray(index.values), allow_pickle=False)
+    freq = getattr(index, 'freqstr', None)
+
+    return {'type': 'datetime' if is_datetime64_any_dtype(index) else 'values', 'name': index.name, 'freq': freq}
+
+
+def _read_index(index_meta, path):
+    if index_meta['type'] == 'range':
+        return pd.RangeIndex(index_meta['start'], index_meta['stop'], index_meta['step'], name=index_meta['name'])
+
+    values = np.load(os.path.join(path, 'index.npy'), allow_pickle=False)
+
+    if index_meta['type'] == 'datetime':
+        return pd.DatetimeIndex(values, name=index_meta['name'], freq=index_meta['freq'])
+
+    return pd.Index(values, name=index_meta['name'])
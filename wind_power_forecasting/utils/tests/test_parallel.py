@@ -0,0 +1,19 @@
+import os
+
+import numpy as np
+
+from wind_power_forecasting.utils.parallel import shared_arrays
+
+
+def test_shared_arrays(tmp_path):
+    X = np.arange(12, dtype=np.float32).reshape(4, 3)
+    y = np.arange(4.)
+
+    with shared_arrays(X, y, temp_folder=str(tmp_path)) as (shared_X, shared_y):
+        assert isinstance(shared_X, np.memmap) and not shared_X.flags.writeable
+        np.testing.assert_array_equal(shared_X, X)
+        np.testing.assert_array_equal(shared_y, y)
+        assert len(os.listdir(str(tmp_path))) == 1
+
+    # The folder is removed on exit.
+    assert not os.listdir(str(tmp_path))